@@ -0,0 +1,6 @@
+"""
+`markyp` performance benchmarks.
+
+Each benchmark module can be executed with `python -m benchmarks.<module>`, see the README
+for details.
+"""
@@ -0,0 +1,272 @@
+"""
+Benchmark utilities: timing, machine-readable results, and baseline comparison.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+
+import markyp
+
+
+__all__ = (
+    "Benchmark",
+    "compare_results",
+    "create_argument_parser",
+    "get_metadata",
+    "main_args",
+    "measure",
+    "measure_peak_memory",
+    "measure_retained_memory",
+    "report",
+    "run_benchmarks",
+    "scaled",
+)
+
+
+Benchmark = Callable[[], Any]
+"""A benchmark is a callable that takes no arguments."""
+
+
+def create_argument_parser(description: str) -> argparse.ArgumentParser:
+    """
+    Creates the command line argument parser that is shared by all benchmark modules.
+
+    Arguments:
+        description: The description of the benchmark module.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-o", "--output", help="Path of the JSON file to write the results to."
+    )
+    parser.add_argument(
+        "-c",
+        "--compare",
+        help="Path of a JSON result file to compare the results with.",
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Allowed relative slowdown compared to the baseline (default: 0.1).",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=5,
+        help="The number of times each benchmark is executed (default: 5).",
+    )
+    parser.add_argument(
+        "-s",
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiplier for the size of the generated documents (default: 1.0).",
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        default="",
+        help="Only run the benchmarks whose name contains the given string.",
+    )
+    return parser
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Dict[str, float]:
+    """
+    Executes the given benchmark `repeat` times and returns timing statistics in seconds.
+
+    Arguments:
+        benchmark: The benchmark to execute.
+        repeat: The number of times to execute the benchmark.
+    """
+    timings = timeit.Timer(benchmark, timer=time.perf_counter).repeat(
+        repeat=repeat, number=1
+    )
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+    }
+
+
+def measure_peak_memory(benchmark: Benchmark) -> int:
+    """
+    Executes the given benchmark once and returns the peak size of memory blocks
+    that were allocated during the execution (in bytes), as reported by `tracemalloc`.
+
+    Arguments:
+        benchmark: The benchmark to execute.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        benchmark()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - start
+
+
+def compare_results(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    key: str = "min",
+) -> List[str]:
+    """
+    Compares the given results with the baseline and returns the names of the benchmarks
+    whose `key` value grew by more than `threshold` (relative to the baseline).
+
+    Benchmarks that are missing from the baseline are ignored.
+
+    Arguments:
+        results: Benchmark name - statistics dictionary.
+        baseline: The baseline results, in the same format as `results`.
+        threshold: The allowed relative growth.
+        key: The statistic to compare.
+    """
+    return [
+        name
+        for name, stats in results.items()
+        if name in baseline and stats[key] > baseline[name][key] * (1 + threshold)
+    ]
+
+
+def run_benchmarks(
+    benchmarks: Dict[str, Benchmark],
+    args: argparse.Namespace,
+    *,
+    extra: Optional[Dict[str, Dict[str, Any]]] = None,
+    unit: str = "s",
+) -> int:
+    """
+    Executes the given benchmarks, prints and saves the results, and compares them
+    with the baseline if one was requested.
+
+    Arguments:
+        benchmarks: Benchmark name - benchmark dictionary.
+        args: The parsed command line arguments.
+        extra: Additional benchmark name - value dictionary pairs to include in the results
+               of the corresponding benchmarks.
+        unit: The unit of the measured values, used only for printing.
+
+    Returns:
+        The exit code of the benchmark run: 1 if a regression was found, 0 otherwise.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, benchmark in benchmarks.items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(benchmark, args.repeat)
+        if extra is not None and name in extra:
+            results[name].update(extra[name])
+        print(f"{name:<48} {results[name]['min']:>12.6f} {unit}", flush=True)
+
+    return report(results, args)
+
+
+def report(
+    results: Dict[str, Dict[str, Any]], args: argparse.Namespace, key: str = "min"
+) -> int:
+    """
+    Saves the given results and compares them with the baseline if one was requested.
+
+    Arguments:
+        results: Benchmark name - statistics dictionary.
+        args: The parsed command line arguments.
+        key: The statistic to compare with the baseline.
+
+    Returns:
+        The exit code of the benchmark run: 1 if a regression was found, 0 otherwise.
+    """
+    if args.output:
+        data = {"meta": get_metadata(args), "results": results}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = compare_results(results, baseline, args.threshold, key)
+    for name in results:
+        if name in baseline:
+            ratio = results[name][key] / baseline[name][key]
+            flag = "REGRESSION" if name in regressions else ""
+            print(f"{name:<48} {ratio:>8.3f}x {flag}")
+
+    return 1 if regressions else 0
+
+
+def get_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Returns information about the environment the benchmarks were executed in.
+
+    Arguments:
+        args: The parsed command line arguments.
+    """
+    return {
+        "markyp": markyp.__version__,
+        "python": sys.version,
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scale": args.scale,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def measure_retained_memory(factory: Callable[[], Any]) -> Tuple[int, Any]:
+    """
+    Executes the given factory and returns the size of the memory blocks that were
+    allocated during the execution and are still in use when it returns (in bytes),
+    as reported by `tracemalloc`, together with the object the factory created.
+
+    Arguments:
+        factory: The factory to execute.
+    """
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        result = factory()
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return end - start, result
+
+
+def scaled(value: int, scale: float) -> int:
+    """
+    Returns `value` multiplied by `scale`, but at least 1.
+
+    Arguments:
+        value: The value to scale.
+        scale: The multiplier.
+    """
+    return max(1, int(value * scale))
+
+
+def main_args(
+    description: str, argv: Optional[Sequence[str]] = None
+) -> argparse.Namespace:
+    """
+    Parses the command line arguments of a benchmark module.
+
+    Arguments:
+        description: The description of the benchmark module.
+        argv: The arguments to parse, `sys.argv[1:]` by default.
+    """
+    return create_argument_parser(description).parse_args(argv)
@@ -0,0 +1,194 @@
+"""
+Memory benchmarks.
+
+The benchmarks report the retained memory of the most common element types per node
+(including their `properties` dictionaries and `children` tuples) and of `ArenaDocument`s,
+and the peak memory usage of building, rendering and parsing large trees. All values are
+in bytes and are measured with `tracemalloc`.
+
+Memory usage is deterministic, so `--compare` can be used with a small `--threshold`
+to enforce memory budgets: the process exits with a non-zero code if any value grows
+by more than the threshold compared to the baseline.
+
+Usage: `python -m benchmarks.memory [--output results.json] [--compare baseline.json]`
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from functools import partial
+
+import sys
+
+from markyp import ElementType
+from markyp.elements import (
+    CachedElement,
+    Element,
+    ElementSequence,
+    EmptyElement,
+    StringElement,
+    iter_markup,
+)
+from markyp.parser import Parser
+from markyp.utils import deduplicate, share_properties
+
+from benchmarks.common import (
+    main_args,
+    measure_peak_memory,
+    measure_retained_memory,
+    report,
+    scaled,
+)
+from benchmarks.parser import nested_corpus
+from benchmarks.render import create_table
+
+
+class cell(Element):
+    __slots__ = ()
+
+
+class cached_cell(CachedElement):
+    __slots__ = ()
+
+
+class field(EmptyElement):
+    __slots__ = ()
+
+
+class label(StringElement):
+    __slots__ = ()
+
+
+def create_cells(count: int) -> List[ElementType]:
+    return [cell("Text", class_="cell") for _ in range(count)]
+
+
+def create_shared_cells(count: int) -> List[ElementType]:
+    cells = create_cells(count)
+    share_properties(ElementSequence(*cells))
+    return cells
+
+
+def create_cached_cells(count: int) -> List[ElementType]:
+    return [cached_cell("Text", class_="cell") for _ in range(count)]
+
+
+def create_fields(count: int) -> List[ElementType]:
+    return [field(class_="field", name="value") for _ in range(count)]
+
+
+def create_labels(count: int) -> List[ElementType]:
+    return [label("Text", class_="label") for _ in range(count)]
+
+
+def parse_cells(parser: Parser, data: str) -> List[ElementType]:
+    return [parser.fromstring(data)]
+
+
+def parse_arena(parser: Parser, data: str) -> List[ElementType]:
+    return [parser.fromstring_arena(data)]
+
+
+def get_leaf_document(count: int) -> str:
+    """
+    Returns an XML document with `count` `cell` elements below the root.
+    """
+    return "".join(
+        ("<root>", "<cell class='cell'>Text</cell>" * count, "</root>"),
+    )
+
+
+def get_node_factories(
+    count: int,
+) -> Dict[str, Tuple[Callable[[], List[ElementType]], int]]:
+    """
+    Creates the factories whose retained memory is measured per node.
+
+    Arguments:
+        count: The number of nodes to create.
+
+    Returns:
+        Benchmark name - factory, node count pairs.
+    """
+    document = get_leaf_document(count)
+    return {
+        "element.bytes_per_node": (partial(create_cells, count), count),
+        "shared_element.bytes_per_node": (partial(create_shared_cells, count), count),
+        "cached_element.bytes_per_node": (partial(create_cached_cells, count), count),
+        "empty_element.bytes_per_node": (partial(create_fields, count), count),
+        "string_element.bytes_per_node": (partial(create_labels, count), count),
+        "parsed_any_element.bytes_per_node": (
+            partial(parse_cells, Parser(), document),
+            count + 1,
+        ),
+        "parsed_rule_element.bytes_per_node": (
+            partial(parse_cells, Parser(cell), document),
+            count + 1,
+        ),
+        "parsed_deduplicated.bytes_per_node": (
+            partial(parse_cells, Parser(deduplicate=True), document),
+            count + 1,
+        ),
+        "parsed_arena.bytes_per_node": (
+            partial(parse_arena, Parser(), document),
+            count + 1,
+        ),
+    }
+
+
+def get_peak_benchmarks(scale: float) -> Dict[str, Callable[[], Any]]:
+    """
+    Creates the benchmarks whose peak memory usage is measured.
+
+    Arguments:
+        scale: Multiplier for the size of the generated documents.
+    """
+    rows = scaled(10_000, scale)
+    table = create_table(rows)
+    table_deduplicated = deduplicate(create_table(rows), freeze_shared=True)
+    document = "".join(nested_corpus(scaled(20_000, scale)))
+    parser = Parser()
+    direct_parser = Parser(direct=True)
+
+    def consume_markup() -> None:
+        for _ in iter_markup(table):
+            pass
+
+    return {
+        "build.table.peak": partial(create_table, rows),
+        "render.table.peak": partial(str, table),
+        "render.table_deduplicated.peak": partial(str, table_deduplicated),
+        "iter_markup.table.peak": consume_markup,
+        "parse.nested.peak": partial(parser.fromstring, document),
+        "parse_direct.nested.peak": partial(direct_parser.fromstring, document),
+        "parse_arena.nested.peak": partial(parser.fromstring_arena, document),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = main_args("markyp memory benchmarks.", argv)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for name, (factory, nodes) in get_node_factories(
+        scaled(20_000, args.scale)
+    ).items():
+        if args.filter not in name:
+            continue
+
+        retained, elements = measure_retained_memory(factory)
+        retained -= sys.getsizeof(elements)  # The list that holds the elements.
+        results[name] = {"bytes": retained / nodes, "nodes": nodes}
+        print(f"{name:<40} {results[name]['bytes']:>12.1f} bytes/node", flush=True)
+        del elements
+
+    for name, benchmark in get_peak_benchmarks(args.scale).items():
+        if args.filter not in name:
+            continue
+
+        results[name] = {"bytes": measure_peak_memory(benchmark)}
+        print(f"{name:<40} {results[name]['bytes'] / 2**20:>12.2f} MiB", flush=True)
+
+    return report(results, args, "bytes")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
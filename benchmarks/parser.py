@@ -0,0 +1,285 @@
+"""
+Parser benchmarks.
+
+The benchmarks parse generated XML corpora of different shapes and measure the time spent
+in `xml.etree.ElementTree` and in `Parser.convert()` separately, as well as the time spent
+in the direct mode of the parser that does not build an `etree` element tree, in the
+incremental `Parser.iterparse()` method, with a warm `ParseCache`, and parsing into
+`ArenaDocument`s. If `lxml` is installed, the `lxml` backend of the parser is benchmarked
+as well (with the `_lxml` suffix).
+
+Usage: `python -m benchmarks.parser [--output results.json] [--compare baseline.json]`
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from functools import partial
+
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+from markyp import IElement
+from markyp.elements import Element
+from markyp.parser import ParseCache, Parser
+
+try:
+    from lxml import etree as lxml_etree  # type: ignore
+except ImportError:
+    lxml_etree = None
+
+from benchmarks.common import (
+    Benchmark,
+    main_args,
+    measure,
+    measure_peak_memory,
+    report,
+    scaled,
+)
+
+
+RULE_COUNT = 50
+"""The number of distinct tags (and registered rules) in the generated corpora."""
+
+
+def create_rule_classes() -> List[Type[IElement]]:
+    """
+    Creates the element classes that are registered as parser rules.
+    """
+    return [type(f"t{i}", (Element,), {"__slots__": ()}) for i in range(RULE_COUNT)]
+
+
+def wide_corpus(count: int) -> Iterator[str]:
+    """
+    Generates a document with `count` leaf elements directly below the root.
+    """
+    yield "<root>"
+    for i in range(count):
+        yield f"<t{i % RULE_COUNT} id='{i}'>value {i}</t{i % RULE_COUNT}>"
+    yield "</root>"
+
+
+def deep_corpus(count: int, depth: int = 2000) -> Iterator[str]:
+    """
+    Generates a document with `count` nodes that form chains of the given depth.
+    """
+    yield "<root>"
+    for chain in range(max(1, count // depth)):
+        for i in range(depth):
+            yield f"<t{i % RULE_COUNT} level='{i}'>"
+        yield "leaf"
+        for i in reversed(range(depth)):
+            yield f"</t{i % RULE_COUNT}>"
+    yield "</root>"
+
+
+def attribute_heavy_corpus(count: int) -> Iterator[str]:
+    """
+    Generates a document with `count` elements that have many attributes each.
+    """
+    yield "<root>"
+    for i in range(count):
+        attributes = " ".join(
+            f'attr-{j}="value &quot;{i}.{j}&quot;"' for j in range(20)
+        )
+        yield f"<t{i % RULE_COUNT} {attributes}/>"
+    yield "</root>"
+
+
+def text_heavy_corpus(count: int) -> Iterator[str]:
+    """
+    Generates a document with `count` elements with long text content.
+    """
+    text = "Lorem ipsum dolor sit amet, consectetur &amp; adipiscing elit. " * 20
+    yield "<root>"
+    for i in range(count):
+        yield f"<t{i % RULE_COUNT}>\n    {text}\n</t{i % RULE_COUNT}>"
+    yield "</root>"
+
+
+def nested_corpus(count: int) -> Iterator[str]:
+    """
+    Generates a document with `count` elements that form a balanced tree
+    (sections with rows and cells), similar to typical markup documents.
+    """
+    yield "<root>"
+    for i in range(max(1, count // 50)):
+        yield f"<t0 class='section-{i}'>"
+        for j in range(7):
+            yield "<t1 class='row'>"
+            for k in range(6):
+                yield f"<t{2 + k} class='cell'>{i}.{j}.{k}</t{2 + k}>"
+            yield "</t1>"
+        yield "</t0>"
+    yield "</root>"
+
+
+CORPORA: Dict[str, Callable[[int], Iterator[str]]] = {
+    "wide": wide_corpus,
+    "deep": deep_corpus,
+    "attribute_heavy": attribute_heavy_corpus,
+    "text_heavy": text_heavy_corpus,
+    "nested": nested_corpus,
+}
+"""Corpus name - corpus generator pairs."""
+
+
+def converter(
+    factory: Any, children: Sequence[Any], properties: Dict[str, Any]
+) -> Tuple[Any, Sequence[Any], Dict[str, Any]]:
+    """
+    Parser converter that sets an additional property on every element.
+    """
+    properties["data-parsed"] = True
+    return factory, children, properties
+
+
+def create_parsers() -> Dict[str, Parser]:
+    """
+    Creates the parser configurations to benchmark.
+    """
+    rules = create_rule_classes()
+    with_converter = Parser(*rules)
+    with_converter.converter(converter)
+    any_with_converter = Parser()
+    any_with_converter.converter(converter)
+    return {
+        "rules": Parser(*rules),
+        "any": Parser(),
+        "rules_converter": with_converter,
+        "any_converter": any_with_converter,
+    }
+
+
+def consume_records(parser: Parser, path: str) -> None:
+    """
+    Iterates over the `t0` records of the given file without keeping them.
+    """
+    for _ in parser.iterparse(path, "t0"):
+        pass
+
+
+def get_benchmarks(scale: float, directory: str) -> Dict[str, Tuple[Benchmark, int]]:
+    """
+    Creates the benchmarks.
+
+    Arguments:
+        scale: Multiplier for the size of the generated documents.
+        directory: The directory to save the generated documents to.
+
+    Returns:
+        Benchmark name - benchmark, node count pairs.
+    """
+    parsers = create_parsers()
+    backend_parsers: Dict[str, Tuple[Parser, Parser]] = {
+        "": (parsers["rules"], Parser(*create_rule_classes(), direct=True))
+    }
+    if lxml_etree is not None:
+        backend_parsers["_lxml"] = (
+            Parser(*create_rule_classes(), backend="lxml"),
+            Parser(*create_rule_classes(), direct=True, backend="lxml"),
+        )
+
+    # The generated rule classes can not be pickled, so the cached parser has no rules.
+    cached_parser = Parser(cache=ParseCache(os.path.join(directory, "cache")))
+    deduplicating_parser = Parser(deduplicate=True)
+    benchmarks: Dict[str, Tuple[Benchmark, int]] = {}
+    for name, corpus in CORPORA.items():
+        data = "".join(corpus(scaled(20_000, scale)))
+        path = os.path.join(directory, f"{name}.xml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+        tree = ET.fromstring(data)
+        nodes = sum(1 for _ in tree.iter())
+
+        benchmarks[f"{name}.etree_fromstring"] = (partial(ET.fromstring, data), nodes)
+        benchmarks[f"{name}.etree_parse"] = (partial(ET.parse, path), nodes)
+        for parser_name, parser in parsers.items():
+            benchmarks[f"{name}.convert.{parser_name}"] = (
+                partial(parser.convert, tree),
+                nodes,
+            )
+        if lxml_etree is not None:
+            lxml_parser = lxml_etree.XMLParser(huge_tree=True)
+            lxml_tree = lxml_etree.fromstring(data, lxml_parser)
+            benchmarks[f"{name}.lxml_fromstring"] = (
+                partial(lxml_etree.fromstring, data, lxml_parser),
+                nodes,
+            )
+            benchmarks[f"{name}.convert.rules_lxml"] = (
+                partial(parsers["rules"].convert, lxml_tree),
+                nodes,
+            )
+
+        cached_parser.parse(path)  # Warm up the cache.
+        benchmarks[f"{name}.parse.any"] = (partial(parsers["any"].parse, path), nodes)
+        benchmarks[f"{name}.parse.any_deduplicate"] = (
+            partial(deduplicating_parser.parse, path),
+            nodes,
+        )
+        benchmarks[f"{name}.fromstring.arena"] = (
+            partial(parsers["any"].fromstring_arena, data),
+            nodes,
+        )
+        benchmarks[f"{name}.parse.arena"] = (
+            partial(parsers["any"].parse_arena, path),
+            nodes,
+        )
+        benchmarks[f"{name}.parse.any_cached"] = (
+            partial(cached_parser.parse, path),
+            nodes,
+        )
+
+        for suffix, (parser, direct_parser) in backend_parsers.items():
+            benchmarks[f"{name}.fromstring.rules{suffix}"] = (
+                partial(parser.fromstring, data),
+                nodes,
+            )
+            benchmarks[f"{name}.parse.rules{suffix}"] = (
+                partial(parser.parse, path),
+                nodes,
+            )
+            benchmarks[f"{name}.fromstring.rules_direct{suffix}"] = (
+                partial(direct_parser.fromstring, data),
+                nodes,
+            )
+            benchmarks[f"{name}.parse.rules_direct{suffix}"] = (
+                partial(direct_parser.parse, path),
+                nodes,
+            )
+            benchmarks[f"{name}.iterparse.rules{suffix}"] = (
+                partial(consume_records, parser, path),
+                nodes,
+            )
+
+    return benchmarks
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = main_args("markyp parser benchmarks.", argv)
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = get_benchmarks(args.scale, directory)
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, (benchmark, nodes) in benchmarks.items():
+            if args.filter not in name:
+                continue
+
+            stats: Dict[str, Any] = measure(benchmark, args.repeat)
+            stats["nodes"] = nodes
+            stats["nodes_per_second"] = nodes / stats["min"]
+            stats["peak_memory"] = measure_peak_memory(benchmark)
+            results[name] = stats
+            print(
+                f"{name:<44} {stats['min']:>10.6f} s"
+                f" {stats['nodes_per_second']:>14,.0f} nodes/s"
+                f" {stats['peak_memory'] / 2**20:>10.2f} MiB peak",
+                flush=True,
+            )
+
+    return report(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
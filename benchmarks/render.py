@@ -0,0 +1,231 @@
+"""
+Rendering benchmarks.
+
+Usage: `python -m benchmarks.render [--output results.json] [--compare baseline.json]`
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import sys
+
+from markyp import ElementType, PropertyDict
+from markyp.elements import (
+    BaseElement,
+    ChildrenOnlyElement,
+    Element,
+    EmptyElement,
+    StringElement,
+)
+from markyp.formatters import format_element_sequence, format_properties
+from markyp.utils import deduplicate, join_elements, share_properties
+
+from benchmarks.common import Benchmark, main_args, run_benchmarks, scaled
+
+
+class table(Element):
+    __slots__ = ()
+
+
+class tr(Element):
+    __slots__ = ()
+
+
+class td(Element):
+    __slots__ = ()
+
+    @property
+    def inline_children(self) -> bool:
+        return True
+
+
+class div(Element):
+    __slots__ = ()
+
+
+class field(EmptyElement):
+    __slots__ = ()
+
+
+class p(StringElement):
+    __slots__ = ()
+
+
+class section(BaseElement):
+    """
+    `BaseElement` that computes its children and properties when it is rendered.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: Sequence[str]) -> None:
+        self._items = items
+
+    def get_element_children(self) -> Optional[Sequence[ElementType]]:
+        return [ChildrenOnlyElement(item, str(i)) for i, item in enumerate(self._items)]
+
+    def get_element_properties(self) -> Optional[PropertyDict]:
+        return {"class": "section", "data-count": len(self._items)}
+
+
+def create_table(rows: int) -> table:
+    """
+    Creates a table with the given number of rows and a few cells in every row.
+    """
+    return table(
+        *(
+            tr(
+                td(str(i), class_="index"),
+                td(f"Item <{i}>", class_="name"),
+                td(f"{i * 1.5:.2f}", class_="price", title=f"Price of item {i}"),
+                td(EmptyElement(type="checkbox", checked=i % 2 == 0)),
+                class_="row",
+            )
+            for i in range(rows)
+        ),
+        class_="table",
+    )
+
+
+def create_deep_tree(depth: int) -> div:
+    """
+    Creates a tree with the given depth.
+    """
+    element: ElementType = p("Leaf & text")
+    for i in range(depth):
+        element = div(element, f"Level {i}", class_=f"level-{i % 10}")
+    return element  # type: ignore
+
+
+def create_balanced_tree(depth: int, width: int) -> div:
+    """
+    Creates a tree with the given depth in which every element has `width` children,
+    and the elements of the last level have `width` short string children.
+    """
+    if depth <= 1:
+        return div(*(f"Leaf {i}" for i in range(width)), class_="leaf")
+    return div(
+        *(create_balanced_tree(depth - 1, width) for _ in range(width)), class_="node"
+    )
+
+
+def create_small_trees(count: int) -> List[div]:
+    """
+    Creates the given number of small trees with three children each.
+    """
+    return [
+        div(p(f"Item {i}", class_="name"), f"{i} & more", field(id=i), class_="row")
+        for i in range(count)
+    ]
+
+
+def create_attribute_heavy_elements(count: int) -> List[field]:
+    """
+    Creates the given number of `EmptyElement`s with many properties.
+    """
+    result: List[field] = []
+    for i in range(count):
+        data: PropertyDict = {
+            "data-index": i,
+            "data-group": i % 7,
+            "aria-label": f"Field {i}",
+        }
+        result.append(
+            field(
+                class_="form-control",
+                id=f"input-{i}",
+                name=f"field_{i}",
+                type="text",
+                value=f"value {i}",
+                placeholder="Type here...",
+                maxlength=255,
+                size=40,
+                required=None,
+                disabled=False,
+                readonly=i % 3 == 0,
+                tabindex=i,
+                autocomplete="off",
+                spellcheck=True,
+                **data,
+            )
+        )
+    return result
+
+
+def create_long_text(length: int) -> p:
+    """
+    Creates a `StringElement` with approximately `length` characters of text.
+    """
+    sentence = "The quick brown fox jumps over the lazy dog & the <cat>. "
+    return p(sentence * (length // len(sentence) + 1), class_="text")
+
+
+def create_computed(sections: int, items: int) -> ChildrenOnlyElement:
+    """
+    Creates a tree of `BaseElement`s with computed children and properties.
+    """
+    return ChildrenOnlyElement(
+        *(section([f"Item {i}.{j}" for j in range(items)]) for i in range(sections))
+    )
+
+
+def get_benchmarks(scale: float) -> Dict[str, Benchmark]:
+    """
+    Creates the benchmarks.
+
+    Arguments:
+        scale: Multiplier for the size of the generated documents.
+    """
+    wide = create_table(scaled(10_000, scale))
+    wide_shared = create_table(scaled(10_000, scale))
+    share_properties(wide_shared)
+    wide_deduplicated = deduplicate(
+        create_table(scaled(10_000, scale)), freeze_shared=True
+    )
+    deep = create_deep_tree(scaled(5_000, scale))
+    balanced_10x3 = create_balanced_tree(10, 3)
+    balanced_6x8 = create_balanced_tree(6, 8)
+    small_trees = create_small_trees(scaled(20_000, scale))
+    attribute_heavy = create_attribute_heavy_elements(scaled(10_000, scale))
+    attribute_heavy_parent = div(*attribute_heavy)
+    long_text = create_long_text(scaled(5_000_000, scale))
+    computed = create_computed(scaled(1_000, scale), 20)
+    properties = [e.properties for e in attribute_heavy]
+    rows = wide.children
+    strings: List[ElementType] = [
+        f"Item <{i}> & more" for i in range(scaled(100_000, scale))
+    ]
+    elements: List[ElementType] = [*attribute_heavy]
+
+    return {
+        "wide_table.markup": lambda: wide.markup,
+        "wide_table_shared_properties.markup": lambda: wide_shared.markup,
+        "wide_table_deduplicated.markup": lambda: str(wide_deduplicated),
+        "wide_table.format_element_sequence": lambda: format_element_sequence(rows),
+        "deep_tree.markup": lambda: deep.markup,
+        "balanced_tree_10x3.markup": lambda: balanced_10x3.markup,
+        "balanced_tree_6x8.markup": lambda: balanced_6x8.markup,
+        "small_trees.markup": lambda: [tree.markup for tree in small_trees],
+        "attribute_heavy.markup": lambda: attribute_heavy_parent.markup,
+        "attribute_heavy.format_properties": lambda: [
+            format_properties(props) for props in properties
+        ],
+        "long_text.markup": lambda: long_text.markup,
+        "computed_children.markup": lambda: computed.markup,
+        "strings.format_element_sequence": lambda: format_element_sequence(strings),
+        "strings.format_element_sequence_inline": lambda: format_element_sequence(
+            strings, inline=True
+        ),
+        "strings.join_elements": lambda: join_elements(strings, "|"),
+        "elements.join_elements": lambda: join_elements(
+            elements, lambda: EmptyElement()
+        ),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = main_args("markyp rendering benchmarks.", argv)
+    return run_benchmarks(get_benchmarks(args.scale), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Serialization benchmarks.
+
+The benchmarks compare `markyp.serialization` with `pickle` on a built and on a parsed
+tree. The size of the serialized trees is included in the results (`bytes`).
+
+Usage: `python -m benchmarks.serialization [--output results.json] [--compare baseline.json]`
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+from functools import partial
+
+import os
+import pickle
+import sys
+import tempfile
+
+from markyp import ElementType
+from markyp.parser import Parser
+from markyp.serialization import dump, dumps, load, loads
+
+from benchmarks.common import Benchmark, main_args, run_benchmarks, scaled
+from benchmarks.parser import nested_corpus
+from benchmarks.render import create_table
+
+
+def load_and_render(path: str) -> str:
+    return str(load(path))
+
+
+def unpickle_and_render(data: bytes) -> str:
+    return str(pickle.loads(data))
+
+
+def get_benchmarks(scale: float, directory: str) -> Dict[str, Benchmark]:
+    """
+    Creates the benchmarks.
+
+    Arguments:
+        scale: Multiplier for the size of the generated trees.
+        directory: The directory to save the serialized trees to.
+    """
+    trees: Dict[str, ElementType] = {
+        "table": create_table(scaled(10_000, scale)),
+        "parsed": Parser().fromstring("".join(nested_corpus(scaled(20_000, scale)))),
+    }
+    benchmarks: Dict[str, Benchmark] = {}
+    for name, tree in trees.items():
+        pickled = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+        serialized = dumps(tree)
+        path = os.path.join(directory, f"{name}.markyp")
+        dump(tree, path)
+
+        benchmarks[f"{name}.pickle_dumps"] = partial(
+            pickle.dumps, tree, pickle.HIGHEST_PROTOCOL
+        )
+        benchmarks[f"{name}.dumps"] = partial(dumps, tree)
+        benchmarks[f"{name}.pickle_loads"] = partial(pickle.loads, pickled)
+        benchmarks[f"{name}.loads"] = partial(loads, serialized)
+        benchmarks[f"{name}.load_lazy"] = partial(load, path)
+        benchmarks[f"{name}.pickle_loads_render"] = partial(
+            unpickle_and_render, pickled
+        )
+        benchmarks[f"{name}.load_lazy_render"] = partial(load_and_render, path)
+
+    return benchmarks
+
+
+def get_sizes(benchmarks: Dict[str, Benchmark]) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the size of the serialized trees of the `dumps` benchmarks.
+
+    Arguments:
+        benchmarks: The benchmarks.
+    """
+    return {
+        name: {"bytes": len(benchmark())}
+        for name, benchmark in benchmarks.items()
+        if name.endswith("dumps")
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = main_args("markyp serialization benchmarks.", argv)
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = get_benchmarks(args.scale, directory)
+        return run_benchmarks(benchmarks, args, extra=get_sizes(benchmarks))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,7 @@
 Type declarations and the most basic building blocks of `markyp`.
 """
 
-from typing import Any, Dict, Union
+from typing import Any, Dict, Iterator, Optional, Union
 
 __author__ = "Peter Volf"
 __copyright__ = "Copyright 2019, Peter Volf"
@@ -39,6 +39,48 @@ class IElement(object):
         """
         return str(self)
 
+    def iter_markup(self, chunk_size: int = 8192) -> Iterator[str]:
+        """
+        Generator that yields the string representation of the element in chunks
+        of about `chunk_size` characters.
+
+        See `markyp.elements.iter_markup()` for details.
+
+        Arguments:
+            chunk_size: The minimum size of yielded chunks (except the last one) in characters.
+        """
+        from markyp.elements import iter_markup
+
+        return iter_markup(self, chunk_size)
+
+    def render_to(
+        self,
+        writable: Any,
+        encoding: str = "utf-8",
+        compress: Optional[str] = None,
+        *,
+        chunk_size: int = 65536,
+    ) -> int:
+        """
+        Writes the encoded and optionally compressed string representation of the element
+        incrementally into the given binary file-like or socket-like object.
+
+        See `markyp.elements.render_to()` for details.
+
+        Arguments:
+            writable: The binary file-like or socket-like object to write the data to.
+            encoding: The encoding to use.
+            compress: The compression to apply, either `None`, `"gzip"` or `"zlib"`.
+            chunk_size: The size of markup chunks in characters and the minimum size
+                        of written batches (except the last one) in bytes.
+
+        Returns:
+            The number of bytes that were written.
+        """
+        from markyp.elements import render_to
+
+        return render_to(self, writable, encoding, compress, chunk_size=chunk_size)
+
 
 ElementType = Union[IElement, str]
 """Type denoting `IElement` or string objects."""
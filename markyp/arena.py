@@ -0,0 +1,457 @@
+"""
+Array-backed (arena) representation of large, read-only documents.
+
+An `ArenaDocument` stores the nodes of a document in compact arrays (columns) instead of
+creating a Python object for every element, its `children` tuple and its `properties`
+dictionary. `ArenaElement`s are lightweight views of the elements of the document, they
+are created on demand, for example during rendering.
+
+Documents are usually created by `Parser.fromstring_arena()` or `Parser.parse_arena()`.
+"""
+
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from array import array
+from itertools import accumulate
+
+import sys
+
+from markyp import ElementType, PropertyDict
+from markyp.elements import PartsElement, RenderMode, RenderParts
+
+
+__all__ = ("ArenaBuilder", "ArenaDocument", "ArenaElement")
+
+
+_MAX_UINT = 2**32 - 1
+"""The maximum value of the `"I"` array type code that is used if possible."""
+
+
+class ArenaDocument(PartsElement):
+    """
+    Read-only document whose nodes are stored in compact arrays.
+
+    Nodes (elements and texts) are stored in document order (preorder). For every node,
+    the document stores the index of its parent, the index after the last node of its
+    subtree, its tag or text, and the range of its attributes. Tags, attribute names,
+    attribute values, and texts are interned: every distinct string is stored only once,
+    in a single string.
+
+    The document renders exactly like the equivalent `AnyElement` tree that `Parser`
+    creates, using the formatting rules of `Element`.
+    """
+
+    __slots__ = (
+        "_attribute_names",
+        "_attribute_starts",
+        "_attribute_values",
+        "_ends",
+        "_parents",
+        "_string_data",
+        "_string_offsets",
+        "_tags",
+    )
+
+    def __init__(
+        self,
+        strings: List[str],
+        tags: "array[int]",
+        parents: "array[int]",
+        ends: "array[int]",
+        attribute_starts: "array[int]",
+        attribute_names: "array[int]",
+        attribute_values: "array[int]",
+    ) -> None:
+        """
+        Initialization.
+
+        Use `ArenaBuilder` or `Parser` to create documents.
+
+        Arguments:
+            strings: The string table, strings are referenced by their index.
+            tags: The string index of the tag of every element node, and the bitwise
+                  inverted (`~`) string index of the text of every text node.
+            parents: The index of the parent of every node, `-1` for the root.
+            ends: The index after the last node of the subtree of every node.
+            attribute_starts: The index of the first attribute of every node, followed by
+                              the total number of attributes.
+            attribute_names: The string index of the name of every attribute.
+            attribute_values: The string index of the value of every attribute.
+        """
+        string_data = "".join(strings)
+        offsets = array(
+            "I" if len(string_data) <= _MAX_UINT else "Q",
+            accumulate(map(len, strings), initial=0),
+        )
+
+        self._attribute_names = attribute_names
+        """The string index of the name of every attribute."""
+
+        self._attribute_starts = attribute_starts
+        """The index of the first attribute of every node and the number of attributes."""
+
+        self._attribute_values = attribute_values
+        """The string index of the value of every attribute."""
+
+        self._ends = ends
+        """The index after the last node of the subtree of every node."""
+
+        self._parents = parents
+        """The index of the parent of every node, `-1` for the root."""
+
+        self._string_data = string_data
+        """The concatenation of every string of the string table."""
+
+        self._string_offsets = offsets
+        """The offset of every string in `_string_data`, followed by its length."""
+
+        self._tags = tags
+        """The tag string index of every element and the inverted text index of every text."""
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sum(
+            sys.getsizeof(getattr(self, name)) for name in self.__slots__
+        )
+
+    @property
+    def node_count(self) -> int:
+        """
+        The number of nodes (elements and texts) in the document.
+        """
+        return len(self._tags)
+
+    @property
+    def root(self) -> Optional[ElementType]:
+        """
+        The root node of the document, `None` if the document is empty.
+        """
+        return self.get_node(0) if self._tags else None
+
+    def get_node(self, index: int) -> ElementType:
+        """
+        Returns the node with the given index.
+
+        Arguments:
+            index: The index of the node in document order.
+
+        Returns:
+            An `ArenaElement` view of the element, or the text of a text node.
+
+        Raises:
+            IndexError: If there is no node with the given index.
+        """
+        tag = self._tags[index]
+        return self._get_string(~tag) if tag < 0 else ArenaElement(self, index)
+
+    def get_render_parts(self) -> RenderParts:
+        root = self.root
+        return ("", None if root is None else (root,), RenderMode.SEQUENCE, "")
+
+    def iter_children(self, index: int) -> Iterator[int]:
+        """
+        Yields the indexes of the children of the given node.
+
+        Arguments:
+            index: The index of the node.
+        """
+        ends = self._ends
+        end = ends[index]
+        index += 1
+        while index < end:
+            yield index
+            index = ends[index]
+
+    def _get_children(self, index: int) -> List[ElementType]:
+        """
+        Returns the children of the given node, element views and texts.
+
+        Arguments:
+            index: The index of the node.
+        """
+        ends = self._ends
+        tags = self._tags
+        get_string = self._get_string
+        children: List[ElementType] = []
+        end = ends[index]
+        index += 1
+        while index < end:
+            tag = tags[index]
+            children.append(get_string(~tag) if tag < 0 else ArenaElement(self, index))
+            index = ends[index]
+        return children
+
+    def _get_string(self, index: int) -> str:
+        """
+        Returns the string with the given index from the string table.
+
+        Arguments:
+            index: The index of the string.
+        """
+        offsets = self._string_offsets
+        return self._string_data[offsets[index] : offsets[index + 1]]
+
+
+class ArenaElement(PartsElement):
+    """
+    Lightweight view of an element of an `ArenaDocument`.
+
+    The view renders and behaves like the `AnyElement` that `Parser` would create for the
+    element, but its `children` and `properties` are created when they are accessed
+    and changing them has no effect on the document.
+    """
+
+    __slots__ = ("_document", "_index")
+
+    def __init__(self, document: ArenaDocument, index: int) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            document: The document that contains the element.
+            index: The index of the element in the document.
+        """
+        self._document = document
+        """The document that contains the element."""
+
+        self._index = index
+        """The index of the element in the document."""
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ArenaElement):
+            return self._document is other._document and self._index == other._index
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._document), self._index))
+
+    @property
+    def children(self) -> Tuple[ElementType, ...]:
+        """
+        The child elements (views) and texts of the element.
+        """
+        return tuple(self._document._get_children(self._index))
+
+    @property
+    def document(self) -> ArenaDocument:
+        """
+        The document that contains the element.
+        """
+        return self._document
+
+    @property
+    def element_name(self) -> str:
+        """
+        The tag of the element.
+        """
+        return self._document._get_string(self._document._tags[self._index])
+
+    @property
+    def index(self) -> int:
+        """
+        The index of the element in the document.
+        """
+        return self._index
+
+    @property
+    def inline_children(self) -> bool:
+        """
+        Whether the children of the element should be placed on the same line as the element.
+
+        Always `False`, like in the case of `Element`.
+        """
+        return False
+
+    @property
+    def parent(self) -> Optional["ArenaElement"]:
+        """
+        The parent of the element, `None` for the root of the document.
+        """
+        parent = self._document._parents[self._index]
+        return None if parent < 0 else ArenaElement(self._document, parent)
+
+    @property
+    def properties(self) -> PropertyDict:
+        """
+        The properties (attributes) of the element.
+        """
+        document = self._document
+        get_string = document._get_string
+        start, end = document._attribute_starts[self._index : self._index + 2]
+        return {
+            get_string(name): get_string(value)
+            for name, value in zip(
+                document._attribute_names[start:end],
+                document._attribute_values[start:end],
+            )
+        }
+
+    def get_render_parts(self) -> RenderParts:
+        document = self._document
+        index = self._index
+        get_string = document._get_string
+        name = get_string(document._tags[index])
+        start, end = document._attribute_starts[index : index + 2]
+        properties = " ".join(
+            [
+                f'{get_string(attribute)}="{get_string(value)}"'
+                for attribute, value in zip(
+                    document._attribute_names[start:end],
+                    document._attribute_values[start:end],
+                )
+            ]
+        )
+        return (
+            f"<{name} {properties}>",
+            document._get_children(index),
+            RenderMode.BLOCK,
+            f"</{name}>",
+        )
+
+
+class ArenaBuilder:
+    """
+    `XMLParser` target that builds an `ArenaDocument`.
+
+    The document is built exactly the way `Parser` creates `AnyElement`s in direct mode:
+    the text of an element is the text before its first child. If that text is not empty,
+    it becomes the only child of the element and the element's subtree is not processed.
+    Whitespace-only texts and texts after child elements are ignored, and `"` characters
+    are replaced by `&quot;` in attribute values.
+    """
+
+    __slots__ = (
+        "_attribute_names",
+        "_attribute_starts",
+        "_attribute_values",
+        "_ends",
+        "_parents",
+        "_skip",
+        "_stack",
+        "_strings",
+        "_tags",
+        "_text",
+    )
+
+    def __init__(self) -> None:
+        self._attribute_names = array("I")
+        """The string index of the name of every attribute."""
+
+        self._attribute_starts = array("I", [0])
+        """The index of the first attribute of every node and the number of attributes."""
+
+        self._attribute_values = array("I")
+        """The string index of the value of every attribute."""
+
+        self._ends = array("I")
+        """The index after the last node of the subtree of every closed node."""
+
+        self._parents = array("i")
+        """The index of the parent of every node."""
+
+        self._skip = 0
+        """The depth in the subtree that is currently being skipped."""
+
+        self._stack: List[List[Any]] = []
+        """Index - text list - has text lists of the elements that are not closed yet."""
+
+        self._strings: Dict[str, int] = {}
+        """String - string index dictionary."""
+
+        self._tags = array("i")
+        """The tag string index of every element and the inverted text index of every text."""
+
+        self._text: Optional[List[str]] = None
+        """The text list of the current element if its text is still being collected."""
+
+    def start(self, tag: str, attrib: Mapping[str, str]) -> None:
+        if self._skip > 0:
+            self._skip += 1
+            return
+
+        stack = self._stack
+        if stack:
+            parent = stack[-1]
+            if parent[1] is not None:
+                parent[2] = self._add_text(parent)
+            if parent[2]:
+                self._skip = 1
+                self._text = None
+                return
+
+        index = len(self._tags)
+        self._tags.append(self._intern(tag))
+        self._parents.append(stack[-1][0] if stack else -1)
+        self._ends.append(0)  # Set when the element is closed.
+        if attrib:
+            intern = self._intern
+            for name, value in attrib.items():
+                self._attribute_names.append(intern(name))
+                self._attribute_values.append(intern(value.replace('"', "&quot;")))
+        self._attribute_starts.append(len(self._attribute_names))
+
+        text: List[str] = []
+        stack.append([index, text, False])
+        self._text = text
+
+    def data(self, data: str) -> None:
+        text = self._text
+        if text is not None:
+            text.append(data)
+
+    def end(self, tag: str) -> None:
+        if self._skip > 0:
+            self._skip -= 1
+            return
+
+        self._text = None  # The parent (if any) already has a child.
+        frame = self._stack.pop()
+        if frame[1] is not None:
+            self._add_text(frame)
+        self._ends[frame[0]] = len(self._tags)
+
+    def close(self) -> ArenaDocument:
+        strings = list(self._strings)
+        self._strings = {}
+        return ArenaDocument(
+            strings,
+            self._tags,
+            self._parents,
+            self._ends,
+            self._attribute_starts,
+            self._attribute_names,
+            self._attribute_values,
+        )
+
+    def _add_text(self, frame: List[Any]) -> bool:
+        """
+        Adds the collected text of the given element as its child, if the text is not empty.
+
+        Arguments:
+            frame: The stack frame of the element.
+
+        Returns:
+            Whether a text node was added.
+        """
+        text = "".join(frame[1]).strip()
+        frame[1] = None
+        if not text:
+            return False
+
+        index = len(self._tags)
+        self._tags.append(~self._intern(text))
+        self._parents.append(frame[0])
+        self._ends.append(index + 1)
+        self._attribute_starts.append(len(self._attribute_names))
+        return True
+
+    def _intern(self, value: str) -> int:
+        """
+        Returns the index of the given string in the string table, adding it if necessary.
+
+        Arguments:
+            value: The string.
+        """
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._strings)
+        return index
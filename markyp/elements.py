@@ -2,29 +2,146 @@
 Base `markyp` element implementations.
 """
 
-from typing import Sequence, Optional
+import codecs
+import inspect
+import sys
+import zlib
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+)
+from weakref import WeakSet
 
 from markyp import ElementType, IElement, PropertyDict, PropertyValue
-from markyp.formatters import (
-    format_element_sequence,
-    format_properties,
-    xml_format_element,
-    xml_escape,
-)
+from markyp import formatters as _formatters
+from markyp.formatters import format_properties
+from markyp.properties import SharedProperties
+
+if TYPE_CHECKING:
+    import asyncio
 
 
 __all__ = (
     "BaseElement",
+    "CachedElement",
+    "CachedEmptyElement",
+    "CachedMixin",
+    "CachedStringElement",
     "ChildrenOnlyElement",
     "Element",
     "ElementSequence",
     "EmptyElement",
+    "FrozenElement",
+    "PartsElement",
+    "RenderMode",
+    "RenderParts",
     "SelfClosedElement",
     "StandaloneElement",
     "StringElement",
+    "arender",
+    "freeze",
+    "has_structural_markup",
+    "iter_markup",
+    "render",
+    "render_to",
 )
 
 
+_BLOCK = 0
+"""Separator mode: each child is placed on a new line, the children block is wrapped in new lines."""
+
+_INLINE = 1
+"""Separator mode: children are placed on the same line, separated by spaces."""
+
+_SEQUENCE = 2
+"""Separator mode: children are separated by new lines, there is no wrapping."""
+
+_RenderTemplate = Tuple[Optional[str], Optional[str], Optional[int], Any, Any, Any]
+"""
+Open-tag prefix - close tag - separator mode - element class - `element_name` attribute -
+`inline_children` attribute tuple of an element class that is computed when the class
+is created. `None` markup items depend on the element instance, because the class overrides
+the `element_name` or `inline_children` property. The last three items identify the class
+and the attribute values the template was created from, see `_update_render_template()`.
+"""
+
+_NO_TEMPLATE: _RenderTemplate = (None, None, None, None, None, None)
+"""Render template placeholder of the classes of this module, it is replaced on first use."""
+
+
+def _compile_render_template(cls: type, open_tag_end: str) -> _RenderTemplate:
+    """
+    Creates the render template of the given element class.
+
+    Arguments:
+        cls: The element class.
+        open_tag_end: The string that follows the element name in the open-tag prefix.
+    """
+    name = _get_static_attribute(cls, "element_name", cls.__name__)
+    inline = _get_static_attribute(cls, "inline_children", False)
+    return (
+        None if name is None else f"<{name}{open_tag_end}",
+        None if name is None else f"</{name}>",
+        None if inline is None else _INLINE if inline else _BLOCK,
+        cls,
+        getattr(cls, "element_name", None),
+        getattr(cls, "inline_children", None),
+    )
+
+
+def _update_render_template(cls: type, open_tag_end: str) -> _RenderTemplate:
+    """
+    Creates and stores the render template of the given element class.
+
+    Render handlers call this function if the class has no template of its own (for example
+    because a base class overrides `__init_subclass__()` without calling `super()`), or if
+    the `element_name` or `inline_children` attribute of the class has been replaced since
+    the template was created.
+
+    Arguments:
+        cls: The element class whose template is required.
+        open_tag_end: The string that follows the element name in the open-tag prefix.
+    """
+    template = _compile_render_template(cls, open_tag_end)
+    cls._render_template = template  # type: ignore[attr-defined]
+    return template
+
+
+def _get_static_attribute(cls: type, name: str, default: Any) -> Any:
+    """
+    Returns the value the given attribute has on every instance of the given element class,
+    or `None` if the value can only be determined at render time.
+
+    Arguments:
+        cls: The element class.
+        name: The name of the attribute.
+        default: The value of the attribute if it is defined by a class of this module.
+    """
+    for base in cls.__mro__:
+        value = base.__dict__.get(name)
+        if value is None:
+            continue
+        if base.__module__ == __name__:
+            return default
+        if not isinstance(value, (str, bool)) or cls.__dictoffset__:  # type: ignore[attr-defined]
+            # Instances with a `__dict__` may override a plain class attribute.
+            return None
+        return value
+
+    return default
+
+
 class BaseElement(IElement):
     """
     Base class for elements that calculate their own properties and children elements
@@ -36,20 +153,7 @@ class BaseElement(IElement):
     __slots__ = ()
 
     def __str__(self) -> str:
-        name = self.element_name
-        properties = self.get_element_properties()
-        properties_str = format_properties(properties) if properties is not None else ""
-        children = self.get_element_children()
-        children_str = (
-            format_element_sequence(
-                children,
-                element_formatter=xml_format_element,
-                inline=self.inline_children,
-            )
-            if children is not None
-            else ""
-        )
-        return f"<{name} {properties_str}>{children_str}</{name}>"
+        return _render_with(self, _base_element_parts)
 
     @property
     def element_name(self) -> str:
@@ -91,6 +195,16 @@ class ChildrenOnlyElement(IElement):
 
     __slots__ = ("children",)
 
+    _render_template: _RenderTemplate = _NO_TEMPLATE
+    """
+    The render template of the class, computed when the class is created.
+    See `_RenderTemplate` for details.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._render_template = _compile_render_template(cls, ">")
+
     def __init__(self, *args: ElementType | None) -> None:
         """
         Initialization.
@@ -102,8 +216,7 @@ class ChildrenOnlyElement(IElement):
         """The child elements."""
 
     def __str__(self) -> str:
-        name: str = self.element_name
-        return f"<{name}>{format_element_sequence(self.children, element_formatter=xml_format_element, inline=self.inline_children)}</{name}>"
+        return _render_with(self, _children_only_element_parts)
 
     @property
     def element_name(self) -> str:
@@ -138,6 +251,16 @@ class Element(IElement):
 
     __slots__ = ("children", "properties")
 
+    _render_template: _RenderTemplate = _NO_TEMPLATE
+    """
+    The render template of the class, computed when the class is created.
+    See `_RenderTemplate` for details.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._render_template = _compile_render_template(cls, " ")
+
     def __init__(
         self,
         *args: ElementType | None,
@@ -163,17 +286,16 @@ class Element(IElement):
             self.properties["class"] = class_
 
     def __str__(self) -> str:
-        name: str = self.element_name
-        return f"<{name} {format_properties(self.properties)}>{format_element_sequence(self.children, element_formatter=xml_format_element, inline=self.inline_children)}</{name}>"
+        return _render_with(self, _element_parts)
 
     def __getitem__(self, key: str) -> PropertyValue:
         return self.properties[key]
 
     def __setitem__(self, key: str, value: PropertyValue) -> None:
-        self.properties[key] = value
+        _own_properties(self)[key] = value
 
     def __delitem__(self, key: str) -> None:
-        del self.properties[key]
+        del _own_properties(self)[key]
 
     def get(self, key: str, default: PropertyValue = None) -> PropertyValue:
         """
@@ -213,17 +335,7 @@ class ElementSequence(ChildrenOnlyElement):
     __slots__ = ()
 
     def __str__(self) -> str:
-        return (
-            ""
-            if len(self.children) == 0
-            else "\n".join(
-                (
-                    xml_format_element(element)
-                    for element in self.children
-                    if element is not None
-                )
-            )
-        )
+        return _render_with(self, _element_sequence_parts)
 
 
 class EmptyElement(IElement):
@@ -238,6 +350,16 @@ class EmptyElement(IElement):
 
     __slots__ = ("properties",)
 
+    _render_template: _RenderTemplate = _NO_TEMPLATE
+    """
+    The render template of the class, computed when the class is created.
+    See `_RenderTemplate` for details.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._render_template = _compile_render_template(cls, " ")
+
     def __init__(
         self, *, class_: Optional[str] = None, **kwargs: PropertyValue
     ) -> None:
@@ -254,17 +376,16 @@ class EmptyElement(IElement):
             self.properties["class"] = class_
 
     def __str__(self) -> str:
-        name: str = self.element_name
-        return f"<{name} {format_properties(self.properties)}></{name}>"
+        return _empty_element_parts(self)[0]
 
     def __getitem__(self, key: str) -> PropertyValue:
         return self.properties[key]
 
     def __setitem__(self, key: str, value: PropertyValue) -> None:
-        self.properties[key] = value
+        _own_properties(self)[key] = value
 
     def __delitem__(self, key: str) -> None:
-        del self.properties[key]
+        del _own_properties(self)[key]
 
     def get(self, key: str, default: PropertyValue = None) -> PropertyValue:
         """
@@ -287,6 +408,45 @@ class EmptyElement(IElement):
         return self.__class__.__name__
 
 
+class FrozenElement(IElement):
+    """
+    Immutable element that holds the pre-rendered markup of another element.
+
+    The markup is created only once, when the element is frozen. Afterwards it is returned as is
+    by `__str__()` and it is inserted directly into the markup of parent elements.
+
+    Instances should be created using `freeze()`.
+    """
+
+    __slots__ = ("_markup",)
+
+    def __init__(self, element: ElementType) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            element: The element to freeze.
+        """
+        self._markup: str = render(element)
+        """The markup of the frozen element."""
+
+    def __str__(self) -> str:
+        return self._markup
+
+    def __setitem__(self, key: str, value: PropertyValue) -> None:
+        raise TypeError(f"{self.__class__.__name__} is immutable.")
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError(f"{self.__class__.__name__} is immutable.")
+
+    @property
+    def markup(self) -> str:
+        """
+        Inherited.
+        """
+        return self._markup
+
+
 class SelfClosedElement(EmptyElement):
     """
     Self-closed version of `EmptyElement`.
@@ -297,7 +457,7 @@ class SelfClosedElement(EmptyElement):
     __slots__ = ()
 
     def __str__(self) -> str:
-        return f"<{self.element_name} {format_properties(self.properties)}/>"
+        return _self_closed_element_parts(self)[0]
 
 
 class StandaloneElement(EmptyElement):
@@ -310,7 +470,7 @@ class StandaloneElement(EmptyElement):
     __slots__ = ()
 
     def __str__(self) -> str:
-        return f"<{self.element_name} {format_properties(self.properties)}>"
+        return _standalone_element_parts(self)[0]
 
 
 class StringElement(IElement):
@@ -325,6 +485,16 @@ class StringElement(IElement):
 
     __slots__ = ("properties", "value")
 
+    _render_template: _RenderTemplate = _NO_TEMPLATE
+    """
+    The render template of the class, computed when the class is created.
+    See `_RenderTemplate` for details.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._render_template = _compile_render_template(cls, " ")
+
     def __init__(
         self, value: str, *, class_: Optional[str] = None, **kwargs: PropertyValue
     ) -> None:
@@ -349,18 +519,16 @@ class StringElement(IElement):
             self.properties["class"] = class_
 
     def __str__(self) -> str:
-        name: str = self.element_name
-        value = xml_escape(self.value) if self.value is not None else ""
-        return f"<{name} {format_properties(self.properties)}>{value}</{name}>"
+        return _string_element_parts(self)[0]
 
     def __getitem__(self, key: str) -> PropertyValue:
         return self.properties[key]
 
     def __setitem__(self, key: str, value: PropertyValue) -> None:
-        self.properties[key] = value
+        _own_properties(self)[key] = value
 
     def __delitem__(self, key: str) -> None:
-        del self.properties[key]
+        del _own_properties(self)[key]
 
     def get(self, key: str, default: PropertyValue = None) -> PropertyValue:
         """
@@ -381,3 +549,1333 @@ class StringElement(IElement):
         The default value is `self.__class__.__name__`.
         """
         return self.__class__.__name__
+
+
+class CachedMixin(IElement):
+    """
+    Mixin for elements that keep their rendered markup until they are modified.
+
+    The mixin must precede the element base class in the list of base classes, and derived
+    classes must define the `_cached_markup`, `_parents`, and `__weakref__` slots, for example:
+
+    ```Python
+    class tr(CachedMixin, Element):
+        __slots__ = ("_cached_markup", "_parents", "__weakref__")
+    ```
+
+    `CachedElement`, `CachedEmptyElement`, and `CachedStringElement` are ready-to-use
+    cached versions of the corresponding base elements.
+
+    Setting a public attribute (for example `children`) or changing properties using
+    `__setitem__()` or `__delitem__()` invalidates the markup of the element and the markup
+    of the cached elements that contained it when they were last rendered. Rendering a parent
+    element reuses the stored markup of unchanged cached descendants.
+
+    Every stored markup contains the markup of all the descendants of the element, so storing
+    the markup of every cached element of a deep tree would take memory proportional to the
+    square of its depth. To avoid this, descendants whose markup is longer than half of the
+    markup of their closest cached ancestor don't keep their markup when the ancestor is
+    rendered, the ancestor renders them again (reusing the markup of their descendants)
+    the next time it is rendered. This way, for example the stored markup of a chain of
+    nested cached elements is not longer than twice the markup of the chain.
+
+    Changes that are made to non-cached descendants or directly to the `properties` dictionary
+    are not detected, use `invalidate_markup()` in these cases.
+
+    Cached elements that are rendered by the custom `__str__()` method of a non-cached
+    descendant are linked to the closest cached ancestor as well, as long as they are
+    converted to string in the same thread or task.
+
+    Pickled (and copied) elements don't include the stored markup and the links to cached
+    ancestors, the restored elements are rendered again when they are first converted to string.
+    """
+
+    __slots__ = ()
+
+    _cached_markup: Optional[str]
+    """The stored markup of the element, `None` if the element must be rendered."""
+
+    _parents: Optional["WeakSet[CachedMixin]"]
+    """The closest cached ancestors the element was rendered in."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._cached_markup = None
+        self._parents = None
+        super().__init__(*args, **kwargs)
+
+    def __str__(self) -> str:
+        parent = _render_parent.get()
+        if parent is not None:
+            # Rendered by the custom `__str__()` of a descendant of a cached element.
+            self._link_parent(parent)
+        markup = self._cached_markup
+        if markup is None:
+            markup = self._cached_markup = _render_cached(self)
+        return markup
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name[0] != "_":
+            self.invalidate_markup()
+
+    def __getstate__(self) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Returns the state of the element for pickling: the instance dictionary (if there is
+        one) and the values of the slots, except the stored markup and the links to
+        cached ancestors, which can not be pickled.
+        """
+        slot_values: Dict[str, Any] = {}
+        for base in type(self).__mro__:
+            slots = base.__dict__.get("__slots__", ())
+            for name in (slots,) if isinstance(slots, str) else slots:
+                if name not in _UNPICKLED_SLOTS and hasattr(self, name):
+                    slot_values[name] = getattr(self, name)
+
+        return getattr(self, "__dict__", None) or None, slot_values
+
+    def __setstate__(
+        self, state: Tuple[Optional[Dict[str, Any]], Dict[str, Any]]
+    ) -> None:
+        """
+        Restores the state that was created by `__getstate__()`.
+
+        Arguments:
+            state: The instance dictionary - slot values pair to restore.
+        """
+        attributes, slot_values = state
+        if attributes:
+            self.__dict__.update(attributes)
+        for name, value in slot_values.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_cached_markup", None)
+        object.__setattr__(self, "_parents", None)
+
+    def __setitem__(self, key: str, value: PropertyValue) -> None:
+        super().__setitem__(key, value)  # type: ignore[misc]
+        self.invalidate_markup()
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)  # type: ignore[misc]
+        self.invalidate_markup()
+
+    def invalidate_markup(self) -> None:
+        """
+        Discards the stored markup of the element and of the cached elements it was rendered in.
+        """
+        elements: List[CachedMixin] = [self]
+        while elements:
+            element = elements.pop()
+            element._cached_markup = None
+            parents = getattr(element, "_parents", None)
+            if parents:
+                # The links are restored when the ancestors are rendered again, removing them
+                # makes repeated invalidation cheap. Ancestors are visited even if they have
+                # no stored markup, because descendants may keep their markup without them.
+                element._parents = None
+                elements.extend(parents)
+
+    def _link_parent(self, parent: "CachedMixin") -> None:
+        """
+        Registers the given element as a cached ancestor of this element.
+
+        Arguments:
+            parent: The closest cached ancestor the element is being rendered in.
+        """
+        parents = self._parents
+        if parents is None:
+            parents = self._parents = WeakSet()
+        parents.add(parent)
+
+    def _render_uncached(self) -> str:
+        """
+        Renders the element using the `__str__()` method of the element class `CachedMixin`
+        was combined with. Used only if that method is not a built-in one.
+        """
+        mro = type(self).__mro__
+        for base in mro[mro.index(CachedMixin) + 1 :]:
+            render_str = base.__dict__.get("__str__")
+            if render_str is not None:
+                return render_str(self)  # type: ignore[no-any-return]
+
+        raise NotImplementedError("CachedMixin must be combined with an element class.")
+
+
+_UNPICKLED_SLOTS = frozenset(("__dict__", "__weakref__", "_cached_markup", "_parents"))
+"""The slots of `CachedMixin` elements that are not included in their pickled state."""
+
+
+class CachedElement(CachedMixin, Element):
+    """
+    `Element` that keeps its rendered markup until it is modified. See `CachedMixin` for details.
+    """
+
+    __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+
+class CachedEmptyElement(CachedMixin, EmptyElement):
+    """
+    `EmptyElement` that keeps its rendered markup until it is modified.
+    See `CachedMixin` for details.
+    """
+
+    __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+
+class CachedStringElement(CachedMixin, StringElement):
+    """
+    `StringElement` that keeps its rendered markup until it is modified.
+    See `CachedMixin` for details.
+    """
+
+    __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+
+# -- Rendering
+
+RenderParts = Tuple[str, Optional[Sequence[Optional[ElementType]]], int, str]
+"""
+Opening markup - children - separator mode - closing markup tuple that describes how an element
+must be rendered. `None` children means the element has no children block at all.
+The separator mode is one of the `RenderMode` constants.
+"""
+
+
+class RenderMode:
+    """
+    Separator modes of the children of elements, see `RenderParts`.
+    """
+
+    BLOCK = _BLOCK
+    """Each child is placed on a new line, the children block is wrapped in new lines."""
+
+    INLINE = _INLINE
+    """Children are placed on the same line, separated by spaces."""
+
+    SEQUENCE = _SEQUENCE
+    """Children are separated by new lines, there is no wrapping."""
+
+
+class PartsElement(IElement):
+    """
+    Base class for elements that describe their markup with `RenderParts`.
+
+    Derived classes implement `get_render_parts()` instead of `__str__()`, so the renderer
+    can render them and their children without calling `__str__()` recursively.
+
+    Define `__slots__` in derived classes to enjoy the performance benefits the feature provides.
+    """
+
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        return _render_with(self, _parts_element_parts)
+
+    def get_render_parts(self) -> RenderParts:
+        """
+        Returns the `RenderParts` that describe how the element must be rendered.
+        """
+        raise NotImplementedError(
+            "PartsElement is abstract, please override get_render_parts() in the child class."
+        )
+
+
+_RenderHandler = Callable[[Any], RenderParts]
+
+_render_parent: "ContextVar[Optional[CachedMixin]]" = ContextVar(
+    "markyp_render_parent", default=None
+)
+"""
+The closest cached ancestor of the element whose custom `__str__()` is being called by the
+renderer. Cached elements that are rendered by that method are linked to this ancestor.
+"""
+
+
+def freeze(element: ElementType) -> FrozenElement:
+    """
+    Renders the given element and returns an immutable element that holds the created markup.
+
+    Freezing is useful for static parts of documents (for example navigation bars or footers)
+    that are included in many documents, because their markup is created only once.
+
+    Arguments:
+        element: The element to freeze. Modifying it after freezing has no effect on the
+                 returned element.
+
+    Returns:
+        The frozen element. If `element` is already frozen, then it is returned as is.
+    """
+    return element if isinstance(element, FrozenElement) else FrozenElement(element)
+
+
+def has_structural_markup(cls: type) -> bool:
+    """
+    Returns whether the markup of the instances of the given element class depends only
+    on their attributes, i.e. whether the class is rendered by a built-in render handler.
+    Instances of such classes with equal attributes and children render identically,
+    so they can be merged or frozen (see `markyp.utils.deduplicate()`).
+
+    `BaseElement` subclasses and classes that override `__str__()` may create different
+    markup every time they are rendered.
+
+    Arguments:
+        cls: An element class.
+    """
+    if issubclass(cls, BaseElement):
+        return False
+    if issubclass(cls, CachedMixin):
+        return _get_cached_base_handler(cls) is not None
+    return cls.__str__ in _render_handlers
+
+
+def iter_markup(element: ElementType, chunk_size: int = 8192) -> Iterator[str]:
+    """
+    Generator that renders the given element and yields its markup in chunks.
+
+    Markup fragments are coalesced into chunks of about `chunk_size` characters, the last
+    chunk may be shorter. The generator can be used for example as a WSGI response body,
+    so the markup of large documents never has to exist as a single string.
+
+    Elements whose class overrides `__str__()` are converted to string using their own
+    implementation and are always yielded in a single chunk.
+
+    Arguments:
+        element: The element to render.
+        chunk_size: The minimum size of yielded chunks (except the last one) in characters.
+
+    Raises:
+        ValueError: If `chunk_size` is not positive.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+
+    yield from _iter_markup(
+        [_to_render_item(element)], chunk_size, _render_parent.get()
+    )
+
+
+def render(element: ElementType) -> str:
+    """
+    Renders the given element including all its children.
+
+    The whole element tree is rendered in a single pass into one buffer instead of creating
+    the markup of every element separately. String elements are XML-escaped.
+
+    The tree is traversed using an explicit stack instead of recursion, so the depth of
+    the rendered tree is not limited by the recursion limit of the interpreter.
+
+    Elements whose class overrides `__str__()` are converted to string using their own
+    implementation.
+
+    Arguments:
+        element: The element to render.
+
+    Returns:
+        The markup of the element.
+    """
+    root = _render_parent.get()
+    if root is not None:
+        return "".join(_iter_markup([_to_render_item(element)], sys.maxsize, root))
+
+    item = _to_render_item(element)
+    if isinstance(item, str):
+        return item
+
+    handler = _render_handlers.get(type(item).__str__)  # type: ignore[arg-type]
+    return str(item) if handler is None else _render_parts(handler(item))
+
+
+def render_to(
+    element: ElementType,
+    writable: Any,
+    encoding: str = "utf-8",
+    compress: Optional[str] = None,
+    *,
+    chunk_size: int = 65536,
+) -> int:
+    """
+    Renders the given element, encodes and optionally compresses the markup incrementally,
+    and writes the result into the given binary file-like or socket-like object.
+
+    The markup is processed in chunks, so the full markup, its encoded, and its compressed
+    version never have to exist in memory. Output data is written in batches of about
+    `chunk_size` bytes, using the `writelines()` method of the object if it has one,
+    its `sendall()` method if it is a socket-like object, and its `write()` method otherwise.
+
+    Arguments:
+        element: The element to render.
+        writable: The binary file-like or socket-like object to write the data to.
+        encoding: The encoding to use.
+        compress: The compression to apply, either `None`, `"gzip"` or `"zlib"`.
+        chunk_size: The size of markup chunks in characters and the minimum size of written
+                    batches (except the last one) in bytes.
+
+    Returns:
+        The number of bytes that were written.
+
+    Raises:
+        ValueError: If `compress` or `chunk_size` is invalid.
+        LookupError: If `encoding` is unknown.
+    """
+    compressor: Any
+    if compress is None:
+        compressor = None
+    elif compress == "gzip":
+        compressor = zlib.compressobj(wbits=31)
+    elif compress == "zlib":
+        compressor = zlib.compressobj()
+    else:
+        raise ValueError(f"Unsupported compression: {compress}")
+
+    encode = codecs.getincrementalencoder(encoding)().encode
+    write = _get_batch_writer(writable)
+    batch: List[bytes] = []
+    size = written = 0
+    for chunk in iter_markup(element, chunk_size):
+        data = encode(chunk)
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            batch.append(data)
+            size += len(data)
+            if size >= chunk_size:
+                write(batch)
+                written += size
+                batch = []
+                size = 0
+
+    data = encode("", True)
+    if compressor is not None:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        batch.append(data)
+        size += len(data)
+    if size > 0:
+        write(batch)
+        written += size
+
+    return written
+
+
+async def arender(element: Any, chunk_size: int = 8192) -> AsyncIterator[str]:
+    """
+    Async generator that renders the given element and yields its markup in chunks.
+
+    Besides the usual child elements, the rendered tree may contain awaitables and async
+    iterables as children (and the rendered element itself may also be an awaitable):
+
+    - Awaitables are rendered as the child element they resolve to.
+    - The items of async iterables are rendered as if they were the children
+      of an `ElementSequence`.
+
+    All awaitables and async iterables of the tree are started concurrently as soon as
+    rendering begins (nested ones as soon as their parent resolves), but the markup is
+    always yielded in document order. Markup that precedes a pending awaitable is yielded
+    before waiting for it, even if it is shorter than `chunk_size`.
+
+    Elements whose class overrides `__str__()` are converted to string using their own
+    implementation, so their children can not be awaitables.
+
+    Arguments:
+        element: The element to render.
+        chunk_size: The minimum size of yielded chunks (except the ones that precede
+                    a pending awaitable and the last one) in characters.
+
+    Raises:
+        ValueError: If `chunk_size` is not positive.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+
+    renderer = _AsyncRenderer()
+    try:
+        async for chunk in renderer.render(element, chunk_size):
+            yield chunk
+    finally:
+        renderer.cancel()
+
+
+def _render_with(element: IElement, handler: _RenderHandler) -> str:
+    """
+    Renders the given element using the given render handler for the element itself.
+
+    Arguments:
+        element: The element to render.
+        handler: The render handler to use for `element`.
+    """
+    parts = handler(element)
+    if not parts[1]:
+        # Elements without children don't need to be traversed.
+        return parts[0] + parts[3]
+
+    root = _render_parent.get()
+    if root is None:
+        return _render_parts(parts)
+
+    stack: List[Any] = []
+    _push_parts(parts, stack)
+    return "".join(_iter_markup(stack, sys.maxsize, root))
+
+
+def _render_parts(parts: RenderParts) -> str:
+    """
+    Renders the element described by the given render parts, including all its descendants.
+
+    Strings and elements without children are appended to the output buffer directly, only
+    elements with children are placed on the stack, together with the position of the child
+    that must be rendered next. `CachedMixin` elements and elements whose `__str__()` is not
+    a built-in one are converted to string using `str()`.
+
+    Arguments:
+        parts: The render parts of the element.
+    """
+    head, children, mode, tail = parts
+    if not children:
+        return head + tail
+
+    handlers = _render_handlers
+    escape = _formatters._xml_escaper
+    out: List[str] = [head]
+    append = out.append
+    stack = [_create_frame(children, mode, tail)]
+    while stack:
+        frame = stack[-1]
+        items, separator, tail, started = frame
+        for child in items:
+            if child is None:
+                continue
+            if started:
+                append(separator)
+            else:
+                started = True
+
+            if isinstance(child, str):
+                # Most strings need no escaping, and the check is cheaper than the call.
+                if "&" in child or "<" in child or ">" in child:
+                    child = escape(child)
+                append(child)
+                continue
+
+            handler = handlers.get(type(child).__str__)  # type: ignore[arg-type]
+            if handler is None:
+                append(str(child))
+                continue
+
+            head, children, mode, child_tail = handler(child)
+            if not children:
+                append(head + child_tail)
+                continue
+
+            frame[3] = started
+            append(head)
+            stack.append(_create_frame(children, mode, child_tail))
+            break
+        else:
+            stack.pop()
+            append(tail)
+
+    return "".join(out)
+
+
+def _create_frame(
+    children: Sequence[Optional[ElementType]], mode: int, tail: str
+) -> List[Any]:
+    """
+    Creates the `_render_parts()` stack frame of an element: a children iterator - separator -
+    closing markup - whether the next child must be preceded by the separator list.
+
+    Block children are all preceded by a new line, and so is the closing markup.
+
+    Arguments:
+        children: The children of the element.
+        mode: The separator mode of the children.
+        tail: The closing markup of the element.
+    """
+    if mode == _BLOCK:
+        return [iter(children), "\n", "\n" + tail, True]
+    return [iter(children), " " if mode == _INLINE else "\n", tail, False]
+
+
+def _get_batch_writer(writable: Any) -> Callable[[List[bytes]], None]:
+    """
+    Returns a function that writes a batch of byte strings into the given binary file-like
+    or socket-like object.
+
+    Arguments:
+        writable: The object to write the data to.
+    """
+    if hasattr(writable, "writelines"):
+        return writable.writelines  # type: ignore[no-any-return]
+
+    if hasattr(writable, "sendall"):
+        sendall = writable.sendall
+        return lambda batch: sendall(b"".join(batch))
+
+    write = writable.write
+
+    def write_batch(batch: List[bytes]) -> None:
+        for data in batch:
+            write(data)
+
+    return write_batch
+
+
+def _to_render_item(
+    element: Optional[ElementType], convert: Callable[[Any], Any] = str
+) -> Any:
+    """
+    Converts the given child element into an item that can be placed on the render stack.
+
+    Strings are XML-escaped, `IElement` instances are returned as is, any other value is
+    converted using `convert`.
+
+    Arguments:
+        element: The element to convert.
+        convert: The function to use to convert values that are neither strings nor `IElement`
+                 instances into render stack items.
+    """
+    if isinstance(element, str):
+        return _formatters._xml_escaper(element)
+    if isinstance(element, IElement):
+        return element
+    return convert(element)
+
+
+def _iter_markup(
+    stack: List[Any], chunk_size: int, root: Optional["CachedMixin"] = None
+) -> Iterator[str]:
+    """
+    Generator that processes the given render stack and yields the created markup in chunks
+    of at least `chunk_size` characters (except for the last chunk).
+
+    The render stack contains markup fragments (strings that must be written as they are),
+    `IElement` instances that must be rendered, and `_Capture` markers that complete the
+    rendering of a `CachedMixin` element. The last item of the stack is processed first.
+
+    The generator processes the stack without the bookkeeping of cached elements until
+    it reaches a `CachedMixin` element, then it continues with `_iter_cached_markup()`.
+
+    Arguments:
+        stack: The render stack to process.
+        chunk_size: The minimum size of yielded chunks (except the last one).
+        root: The cached element whose children are on the render stack, if there is one.
+    """
+    out: List[str] = []
+    if root is not None:
+        yield from _iter_cached_markup(stack, chunk_size, root, out, 0)
+        return
+
+    handlers = _render_handlers
+    append = out.append
+    pop = stack.pop
+    # Fragments are only counted if the markup is yielded in chunks.
+    sized = chunk_size != sys.maxsize
+    size = 0
+    while stack:
+        item = pop()
+        if not isinstance(item, str):
+            handler = handlers.get(type(item).__str__)  # type: ignore[arg-type]
+            if handler is not None:
+                _push_parts(handler(item), stack)
+                continue
+
+            if isinstance(item, CachedMixin):
+                stack.append(item)
+                yield from _iter_cached_markup(stack, chunk_size, None, out, size)
+                return
+
+            item = str(item)
+
+        append(item)
+        if sized:
+            size += len(item)
+            if size >= chunk_size:
+                yield "".join(out)
+                out.clear()
+                size = 0
+
+    markup = "".join(out)
+    if markup:
+        yield markup
+
+
+def _iter_cached_markup(
+    stack: List[Any],
+    chunk_size: int,
+    root: Optional["CachedMixin"],
+    out: List[str],
+    size: int,
+    captures: Optional[List["_Capture"]] = None,
+) -> Iterator[str]:
+    """
+    Continues the processing of the given render stack like `_iter_markup()`, reusing and
+    storing the markup of `CachedMixin` elements and linking them to their cached ancestors.
+
+    Elements with a custom `__str__()` are converted to string with the closest cached
+    ancestor set as the render parent (see `_render_parent`), so the cached elements they
+    render are linked to that ancestor as well.
+
+    Arguments:
+        stack: The render stack to process.
+        chunk_size: The minimum size of yielded chunks (except the last one).
+        root: The cached element whose children are on the render stack, if there is one.
+        out: The markup fragments that have not been yielded yet.
+        size: The total length of the fragments in `out`.
+        captures: The `_Capture` markers on the render stack whose elements are being
+                  rendered, if the stack doesn't start with a whole element. Their
+                  markup must start with the first fragment of the render stack.
+    """
+    handlers = _render_handlers
+    if captures is None:
+        captures = []
+    # The markup fragments of the elements of `captures` and their length.
+    fragments: List[str] = []
+    fragments_size = 0
+    append = out.append
+    pop = stack.pop
+    sized = chunk_size != sys.maxsize
+    while stack:
+        item = pop()
+        if not isinstance(item, str):
+            render_str = type(item).__str__
+            handler = handlers.get(render_str)  # type: ignore[arg-type]
+            if handler is not None:
+                _push_parts(handler(item), stack)
+                continue
+
+            if render_str is _cached_str:
+                parent = captures[-1].element if captures else root
+                if parent is not None:
+                    item._link_parent(parent)
+                markup = item._cached_markup
+                if markup is None:
+                    handler = _get_cached_base_handler(type(item))
+                    if handler is not None:
+                        capture = _Capture(item, len(fragments), fragments_size)
+                        captures.append(capture)
+                        stack.append(capture)
+                        _push_parts(handler(item), stack)
+                        continue
+
+                    markup = item._cached_markup = _render_in(
+                        item, item._render_uncached
+                    )
+                if captures:
+                    captures[-1].reused.append(item)
+                item = markup
+            elif isinstance(item, _Capture):
+                # The markup of descendants is stored (or discarded) here, when the length
+                # of the markup of their closest cached ancestor is known, see `CachedMixin`.
+                captures.pop()
+                element = item.element
+                start, stop = item.start, len(fragments)
+                length = fragments_size - item.size
+                limit = length // 2
+                for descendant, first, end, descendant_length in item.descendants:
+                    if descendant_length <= limit:
+                        descendant._cached_markup = "".join(fragments[first:end])
+                for descendant in item.reused:
+                    if len(descendant._cached_markup or "") > limit:
+                        descendant._cached_markup = None
+                if captures:
+                    captures[-1].descendants.append((element, start, stop, length))
+                else:
+                    element._cached_markup = "".join(fragments[start:stop])
+                    fragments.clear()
+                    fragments_size = 0
+                continue
+            else:
+                parent = captures[-1].element if captures else root
+                if parent is not None and isinstance(item, CachedMixin):
+                    item._link_parent(parent)
+                item = _render_in(parent, item.__str__)
+
+        append(item)
+        if captures:
+            fragments.append(item)
+            fragments_size += len(item)
+        if sized:
+            size += len(item)
+            if size >= chunk_size:
+                yield "".join(out)
+                out.clear()
+                size = 0
+
+    markup = "".join(out)
+    if markup:
+        yield markup
+
+
+def _render_in(parent: Optional["CachedMixin"], render_str: Callable[[], str]) -> str:
+    """
+    Calls the given render function with the given element set as the render parent.
+
+    Arguments:
+        parent: The closest cached ancestor of the rendered element, if there is one.
+        render_str: The function that creates the markup.
+    """
+    if parent is None:
+        return render_str()
+
+    token = _render_parent.set(parent)
+    try:
+        return render_str()
+    finally:
+        _render_parent.reset(token)
+
+
+class _Capture:
+    """
+    Render stack marker that completes the rendering of a `CachedMixin` element
+    when it is popped from the render stack.
+    """
+
+    __slots__ = ("descendants", "element", "reused", "size", "start")
+
+    def __init__(self, element: "CachedMixin", start: int, size: int) -> None:
+        self.descendants: List[Tuple[CachedMixin, int, int, int]] = []
+        """
+        Element - first fragment index - end fragment index - markup length tuples of the
+        rendered cached elements the element is the closest cached ancestor of.
+        """
+
+        self.element = element
+        """The element whose markup is being collected."""
+
+        self.reused: List[CachedMixin] = []
+        """
+        The cached elements the element is the closest cached ancestor of
+        whose stored markup was reused.
+        """
+
+        self.size = size
+        """The total length of the captured fragments before the markup of the element."""
+
+        self.start = start
+        """The index of the first captured fragment of the element."""
+
+
+def _render_cached(element: "CachedMixin") -> str:
+    """
+    Renders the given cached element that has no stored markup.
+
+    Arguments:
+        element: The element to render.
+    """
+    handler = _get_cached_base_handler(type(element))
+    if handler is None:
+        return _render_in(element, element._render_uncached)
+
+    capture = _Capture(element, 0, 0)
+    stack: List[Any] = [capture]
+    _push_parts(handler(element), stack)
+    return "".join(_iter_cached_markup(stack, sys.maxsize, None, [], 0, [capture]))
+
+
+def _get_cached_base_handler(cls: type) -> Optional[_RenderHandler]:
+    """
+    Returns the render handler of the element class `CachedMixin` was combined with
+    in the given class (the first class after `CachedMixin` in the MRO that defines
+    `__str__()`), or `None` if that class has no built-in render handler.
+
+    Arguments:
+        cls: A `CachedMixin` subclass.
+    """
+    mro = cls.__mro__
+    for base in mro[mro.index(CachedMixin) + 1 :]:
+        render_str = base.__dict__.get("__str__")
+        if render_str is not None:
+            return _render_handlers.get(render_str)
+
+    return None
+
+
+def _push_parts(parts: RenderParts, stack: List[Any]) -> None:
+    """
+    Pushes the opening markup, the children, and the closing markup of the given render parts
+    onto the render stack in reverse order.
+
+    Arguments:
+        parts: The render parts of an element.
+        stack: The render stack.
+    """
+    head, children, mode, tail = parts
+    push = stack.append
+    if not children:
+        push(head + tail)
+        return
+
+    push(tail)
+    escape = _formatters._xml_escaper
+    if mode == _BLOCK:
+        for child in reversed(children):
+            if child is None:
+                continue
+            push("\n")
+            if isinstance(child, str):
+                push(escape(child))
+            elif isinstance(child, IElement):
+                push(child)
+            else:
+                push(str(child))
+        push("\n")
+    else:
+        separator = " " if mode == _INLINE else "\n"
+        first = True
+        for child in reversed(children):
+            if child is None:
+                continue
+            if first:
+                first = False
+            else:
+                push(separator)
+            if isinstance(child, str):
+                push(escape(child))
+            elif isinstance(child, IElement):
+                push(child)
+            else:
+                push(str(child))
+    push(head)
+
+
+class _AsyncRenderer:
+    """
+    Renderer that resolves awaitable and async iterable children concurrently.
+
+    The element tree is first converted into a list of segments: markup fragments, tasks
+    that resolve to a segment list, and queues that receive a segment list for each item
+    of an async iterable. Segments are then yielded in order, waiting for tasks and queues
+    only when the rendering reaches them.
+    """
+
+    __slots__ = ("_tasks",)
+
+    _END = object()
+    """Marker that is placed in a queue when the corresponding async iterable is exhausted."""
+
+    def __init__(self) -> None:
+        self._tasks: List["asyncio.Future[Any]"] = []
+        """The tasks that were started by the renderer."""
+
+    def cancel(self) -> None:
+        """
+        Cancels all pending tasks of the renderer.
+        """
+        for task in self._tasks:
+            task.cancel()
+
+    async def render(self, element: Any, chunk_size: int) -> AsyncIterator[str]:
+        """
+        Async generator that renders the given element and yields the created markup.
+
+        Arguments:
+            element: The element to render.
+            chunk_size: The minimum size of yielded chunks, see `arender()`.
+        """
+        import asyncio  # Imported on first use, it is slow to import.
+
+        pending = self._segments(element)
+        pending.reverse()
+        out: List[str] = []
+        size = 0
+        while pending:
+            segment = pending.pop()
+            if isinstance(segment, _Separator):
+                started = segment.started
+                if not started[0]:
+                    # The first rendered child of the block has no separator.
+                    started[0] = True
+                    continue
+                segment = segment.separator
+
+            if isinstance(segment, str):
+                out.append(segment)
+                size += len(segment)
+                if size >= chunk_size:
+                    yield "".join(out)
+                    out.clear()
+                    size = 0
+                continue
+
+            if isinstance(segment, asyncio.Queue):
+                if segment.empty() and size > 0:
+                    yield "".join(out)
+                    out.clear()
+                    size = 0
+
+                segments = await segment.get()
+                if segments is self._END:
+                    continue
+                if isinstance(segments, BaseException):
+                    raise segments
+
+                pending.append(segment)
+            else:
+                if not segment.done() and size > 0:
+                    yield "".join(out)
+                    out.clear()
+                    size = 0
+
+                segments = await segment
+
+            pending.extend(reversed(segments))
+
+        if size > 0:
+            yield "".join(out)
+
+    def _segments(self, element: Any) -> List[Any]:
+        """
+        Renders the given element into a segment list, starting all awaitables and
+        async iterables it contains.
+
+        Arguments:
+            element: The element to render.
+        """
+        handlers = _render_handlers
+        result: List[Any] = []
+        append = result.append
+        stack: List[Any] = [_to_render_item(element, self._start)]
+        pop = stack.pop
+        while stack:
+            item = pop()
+            if isinstance(item, IElement):
+                handler = handlers.get(type(item).__str__)  # type: ignore[arg-type]
+                if handler is None:
+                    append(str(item))
+                else:
+                    self._push_parts(handler(item), stack)
+            else:
+                append(item)
+
+        return result
+
+    def _push_parts(self, parts: RenderParts, stack: List[Any]) -> None:
+        """
+        Pushes the segments of the given render parts onto the stack of `_segments()`
+        in reverse order.
+
+        Works like `_push_parts()`, but awaitable children are started, and the separator
+        of an awaitable child is added to its segment list, so no separator is rendered
+        for awaitables that resolve to `None`.
+
+        Arguments:
+            parts: The render parts of an element.
+            stack: The stack of `_segments()`.
+        """
+        head, children, mode, tail = parts
+        push = stack.append
+        if not children:
+            push(head + tail)
+            return
+
+        push(tail)
+        start = self._start
+        if mode == _BLOCK:
+            for child in reversed(children):
+                if child is None:
+                    continue
+                if _is_awaitable_child(child):
+                    push(start(child, suffix="\n"))
+                else:
+                    push("\n")
+                    push(_to_render_item(child, start))
+            push("\n")
+        else:
+            separator = _Separator(" " if mode == _INLINE else "\n", [False])
+            for child in reversed(children):
+                if child is None:
+                    continue
+                if _is_awaitable_child(child):
+                    push(start(child, prefix=separator))
+                else:
+                    push(_to_render_item(child, start))
+                    push(separator)
+        push(head)
+
+    def _start(self, value: Any, prefix: Any = None, suffix: Any = None) -> Any:
+        """
+        Converts the given child value into a segment, starting it if it is an awaitable
+        or an async iterable.
+
+        Arguments:
+            value: The child value to convert.
+            prefix: Segment to place before the segments of an awaitable
+                    if it doesn't resolve to `None`.
+            suffix: Segment to place after the segments of an awaitable
+                    if it doesn't resolve to `None`.
+        """
+        import asyncio
+
+        if inspect.isawaitable(value):
+            task = asyncio.ensure_future(self._resolve(value, prefix, suffix))
+            self._tasks.append(task)
+            return task
+
+        if hasattr(value, "__aiter__"):
+            queue: "asyncio.Queue[Any]" = asyncio.Queue()
+            self._tasks.append(asyncio.ensure_future(self._drain(value, queue)))
+            return queue
+
+        return str(value)
+
+    async def _resolve(
+        self, awaitable: Awaitable[Any], prefix: Any, suffix: Any
+    ) -> List[Any]:
+        """
+        Awaits the given awaitable and returns the segment list of its result.
+
+        Arguments:
+            awaitable: The awaitable to resolve.
+            prefix: Segment to place before the segments of the result, if it is not `None`.
+            suffix: Segment to place after the segments of the result, if it is not `None`.
+        """
+        value = await awaitable
+        if value is None:
+            return []
+
+        segments = self._segments(value)
+        if prefix is not None:
+            segments.insert(0, prefix)
+        if suffix is not None:
+            segments.append(suffix)
+        return segments
+
+    async def _drain(
+        self, iterable: AsyncIterable[Any], queue: "asyncio.Queue[Any]"
+    ) -> None:
+        """
+        Consumes the given async iterable and places the segment list of its items
+        into the given queue.
+
+        Exceptions raised by the iterable are placed in the queue, and `_END` is placed
+        in the queue when the iterable is exhausted.
+
+        Arguments:
+            iterable: The async iterable to consume.
+            queue: The queue to put the segment lists into.
+        """
+        first = True
+        try:
+            async for value in iterable:
+                if value is None:
+                    continue
+                segments = self._segments(value)
+                if first:
+                    first = False
+                else:
+                    segments.insert(0, "\n")
+                queue.put_nowait(segments)
+        except Exception as e:
+            queue.put_nowait(e)
+        else:
+            queue.put_nowait(self._END)
+
+
+class _Separator:
+    """
+    Separator segment of the children of an element that is rendered asynchronously.
+
+    Separators are rendered before every rendered child of the element except the first one.
+    """
+
+    __slots__ = ("separator", "started")
+
+    def __init__(self, separator: str, started: List[bool]) -> None:
+        self.separator = separator
+        """The separator string."""
+
+        self.started = started
+        """Single-item list that holds whether a child of the element has been rendered."""
+
+
+def _is_awaitable_child(child: Any) -> bool:
+    """
+    Returns whether the given child of an asynchronously rendered element is an awaitable.
+
+    Arguments:
+        child: The child to check.
+    """
+    if isinstance(child, (str, IElement)):
+        return False
+
+    return inspect.isawaitable(child)
+
+
+def _own_properties(element: Any) -> PropertyDict:
+    """
+    Returns the properties of the given element, replacing them with a copy first if they
+    are shared.
+
+    Arguments:
+        element: The element whose properties should be returned.
+    """
+    properties: PropertyDict = element.properties
+    if properties.__class__ is SharedProperties:
+        properties = element.properties = dict(properties)
+    return properties
+
+
+def _format_properties(properties: PropertyDict) -> str:
+    """
+    Formats the given properties, using the cached markup of shared properties.
+
+    Arguments:
+        properties: The properties to format.
+    """
+    if not properties:
+        return ""
+    if properties.__class__ is SharedProperties:
+        return properties.markup
+    return format_properties(properties)
+
+
+def _base_element_parts(element: BaseElement) -> RenderParts:
+    name = element.element_name
+    properties = element.get_element_properties()
+    properties_str = _format_properties(properties) if properties is not None else ""
+    return (
+        f"<{name} {properties_str}>",
+        element.get_element_children(),
+        _INLINE if element.inline_children else _BLOCK,
+        f"</{name}>",
+    )
+
+
+def _children_only_element_parts(element: ChildrenOnlyElement) -> RenderParts:
+    cls = element.__class__
+    head, tail, mode, owner, name_attr, inline_attr = cls._render_template
+    if (
+        owner is not cls
+        or name_attr is not cls.element_name
+        or inline_attr is not cls.inline_children
+    ):
+        head, tail, mode, _, _, _ = _update_render_template(cls, ">")
+    if head is None:
+        name = element.element_name
+        head, tail = f"<{name}>", f"</{name}>"
+    if mode is None:
+        mode = _INLINE if element.inline_children else _BLOCK
+    return (head, element.children, mode, tail)  # type: ignore[return-value]
+
+
+def _element_parts(element: Element) -> RenderParts:
+    cls = element.__class__
+    prefix, tail, mode, owner, name_attr, inline_attr = cls._render_template
+    if (
+        owner is not cls
+        or name_attr is not cls.element_name
+        or inline_attr is not cls.inline_children
+    ):
+        prefix, tail, mode, _, _, _ = _update_render_template(cls, " ")
+    if prefix is None:
+        name = element.element_name
+        prefix, tail = f"<{name} ", f"</{name}>"
+    if mode is None:
+        mode = _INLINE if element.inline_children else _BLOCK
+    return (
+        f"{prefix}{_format_properties(element.properties)}>",
+        element.children,
+        mode,
+        tail,  # type: ignore[return-value]
+    )
+
+
+def _element_sequence_parts(element: ElementSequence) -> RenderParts:
+    return ("", element.children, _SEQUENCE, "")
+
+
+def _empty_element_parts(element: EmptyElement) -> RenderParts:
+    cls = element.__class__
+    prefix, tail, _, owner, name_attr, _ = cls._render_template
+    if owner is not cls or name_attr is not cls.element_name:
+        prefix, tail, _, _, _, _ = _update_render_template(cls, " ")
+    if prefix is None:
+        name = element.element_name
+        prefix, tail = f"<{name} ", f"</{name}>"
+    return (
+        f"{prefix}{_format_properties(element.properties)}>{tail}",
+        None,
+        _BLOCK,
+        "",
+    )
+
+
+def _frozen_element_parts(element: FrozenElement) -> RenderParts:
+    return (element._markup, None, _BLOCK, "")
+
+
+def _parts_element_parts(element: PartsElement) -> RenderParts:
+    return element.get_render_parts()
+
+
+def _self_closed_element_parts(element: SelfClosedElement) -> RenderParts:
+    cls = element.__class__
+    prefix, _, _, owner, name_attr, _ = cls._render_template
+    if owner is not cls or name_attr is not cls.element_name:
+        prefix = _update_render_template(cls, " ")[0]
+    if prefix is None:
+        prefix = f"<{element.element_name} "
+    return (
+        f"{prefix}{_format_properties(element.properties)}/>",
+        None,
+        _BLOCK,
+        "",
+    )
+
+
+def _standalone_element_parts(element: StandaloneElement) -> RenderParts:
+    cls = element.__class__
+    prefix, _, _, owner, name_attr, _ = cls._render_template
+    if owner is not cls or name_attr is not cls.element_name:
+        prefix = _update_render_template(cls, " ")[0]
+    if prefix is None:
+        prefix = f"<{element.element_name} "
+    return (
+        f"{prefix}{_format_properties(element.properties)}>",
+        None,
+        _BLOCK,
+        "",
+    )
+
+
+def _string_element_parts(element: StringElement) -> RenderParts:
+    cls = element.__class__
+    prefix, tail, _, owner, name_attr, _ = cls._render_template
+    if owner is not cls or name_attr is not cls.element_name:
+        prefix, tail, _, _, _, _ = _update_render_template(cls, " ")
+    if prefix is None:
+        name = element.element_name
+        prefix, tail = f"<{name} ", f"</{name}>"
+    value = element.value
+    if value is None:
+        value = ""
+    elif "&" in value or "<" in value or ">" in value:
+        value = _formatters._xml_escaper(value)
+    return (
+        f"{prefix}{_format_properties(element.properties)}>{value}{tail}",
+        None,
+        _BLOCK,
+        "",
+    )
+
+
+_render_handlers: Dict[Callable[[Any], str], _RenderHandler] = {
+    BaseElement.__str__: _base_element_parts,
+    ChildrenOnlyElement.__str__: _children_only_element_parts,
+    Element.__str__: _element_parts,
+    ElementSequence.__str__: _element_sequence_parts,
+    EmptyElement.__str__: _empty_element_parts,
+    FrozenElement.__str__: _frozen_element_parts,
+    PartsElement.__str__: _parts_element_parts,
+    SelfClosedElement.__str__: _self_closed_element_parts,
+    StandaloneElement.__str__: _standalone_element_parts,
+    StringElement.__str__: _string_element_parts,
+}
+"""
+Render handlers of the built-in elements, keyed by the `__str__()` method of the elements.
+
+Elements whose `__str__()` method is not in the dictionary are rendered by calling `str()`,
+except `CachedMixin` elements, which are handled by the renderer directly.
+"""
+
+_cached_str = CachedMixin.__str__
+"""The `__str__()` method of `CachedMixin`."""
@@ -2,7 +2,8 @@
 Generic `markyp` element formatters.
 """
 
-from typing import Callable, Sequence, Union
+from functools import lru_cache
+from typing import Callable, Optional, Sequence, Union
 
 from xml.sax.saxutils import escape as xml_escape
 
@@ -10,6 +11,9 @@ from markyp import ElementType, PropertyDict, PropertyValue
 
 
 __all__ = (
+    "create_xml_escaper",
+    "fast_xml_escape",
+    "set_xml_escaper",
     "format_property",
     "format_properties",
     "xml_format_element",
@@ -18,6 +22,105 @@ __all__ = (
 )
 
 
+def _escape(data: str) -> str:
+    """
+    Escapes `&`, `<`, and `>` in the given string. Characters that are not present in the string
+    are not replaced, so strings that need no escaping are returned as is.
+
+    Arguments:
+        data: The string to escape.
+    """
+    amp, lt, gt = "&" in data, "<" in data, ">" in data
+    if amp:
+        data = data.replace("&", "&amp;")
+    if gt:
+        data = data.replace(">", "&gt;")
+    if lt:
+        data = data.replace("<", "&lt;")
+    return data
+
+
+def create_xml_escaper(
+    cache_size: int = 1024, max_cached_length: int = 64
+) -> Callable[[str], str]:
+    """
+    Creates an XML escape function whose output is identical to the output of `xml_escape()`
+    (without additional entities).
+
+    Strings that contain no `&`, `<`, or `>` characters are returned as is without creating
+    a copy. The escaped version of short strings that do need escaping is stored in a bounded
+    LRU cache, so recurring strings (labels, enum values) are escaped only once.
+
+    Arguments:
+        cache_size: The maximum number of escaped strings to keep in the cache.
+                    Zero disables caching.
+        max_cached_length: The maximum length of strings whose escaped value is cached.
+
+    Returns:
+        The created escape function.
+    """
+    if cache_size < 1:
+        return _escape
+
+    cached_escape = lru_cache(maxsize=cache_size)(_escape)
+
+    def escape(data: str) -> str:
+        """
+        Escapes `&`, `<`, and `>` in the given string.
+
+        Arguments:
+            data: The string to escape.
+        """
+        if "&" not in data and "<" not in data and ">" not in data:
+            return data
+        if len(data) <= max_cached_length:
+            return cached_escape(data)
+        return _escape(data)
+
+    return escape
+
+
+fast_xml_escape = create_xml_escaper(cache_size=0)
+"""
+Escapes `&`, `<`, and `>` in the given string. The output is identical to the output
+of `xml_escape()`.
+
+The function doesn't cache escaped values, because cache misses are considerably more
+expensive than escaping short strings. Use `create_xml_escaper()` to create a caching
+escaper for documents with many recurring strings, and `set_xml_escaper()` to render
+elements with it.
+"""
+
+_xml_escaper: Callable[[str], str] = fast_xml_escape
+"""
+The escape function of string children, see `set_xml_escaper()`.
+"""
+
+
+def set_xml_escaper(
+    escaper: Optional[Callable[[str], str]] = None,
+) -> Callable[[str], str]:
+    """
+    Sets the function that escapes string children in `xml_format_element()`, when elements
+    are rendered (`str()`, `render()`, `iter_markup()`, etc.), and in `MarkupWriter.text()`.
+
+    The function must produce the same output as `xml_escape()`, for example a caching
+    escaper created by `create_xml_escaper()`. Strings that contain no `&`, `<`, or `>`
+    characters may be used without calling the function. The setting applies to the
+    whole process.
+
+    Arguments:
+        escaper: The escape function to use, `None` restores `fast_xml_escape()`.
+
+    Returns:
+        The previously used escape function.
+    """
+    global _xml_escaper
+    previous = _xml_escaper
+    _xml_escaper = fast_xml_escape if escaper is None else escaper
+    return previous
+
+
 def format_property(name: str, value: PropertyValue) -> str:
     """
     Formatter function for element properties.
@@ -59,7 +162,7 @@ def format_properties(
     Returns:
         The formatted string value.
     """
-    return " ".join((prop_formatter(name, value) for name, value in properties.items()))
+    return " ".join([prop_formatter(name, value) for name, value in properties.items()])
 
 
 def xml_format_element(element: ElementType) -> str:
@@ -72,7 +175,7 @@ def xml_format_element(element: ElementType) -> str:
     Returns:
         The string formatted element.
     """
-    return xml_escape(element) if isinstance(element, str) else str(element)
+    return _xml_escaper(element) if isinstance(element, str) else str(element)
 
 
 def format_element_sequence(
@@ -2,18 +2,56 @@
 Markup parser.
 
 The module is built on the `xml` module of the standard library, therefore it inherits
-the standard library's security limitations.
+the standard library's security limitations. Parsers can optionally use `lxml` instead
+(if it is installed), which is considerably faster on large documents.
 """
 
-from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple, Type, Union
-
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    TYPE_CHECKING,
+)
+
+from contextlib import nullcontext
+from types import ModuleType
+
+import hashlib
+import os
+import pickle
 import xml.etree.ElementTree as ET
 
-from markyp import ElementType, IElement, PropertyDict, PropertyValue
+from markyp import ElementType, IElement, PropertyDict, PropertyValue, __version__
+from markyp.arena import ArenaBuilder, ArenaDocument
 from markyp.elements import Element
+from markyp.utils import deduplicate
+
+if TYPE_CHECKING:
+    import asyncio
 
 
-__all__ = ("Converter", "FactoryType", "ParserRule", "AnyElement", "Parser")
+__all__ = (
+    "Converter",
+    "ConverterRule",
+    "FactoryType",
+    "ParserRule",
+    "AnyElement",
+    "Parser",
+    "ParseCache",
+    "PushParser",
+)
 
 
 Converter = Callable[
@@ -38,7 +76,35 @@ class ParserRule(NamedTuple):
     """
 
 
-FactoryType = Union[Type[IElement], ParserRule]
+class ConverterRule(NamedTuple):
+    """
+    Tuple of tag - element factory - converter items.
+    """
+
+    tag_name: str
+    """
+    The tag the rule applies to.
+    """
+
+    factory: Type[IElement]
+    """
+    The element factory to use for the corresponding tag.
+    """
+
+    converter: Optional[Converter]
+    """
+    The converter to use for the corresponding tag instead of the converter of the parser.
+    `None` means that the attributes of the tag are not converted at all.
+    """
+
+
+FactoryType = Union[Type[IElement], ParserRule, ConverterRule]
+
+
+_Handler = Callable[[List[ElementType], Mapping[str, str]], ElementType]
+"""
+Function that creates the element of a tag from its children and XML attributes.
+"""
 
 
 class AnyElement(Element):
@@ -92,59 +158,183 @@ class Parser:
     The parser accepts the following types of rules:
 
     - `IElement` classes / factory types: Class that handles tags whose name matches the class' name.
-    - `ParserRule` or equivalent `tuple`: Tag name - factory type pair. When the parser encounters
-        an element with the given tag name, it will use the given factory type to process it.
+    - `ParserRule` or equivalent `tuple`: Tag name - factory type pair. When the parser
+        encounters an element with the given tag name, it will use the given factory type
+        to process it.
+    - `ConverterRule` or equivalent `tuple`: Tag name - factory type - converter triplet.
+        The same as `ParserRule`, but the given converter is used for the tag instead of
+        the converter of the parser. If the converter is `None`, the tag is not converted,
+        even if the parser has a converter.
 
     When the parser finds an element with a tag for which there is no registered rule, it will
     convert the element into an `AnyElement` instance, making sure the tag name, properties, and
     children of the element are all kept intact.
+
+    By default, `fromstring()` and `parse()` build an `etree` element tree first and convert
+    it with `convert()` afterwards. In direct mode, the parser converts the document into
+    `markyp` elements while the XML parser processes it, without building the intermediate
+    `etree` element tree. The result is the same in both modes, but direct mode needs
+    considerably less memory. Direct mode is usually slower though (by up to about 25% on
+    text-heavy documents), because the XML parser calls back into Python for every tag and
+    text chunk, so it is only worth enabling if memory usage matters more than speed.
+
+    With the `deduplicate` option, the structurally identical subtrees of the documents
+    `fromstring()` and `parse()` create are merged into a single, frozen instance
+    (see `markyp.utils.deduplicate()`), whose markup is created only once. Deduplicated
+    documents are meant for rendering only: the shared subtrees are `FrozenElement`s, which
+    have neither children nor properties, so the parsed structure can not be inspected
+    or changed through them.
+
+    The parser uses `xml.etree.ElementTree` by default. With the `"lxml"` backend, it uses
+    `lxml.etree` if `lxml` is installed and falls back to `xml.etree.ElementTree` otherwise.
+    The created elements are the same with both backends: comments and processing
+    instructions are ignored, internal entities are expanded, and external entities are
+    not resolved. The `"lxml"` backend enables the `huge_tree` option of `lxml` to lift most
+    of its document size limits (the standard library does not have such limits), but
+    `libxml2` still rejects very deeply nested documents.
     """
 
-    __slots__ = ("_converter", "_rules")
+    __slots__ = (
+        "_backend",
+        "_cache",
+        "_converter",
+        "_deduplicate",
+        "_direct",
+        "_etree",
+        "_plan",
+        "_rules",
+    )
 
-    def __init__(self, *rules: FactoryType):
+    def __init__(
+        self,
+        *rules: FactoryType,
+        direct: bool = False,
+        backend: str = "etree",
+        cache: Optional["ParseCache"] = None,
+        deduplicate: bool = False,
+    ):
         """
         Initialization.
 
         Positional arguments will be passed on to the `add_rules()` method. Each argument
-        must be an element factory type, a `ParserRule` or an equivalent `tuple`.
+        must be an element factory type, a `ParserRule`, a `ConverterRule`, or an equivalent
+        `tuple`.
+
+        Keyword arguments:
+            direct: Whether `fromstring()` and `parse()` should convert the document directly,
+                    without building an intermediate `etree` element tree. Uses less memory
+                    but is usually slower, see above.
+            backend: The XML parser to use, either `"etree"` (the standard library's
+                     `xml.etree.ElementTree`) or `"lxml"` (`lxml.etree` if it is installed).
+            cache: Optional persistent cache for the element hierarchies `parse()` creates.
+                   It is not used if a factory or converter of the parser is a lambda,
+                   a local function or class, a callable object, or a method bound to
+                   an object, see `ParseCache`.
+            deduplicate: Whether the structurally identical subtrees of the element hierarchies
+                         `fromstring()` and `parse()` create should be merged and frozen.
+                         The results are then render-only, see above.
+
+        Raises:
+            ValueError: If the backend is not recognized.
+        """
+        backend, etree = _import_backend(backend)
+
+        self._backend = backend
         """
+        The name of the XML parser backend that is used.
+        """
+
+        self._cache = cache
+        """
+        The persistent cache of the parsed files.
+        """
+
         self._converter: Optional[Converter] = None
         """
         Function that converts a factory type - children list - properties dictionary tuple
         into another, similar tuple that will be used for element creation.
         """
 
-        self._rules: Dict[str, Type[ElementType]] = dict()
+        self._deduplicate = deduplicate
+        """
+        Whether identical subtrees of the created element hierarchies should be merged.
+        """
+
+        self._direct = direct
+        """
+        Whether documents should be converted without building an `etree` element tree.
+        """
+
+        self._etree = etree
+        """
+        The `etree` module of the backend.
+        """
+
+        self._plan: Dict[str, _Handler] = {}
         """
-        The rules (tag name - factory type pairs) the parser uses.
+        Tag name - element handler pairs that have been compiled from the rules and
+        the converters. Cleared whenever the rules or the converter of the parser change.
+        """
+
+        self._rules: Dict[str, Union[ParserRule, ConverterRule]] = dict()
+        """
+        The rules (tag name - parser rule pairs) the parser uses.
         """
 
         self.add_rules(rules)
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # The compiled plan and the backend module can not be pickled.
+        return {
+            "backend": self._backend,
+            "cache": self._cache,
+            "converter": self._converter,
+            "deduplicate": self._deduplicate,
+            "direct": self._direct,
+            "rules": self._rules,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._backend, self._etree = _import_backend(state["backend"])
+        self._cache = state["cache"]
+        self._converter = state["converter"]
+        self._deduplicate = state["deduplicate"]
+        self._direct = state["direct"]
+        self._plan = {}
+        self._rules = state["rules"]
+
+    @property
+    def backend(self) -> str:
+        """
+        The name of the XML parser backend the parser actually uses (`"etree"` or `"lxml"`).
+        """
+        return self._backend
+
     def add_rules(self, rules: Sequence[FactoryType]) -> None:
         """
         Adds the given list of rules to the parser.
 
         Arguments:
-            rules: Element factory types or parser rules (`ParserRule` or equivalent tuple
-                   instances) to add to the parser.
+            rules: Element factory types or parser rules (`ParserRule`, `ConverterRule`, or
+                   equivalent tuple instances) to add to the parser.
         """
         self._rules.update(dict(self._get_rule_entry(item) for item in rules))
+        self._plan.clear()
 
     def clear_rules(self) -> None:
         """
         Clears all the rules from the parser.
         """
         self._rules.clear()
+        self._plan.clear()
 
     def set_rules(self, rules: Sequence[FactoryType]) -> None:
         """
         Replaces the current rules with the provided new ones.
 
         Arguments:
-            rules: Element factory types or parser rules (`ParserRule` or equivalent tuple
-                   instances) the parser should use.
+            rules: Element factory types or parser rules (`ParserRule`, `ConverterRule`, or
+                   equivalent tuple instances) the parser should use.
         """
         self.clear_rules()
         self.add_rules(rules)
@@ -160,33 +350,61 @@ class Parser:
                   and converts it to a another, similar tuple (replacing or changing any of the
                   received values). The only requirement regarding the returned tuple is that
                   it must be possible to execute the `factory(*children, **properties)` call
-                  with them.
+                  with them. Rules with their own converter do not use this converter.
         """
         self._converter = func
+        self._plan.clear()
         return func
 
     def convert(self, node: ET.Element) -> ElementType:
         """
-        Recursively converts the given element into a `markyp` element hierarchy.
+        Converts the given element into a `markyp` element hierarchy.
+
+        The hierarchy is processed iteratively (bottom-up), so the depth of the document
+        is not limited by the recursion limit of the interpreter.
 
         Arguments:
-            node: The `etree` element to convert.
+            node: The `etree` (or `lxml.etree`) element to convert.
 
         Returns:
             The created `markyp` element hierachy.
         """
-        tag = node.tag
-        factory = self._rules.get(tag, AnyElement)
-        children: Sequence[ElementType] = self._get_children(node)
-        props = self._get_properties(node)
-
-        if factory == AnyElement:
-            props["element_tag"] = tag
-
-        if self._converter is not None:
-            factory, children, props = self._converter(factory, children, props)
-
-        return factory(*children, **props)
+        plan = self._plan
+        get_handler = self._get_handler
+
+        # The nodes whose children are being converted, with their converted children
+        # and the iterator of their remaining child nodes.
+        stack: List[Tuple[ET.Element, List[ElementType], Iterator[ET.Element]]] = [
+            self._create_frame(node)
+        ]
+        leaf_children: List[ElementType]
+        while True:
+            current, children, items = stack[-1]
+            for item in items:
+                text = item.text
+                if text and not text.isspace():
+                    leaf_children = [text.strip()]
+                elif len(item) == 0:
+                    leaf_children = []
+                else:
+                    stack.append(self._create_frame(item))
+                    break
+
+                tag = item.tag
+                element = (plan.get(tag) or get_handler(tag))(
+                    leaf_children, item.attrib
+                )
+                if element is not None:
+                    children.append(element)
+            else:
+                stack.pop()
+                tag = current.tag
+                element = (plan.get(tag) or get_handler(tag))(children, current.attrib)
+                if not stack:
+                    return element
+
+                if element is not None:
+                    stack[-1][1].append(element)
 
     def fromstring(self, data: str) -> ElementType:
         """
@@ -198,47 +416,380 @@ class Parser:
         Returns:
             The parsed element hierarchy.
         """
-        tree = ET.fromstring(data)
-        return self.convert(tree)
-
-    def parse(self, path: str) -> ElementType:
+        parser = self._create_xml_parser(
+            _ElementBuilder(self) if self._direct else None
+        )
+        parser.feed(data)
+        result = parser.close()
+        return self._finish(result if self._direct else self.convert(result))
+
+    def parse(self, path: Union[str, IO[Any]]) -> ElementType:
         """
         Parses the file at the given path.
 
         Arguments:
-            path: The path of the file to parse.
+            path: The path of the file to parse, or a binary or text file object to read
+                  the document from. The cache of the parser is only used for paths.
 
         Returns:
             The parsed element hierarchy.
         """
-        tree = ET.parse(path).getroot()
-        return self.convert(tree)
+        if self._cache is not None and isinstance(path, (str, os.PathLike)):
+            fingerprint = self._get_fingerprint()
+            if fingerprint is not None:
+                return self._cache.get_or_parse(path, fingerprint, self._parse_file)
+
+        return self._parse_file(path)
 
-    def _get_children(self, node: ET.Element) -> Sequence[ElementType]:
+    def fromstring_arena(self, data: str) -> ArenaDocument:
         """
-        Returns the children elements of the given `etree` element as `markyp` elements.
+        Parses the given XML string into an `ArenaDocument`.
+
+        The document renders exactly like the element hierarchy `fromstring()` creates
+        without rules and converters, but it needs an order of magnitude less memory.
+        The rules and the converter of the parser are not used.
 
         Arguments:
-            node: The node whose children are required.
+            data: The string to parse.
+
+        Returns:
+            The parsed document.
+        """
+        parser = self._create_xml_parser(ArenaBuilder())
+        parser.feed(data)
+        return parser.close()  # type: ignore[no-any-return]
+
+    def parse_arena(self, path: Union[str, IO[Any]]) -> ArenaDocument:
         """
-        if self._is_empty_string_or_none(node.text):
-            return [e for e in (self.convert(item) for item in node) if e is not None]
+        Parses the file at the given path into an `ArenaDocument`.
+
+        See `fromstring_arena()` for details. The cache of the parser is not used.
+
+        Arguments:
+            path: The path of the file to parse, or a binary or text file object to read
+                  the document from.
+
+        Returns:
+            The parsed document.
+        """
+        parser = self._create_xml_parser(ArenaBuilder())
+        for data in _read_chunks(path):
+            parser.feed(data)
+
+        return parser.close()  # type: ignore[no-any-return]
+
+    def iterparse(self, path: Union[str, IO[Any]], tag: str) -> Iterator[ElementType]:
+        """
+        Incrementally parses the file at the given path, and yields the converted subtrees
+        (records) whose root has the given tag as soon as their end tag is processed.
+
+        Only the outermost records are yielded (a matching element within a record is part
+        of the record), records that are converted to `None` are skipped, and elements
+        outside of records are not converted at all. The file is processed in chunks
+        and no element tree is built, so memory usage does not depend on the size of the file.
+        With the `deduplicate` option, each record is deduplicated separately.
+
+        Arguments:
+            path: The path of the file to parse, or a binary or text file object to read
+                  the document from.
+            tag: The tag of the records. Namespaced tags must be given in `{uri}name` format.
+
+        Returns:
+            Iterator of the converted records.
+        """
+        finish = self._finish
+        builder = _ElementBuilder(self, tag)
+        parser = self._create_xml_parser(builder)
+        for data in _read_chunks(path):
+            parser.feed(data)
+            for record in builder.take_records():
+                yield finish(record)
+
+        parser.close()
+        for record in builder.take_records():
+            yield finish(record)
+
+    def parse_many(
+        self,
+        paths: Iterable[str],
+        *,
+        workers: Optional[int] = None,
+        ordered: bool = True,
+        transform: Optional[Callable[[ElementType], Any]] = None,
+        chunksize: int = 1,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Parses the files at the given paths in a pool of worker processes.
+
+        The parser (its rules and converter) and the transform function are sent to each
+        worker process only once, so they must be picklable (defined at module level).
+
+        Arguments:
+            paths: The paths of the files to parse.
+
+        Keyword arguments:
+            workers: The number of worker processes, `None` to use one per CPU.
+            ordered: Whether results should be returned in the order of `paths`
+                     rather than in the order they are completed in.
+            transform: Optional function to apply to each parsed element hierarchy in the
+                       worker process. Its return value is sent back instead of the element
+                       hierarchy, so it can be used to avoid the cost of transferring the
+                       elements, for example by returning their markup.
+            chunksize: The number of paths to send to a worker process at once
+                       if `ordered` is `True`.
+
+        Returns:
+            Iterator of path - parsed element hierarchy (or the return value of `transform`)
+            pairs.
+
+        Raises:
+            ValueError: If `chunksize` is not positive.
+        """
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        if chunksize < 1:
+            raise ValueError(f"Invalid chunk size: {chunksize}")
+
+        paths = list(paths)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self, transform),
+        ) as executor:
+            if ordered:
+                chunks = [
+                    paths[i : i + chunksize] for i in range(0, len(paths), chunksize)
+                ]
+                ordered_futures = [
+                    executor.submit(_parse_chunk_in_worker, chunk) for chunk in chunks
+                ]
+                try:
+                    for chunk, future in zip(chunks, ordered_futures):
+                        yield from zip(chunk, future.result())
+                finally:
+                    for future in ordered_futures:
+                        future.cancel()
+                return
+
+            futures = {executor.submit(_parse_in_worker, path): path for path in paths}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    async def aiterparse(
+        self,
+        reader: "asyncio.StreamReader",
+        *,
+        depth: int = 1,
+        tag: Optional[str] = None,
+        chunk_size: int = 65536,
+    ) -> AsyncIterator[ElementType]:
+        """
+        Incrementally parses the document that is read from the given stream, and yields
+        the converted subtrees (records) at the given depth as soon as their end tag
+        has been received.
+
+        See `PushParser` for details.
+
+        Arguments:
+            reader: The stream to read the document from.
+
+        Keyword arguments:
+            depth: The depth of the records (0 is the root element).
+            tag: If not `None`, only records with the given tag are converted.
+            chunk_size: The maximum number of bytes to read from the stream at once.
+
+        Returns:
+            Async iterator of the converted records.
+        """
+        parser = PushParser(self, depth=depth, tag=tag)
+        while True:
+            data = await reader.read(chunk_size)
+            if not data:
+                break
+
+            for element in parser.feed(data):
+                yield element
+
+        for element in parser.close():
+            yield element
+
+    def _create_xml_parser(self, target: Any) -> Any:
+        """
+        Creates a feed parser of the backend of the parser.
+
+        Arguments:
+            target: The target of the XML parser, `None` to build an element tree.
+        """
+        if self._backend == "lxml":
+            return self._etree.XMLParser(
+                target=target,
+                remove_comments=True,
+                remove_pis=True,
+                resolve_entities="internal",
+                huge_tree=True,
+            )
+
+        return ET.XMLParser(target=target)
+
+    def _compile_handler(self, tag: str) -> _Handler:
+        """
+        Creates the element handler of the given tag.
+
+        The handler has the factory, the `element_tag` property (for `AnyElement`) and the
+        converter of the tag built in, so only the attributes must be transformed when it is
+        called. Attribute values are escaped (`"` is replaced by `&quot;`).
+
+        Arguments:
+            tag: The tag to create the handler for.
+        """
+        rule = self._rules.get(tag)
+        factory: Type[ElementType] = AnyElement if rule is None else rule.factory
+        converter = (
+            rule.converter if isinstance(rule, ConverterRule) else self._converter
+        )
+        element_tag = tag if factory == AnyElement else None
+
+        if converter is None and element_tag is None:
+
+            def handler(
+                children: List[ElementType], attributes: Mapping[str, str]
+            ) -> ElementType:
+                if not attributes:
+                    return factory(*children)
+
+                return factory(
+                    *children,
+                    **{k: v.replace('"', "&quot;") for k, v in attributes.items()},
+                )
+
+        elif converter is None:
+
+            def handler(
+                children: List[ElementType], attributes: Mapping[str, str]
+            ) -> ElementType:
+                props = {k: v.replace('"', "&quot;") for k, v in attributes.items()}
+                props["element_tag"] = tag
+                return factory(*children, **props)
+
         else:
-            return [node.text.strip()]  # type: ignore
 
-    def _get_properties(self, node: ET.Element) -> PropertyDict:
+            def handler(
+                children: List[ElementType], attributes: Mapping[str, str]
+            ) -> ElementType:
+                props: PropertyDict = {
+                    k: v.replace('"', "&quot;") for k, v in attributes.items()
+                }
+                if element_tag is not None:
+                    props["element_tag"] = element_tag
+
+                f, c, p = converter(factory, children, props)  # type: ignore[misc]
+                return f(*c, **p)
+
+        return handler
+
+    def _create_frame(
+        self, node: ET.Element
+    ) -> Tuple[ET.Element, List[ElementType], Iterator[ET.Element]]:
         """
-        Returns the properties of the given `etree` element.
+        Returns the `convert()` stack item of the given `etree` element.
 
-        Argument:
-            node: The node whose children are required.
+        If the element has text, the text is its only child, otherwise its child nodes
+        must be converted.
+
+        Arguments:
+            node: The node to create the stack item for.
         """
-        return {
-            key: value.replace('"', "&quot;") if isinstance(value, str) else value
-            for key, value in node.items()
-        }
+        text = node.text
+        if text and not text.isspace():
+            return node, [text.strip()], iter(())
+        else:
+            return node, [], iter(node)
+
+    def _finish(self, element: ElementType) -> ElementType:
+        """
+        Applies the post-processing options of the parser to the given parsed element hierarchy.
+
+        Arguments:
+            element: The parsed element hierarchy.
+        """
+        return (
+            deduplicate(element, freeze_shared=True) if self._deduplicate else element
+        )
+
+    def _get_fingerprint(self) -> Optional[str]:
+        """
+        Returns a fingerprint of the rules, the converters, and the options of the parser
+        that affect the created element hierarchies, or `None` if the parser can not be
+        identified by the qualified names of its factories and converters (because some
+        of them are lambdas, local functions or classes, callable objects, or methods
+        that are bound to an object).
+        """
+        callables = [
+            self._converter,
+            *(rule.factory for rule in self._rules.values()),
+            *(
+                rule.converter
+                for rule in self._rules.values()
+                if isinstance(rule, ConverterRule)
+            ),
+        ]
+        if not all(_has_global_name(value) for value in callables):
+            return None
+
+        items = [
+            __version__,
+            f"deduplicate={self._deduplicate}",
+            _get_qualified_name(self._converter),
+            *(
+                f"{tag}={_get_qualified_name(rule.factory)}"
+                + (
+                    f":{_get_qualified_name(rule.converter)}"
+                    if isinstance(rule, ConverterRule)
+                    else ""
+                )
+                for tag, rule in sorted(self._rules.items())
+            ),
+        ]
+        return hashlib.sha256("\n".join(items).encode("utf-8")).hexdigest()
+
+    def _get_handler(self, tag: str) -> _Handler:
+        """
+        Returns the element handler of the given tag, compiling it if necessary.
+
+        Arguments:
+            tag: The tag whose handler is required.
+        """
+        handler = self._plan.get(tag)
+        if handler is None:
+            handler = self._plan[tag] = self._compile_handler(tag)
+        return handler
+
+    def _parse_file(self, path: Union[str, IO[Any]]) -> ElementType:
+        """
+        Parses the file at the given path without using the cache of the parser.
 
-    def _get_rule_entry(self, rule: FactoryType) -> Tuple[str, Type[IElement]]:
+        Arguments:
+            path: The path of the file to parse, or a file object to read the document from.
+
+        Returns:
+            The parsed element hierarchy.
+        """
+        parser = self._create_xml_parser(
+            _ElementBuilder(self) if self._direct else None
+        )
+        for data in _read_chunks(path):
+            parser.feed(data)
+
+        result = parser.close()
+        return self._finish(result if self._direct else self.convert(result))
+
+    def _get_rule_entry(
+        self, rule: FactoryType
+    ) -> Tuple[str, Union[ParserRule, ConverterRule]]:
         """
         Returns a rule entry tuple for the given rule.
 
@@ -251,30 +802,618 @@ class Parser:
         Raises:
             ValueError: When the given rule is invalid or can not be recognized.
         """
-        if isinstance(rule, ParserRule):
-            return rule.tag_name, rule.factory
+        if isinstance(rule, (ParserRule, ConverterRule)):
+            return rule.tag_name, rule
 
         if (
             isinstance(rule, tuple)
-            and len(rule) == 2
+            and len(rule) in (2, 3)
             and isinstance(rule[0], str)
             and issubclass(rule[1], IElement)
         ):
-            return rule
+            if len(rule) == 2:
+                return rule[0], ParserRule(*rule)
+            if rule[2] is None or callable(rule[2]):
+                return rule[0], ConverterRule(*rule)
 
         try:
             if issubclass(rule, IElement):
-                return rule.__name__, rule
+                return rule.__name__, ParserRule(rule.__name__, rule)
         except TypeError:
             pass
 
         raise ValueError(f"Invalid factory rule: {rule}")
 
-    def _is_empty_string_or_none(self, value: Optional[str]) -> bool:
+
+class ParseCache:
+    """
+    Persistent, size-limited cache of the element hierarchies `Parser.parse()` creates.
+
+    Entries are stored in separate files in the cache directory and are keyed by the absolute
+    path of the parsed file and by the fingerprint of the parser's rules and converters
+    (the qualified names of the factories and converters, not their code, so the `version`
+    of the cache must be changed, or the cache must be cleared, if they change in an
+    incompatible way). Parsers whose factories or converters can not be identified by their
+    qualified names (lambdas, local functions and classes, callable objects, and methods bound
+    to an object, for example closures that differ only in the values they capture) do not
+    use the cache at all.
+    An entry is only used if the size and modification time of the file did not change, or,
+    if `content_hash` is enabled, if the size and the SHA-256 hash of its content did not
+    change. The least recently used entries are removed when the cache exceeds its limits.
+
+    Entries are stored with `pickle`, so the cache directory must be trusted. Element
+    hierarchies that can not be pickled (for example because their factories are not
+    importable, or because they are nested too deeply) are not cached.
+
+    ```Python
+    parser = Parser(*rules, cache=ParseCache(".markyp-cache", max_entries=256))
+    document = parser.parse("template.xml")
+    ```
+    """
+
+    __slots__ = (
+        "_content_hash",
+        "_directory",
+        "_max_bytes",
+        "_max_entries",
+        "_version",
+    )
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        content_hash: bool = False,
+        version: str = "",
+    ) -> None:
         """
-        Returns whether the given value is an empty string or `None`.
+        Initialization.
 
         Arguments:
-            value: The value to check.
+            directory: The directory to store the cache entries in. It is created if needed.
+
+        Keyword arguments:
+            max_entries: The maximum number of entries in the cache, `None` for no limit.
+            max_bytes: The maximum total size of the entries in bytes, `None` for no limit.
+            content_hash: Whether entries should be validated by the hash of the content of
+                          the file instead of its modification time.
+            version: Arbitrary string that is part of the key of every entry.
+
+        Raises:
+            ValueError: If `max_entries` or `max_bytes` is not positive.
         """
-        return value is None or value.strip() == ""
+        if max_entries is not None and max_entries < 1:
+            raise ValueError(f"Invalid maximum number of entries: {max_entries}")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError(f"Invalid maximum cache size: {max_bytes}")
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._content_hash = content_hash
+        """Whether entries are validated by the hash of the content of the file."""
+
+        self._directory = directory
+        """The directory of the cache entries."""
+
+        self._max_bytes = max_bytes
+        """The maximum total size of the entries in bytes."""
+
+        self._max_entries = max_entries
+        """The maximum number of entries in the cache."""
+
+        self._version = version
+        """Arbitrary string that is part of the key of every entry."""
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache.
+        """
+        for name in os.listdir(self._directory):
+            if name.endswith(_CACHE_ENTRY_SUFFIX):
+                _remove_file(os.path.join(self._directory, name))
+
+    def get_or_parse(
+        self, path: str, fingerprint: str, parse: Callable[[str], ElementType]
+    ) -> ElementType:
+        """
+        Returns the cached element hierarchy of the file at the given path if there is a valid
+        entry for it, otherwise parses the file and stores the result in the cache.
+
+        Arguments:
+            path: The path of the file.
+            fingerprint: The fingerprint of the parser.
+            parse: The function that parses the file at the given path.
+
+        Returns:
+            The element hierarchy of the file.
+        """
+        stat = os.stat(path)
+        digest = self._get_digest(path) if self._content_hash else None
+        entry_path = self._get_entry_path(path, fingerprint)
+
+        try:
+            with open(entry_path, "rb") as f:
+                mtime_ns, size, entry_digest, element = pickle.load(f)
+        except Exception:  # Missing or invalid entry.
+            pass
+        else:
+            if size == stat.st_size and (
+                entry_digest == digest
+                if self._content_hash
+                else mtime_ns == stat.st_mtime_ns
+            ):
+                _touch_file(entry_path)
+                return element  # type: ignore[no-any-return]
+
+        element = parse(path)
+        try:
+            data = pickle.dumps(
+                (stat.st_mtime_ns, stat.st_size, digest, element),
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        except Exception:  # The element hierarchy can not be pickled.
+            return element
+
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            _remove_file(temp_path)
+        else:
+            self._evict()
+
+        return element
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries while the cache exceeds its limits.
+        """
+        if self._max_entries is None and self._max_bytes is None:
+            return
+
+        entries = []
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith(_CACHE_ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        entries.sort()
+        count, total = len(entries), sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if (self._max_entries is None or count <= self._max_entries) and (
+                self._max_bytes is None or total <= self._max_bytes
+            ):
+                break
+
+            _remove_file(path)
+            count -= 1
+            total -= size
+
+    def _get_entry_path(self, path: str, fingerprint: str) -> str:
+        """
+        Returns the path of the cache entry of the given file and parser fingerprint.
+
+        Arguments:
+            path: The path of the file.
+            fingerprint: The fingerprint of the parser.
+        """
+        key = "\0".join((os.path.abspath(path), fingerprint, self._version))
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest() + _CACHE_ENTRY_SUFFIX
+        return os.path.join(self._directory, name)
+
+    def _get_digest(self, path: str) -> str:
+        """
+        Returns the SHA-256 hash of the content of the file at the given path.
+
+        Arguments:
+            path: The path of the file.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(65536)
+                if not data:
+                    break
+                digest.update(data)
+        return digest.hexdigest()
+
+
+_CACHE_ENTRY_SUFFIX = ".markyp-parse"
+"""The file name suffix of `ParseCache` entries."""
+
+
+def _get_qualified_name(value: Any) -> str:
+    """
+    Returns the qualified name of the given class or function, or an empty string for `None`.
+
+    Arguments:
+        value: The class or function whose name is required.
+    """
+    if value is None:
+        return ""
+
+    module = getattr(value, "__module__", "")
+    return f"{module}.{getattr(value, '__qualname__', repr(value))}"
+
+
+def _has_global_name(value: Any) -> bool:
+    """
+    Returns whether the given class or function (or `None`) is identified by its qualified name,
+    i.e. it is neither a lambda nor a local function or class, nor a callable object or
+    a method that is bound to an object whose state it may depend on.
+
+    Arguments:
+        value: The class or function to check.
+    """
+    if value is None:
+        return True
+
+    owner = getattr(value, "__self__", None)
+    if owner is not None and not isinstance(owner, (type, ModuleType)):
+        # Bound method of an instance (only methods of classes and modules are allowed).
+        return False
+
+    qualname = getattr(value, "__qualname__", None)
+    return isinstance(qualname, str) and "<" not in qualname
+
+
+def _read_chunks(path: Union[str, IO[Any]]) -> Iterator[Any]:
+    """
+    Yields the content of the given file in chunks.
+
+    Arguments:
+        path: The path of the file to read, or a binary or text file object. File objects
+              are read from their current position and they are not closed.
+    """
+    with nullcontext(path) if hasattr(path, "read") else open(path, "rb") as f:
+        while True:
+            data = f.read(65536)
+            if not data:
+                break
+            yield data
+
+
+def _remove_file(path: str) -> None:
+    """
+    Removes the file at the given path, ignoring errors.
+
+    Arguments:
+        path: The path of the file to remove.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _touch_file(path: str) -> None:
+    """
+    Sets the modification time of the file at the given path to the current time,
+    ignoring errors.
+
+    Arguments:
+        path: The path of the file to touch.
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _import_backend(backend: str) -> Tuple[str, Any]:
+    """
+    Returns the name and the `etree` module of the given parser backend.
+
+    Arguments:
+        backend: The name of the backend, `"etree"` or `"lxml"`. If `lxml` is not installed,
+                 the `"etree"` backend is returned instead of `"lxml"`.
+
+    Raises:
+        ValueError: If the backend is not recognized.
+    """
+    if backend == "etree":
+        return backend, ET
+
+    if backend == "lxml":
+        try:
+            from lxml import etree  # type: ignore
+        except ImportError:
+            return "etree", ET
+
+        return backend, etree
+
+    raise ValueError(f"Unknown parser backend: {backend}")
+
+
+_worker_parser: Optional[Parser] = None
+"""The parser of the current `Parser.parse_many()` worker process."""
+
+_worker_transform: Optional[Callable[[ElementType], Any]] = None
+"""The transform function of the current `Parser.parse_many()` worker process."""
+
+
+def _init_worker(
+    parser: Parser, transform: Optional[Callable[[ElementType], Any]]
+) -> None:
+    """
+    Initializes a `Parser.parse_many()` worker process.
+
+    Arguments:
+        parser: The parser to use in the process.
+        transform: The function to apply to parsed element hierarchies.
+    """
+    global _worker_parser, _worker_transform
+    _worker_parser = parser
+    _worker_transform = transform
+
+
+def _parse_in_worker(path: str) -> Any:
+    """
+    Parses the file at the given path in a `Parser.parse_many()` worker process.
+
+    Arguments:
+        path: The path of the file to parse.
+    """
+    result = _worker_parser.parse(path)  # type: ignore[union-attr]
+    return result if _worker_transform is None else _worker_transform(result)
+
+
+def _parse_chunk_in_worker(paths: List[str]) -> List[Any]:
+    """
+    Parses the files at the given paths in a `Parser.parse_many()` worker process.
+
+    Arguments:
+        paths: The paths of the files to parse.
+    """
+    return [_parse_in_worker(path) for path in paths]
+
+
+class PushParser:
+    """
+    Push parser that converts a document incrementally, as its data arrives,
+    using the rules and the converter of a `Parser`.
+
+    The push parser emits the subtrees (records) at a given depth as soon as their end tag
+    has been fed to it. Elements outside of records are not converted, and records are
+    converted independently of their ancestors. Records that are converted to `None`
+    (for example by `IgnoreElement`) are not emitted. If the `deduplicate` option of the
+    parser is enabled, each record is deduplicated separately.
+
+    ```Python
+    push_parser = PushParser(parser, depth=1)
+    for data in chunks:
+        for element in push_parser.feed(data):
+            process(element)
+    for element in push_parser.close():
+        process(element)
+    ```
+    """
+
+    __slots__ = ("_builder", "_finish", "_parser")
+
+    def __init__(
+        self, parser: Parser, *, depth: int = 1, tag: Optional[str] = None
+    ) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            parser: The parser whose rules and converter should be used.
+
+        Keyword arguments:
+            depth: The depth of the records (0 is the root element).
+            tag: If not `None`, only records with the given tag are converted.
+
+        Raises:
+            ValueError: If `depth` is negative.
+        """
+        if depth < 0:
+            raise ValueError(f"Invalid record depth: {depth}")
+
+        self._builder = _ElementBuilder(parser, tag, depth)
+        """The parser target that converts the records."""
+
+        self._finish = parser._finish
+        """The post-processing step of the parser that is applied to each record."""
+
+        self._parser = parser._create_xml_parser(self._builder)
+        """The XML parser that processes the fed data."""
+
+    def feed(self, data: Union[bytes, str]) -> List[ElementType]:
+        """
+        Feeds the next chunk of the document to the parser.
+
+        Arguments:
+            data: The next chunk of the document.
+
+        Returns:
+            The records that have been completed by the given chunk.
+        """
+        self._parser.feed(data)
+        return [self._finish(record) for record in self._builder.take_records()]
+
+    def close(self) -> List[ElementType]:
+        """
+        Finishes parsing the document.
+
+        Returns:
+            The records that have not been returned by `feed()` yet.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the document is incomplete or invalid
+                (`lxml.etree.XMLSyntaxError` with the `"lxml"` backend).
+        """
+        self._parser.close()
+        return [self._finish(record) for record in self._builder.take_records()]
+
+
+class _BuilderFrame:
+    """
+    An element whose end tag has not been processed yet by `_ElementBuilder`.
+    """
+
+    __slots__ = ("attributes", "children", "has_text", "tag", "text")
+
+    def __init__(self, tag: str, attributes: Mapping[str, str]) -> None:
+        self.attributes = attributes
+        """The XML attributes of the element."""
+
+        self.children: List[ElementType] = []
+        """The children of the element."""
+
+        self.has_text = False
+        """Whether the only child of the element is its (non-empty) text."""
+
+        self.tag = tag
+        """The tag of the element."""
+
+        self.text: Optional[List[str]] = []
+        """The text of the element, `None` once the first child of the element was found."""
+
+
+class _ElementBuilder:
+    """
+    `XMLParser` target that converts the document into `markyp` elements in one pass,
+    exactly the way `Parser.convert()` converts the equivalent `etree` element tree.
+
+    The text of an element is the text before its first child. If that text is not empty,
+    it becomes the only child of the element and the element's subtree is not processed.
+
+    If a record tag or depth is specified, the builder only converts the outermost subtrees
+    whose root has the given tag and is at the given depth (records), and collects them
+    instead of the root element.
+    """
+
+    __slots__ = (
+        "_depth",
+        "_outside",
+        "_parser",
+        "_records",
+        "_result",
+        "_skip",
+        "_stack",
+        "_tag",
+        "_text",
+    )
+
+    def __init__(
+        self, parser: Parser, tag: Optional[str] = None, depth: Optional[int] = None
+    ) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            parser: The parser whose rules and converter should be used.
+            tag: The tag of the records to convert, `None` to accept any tag.
+            depth: The depth of the records to convert, `None` to accept any depth.
+                   If both `tag` and `depth` are `None`, the whole document is converted.
+        """
+        self._depth = depth
+        """The depth of the records to convert."""
+
+        self._outside = 0
+        """The number of open elements that are not part of a record."""
+
+        self._parser = parser
+        """The parser whose rules and converter are used."""
+
+        self._records: Optional[List[ElementType]] = (
+            None if tag is None and depth is None else []
+        )
+        """The converted records that have not been taken yet."""
+
+        self._result: Optional[ElementType] = None
+        """The root element of the document."""
+
+        self._skip = 0
+        """The depth in the subtree that is currently being skipped."""
+
+        self._stack: List[_BuilderFrame] = []
+        """The elements whose end tag has not been processed yet."""
+
+        self._tag = tag
+        """The tag of the records to convert."""
+
+        self._text: Optional[List[str]] = None
+        """The text list of the current element if its text is still being collected."""
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        if self._skip > 0:
+            self._skip += 1
+            return
+
+        stack = self._stack
+        if stack:
+            parent = stack[-1]
+            if parent.text is not None:
+                text = "".join(parent.text).strip()
+                parent.text = None
+                if text:
+                    parent.children.append(text)
+                    parent.has_text = True
+
+            if parent.has_text:
+                self._skip = 1
+                self._text = None
+                return
+        elif self._records is not None and (
+            (self._tag is not None and tag != self._tag)
+            or (self._depth is not None and self._outside != self._depth)
+        ):
+            self._outside += 1
+            return
+
+        frame = _BuilderFrame(tag, attrib)
+        stack.append(frame)
+        self._text = frame.text
+
+    def data(self, data: str) -> None:
+        text = self._text
+        if text is not None:
+            text.append(data)
+
+    def end(self, tag: str) -> None:
+        if self._skip > 0:
+            self._skip -= 1
+            return
+
+        if not self._stack:
+            self._outside -= 1
+            return
+
+        self._text = None  # The parent (if any) already has a child.
+        frame = self._stack.pop()
+        if frame.text is not None:
+            text = "".join(frame.text).strip()
+            if text:
+                frame.children.append(text)
+
+        element = self._parser._get_handler(frame.tag)(frame.children, frame.attributes)
+        if self._stack:
+            if element is not None:
+                self._stack[-1].children.append(element)
+        elif self._records is None:
+            self._result = element
+        elif element is not None:
+            self._records.append(element)
+
+    def close(self) -> Optional[ElementType]:
+        return self._result
+
+    def take_records(self) -> List[ElementType]:
+        """
+        Returns the records that have been converted since the last call.
+        """
+        records = self._records
+        if not records:
+            return []
+
+        self._records = []
+        return records
@@ -0,0 +1,131 @@
+"""
+Shared, immutable element properties.
+
+Documents often contain many elements with the exact same properties, for example table cells
+with the same `class` and `style`. `PropertyPool` interns identical property sets into a single
+`SharedProperties` instance that can be shared by any number of elements. The formatted markup
+of shared properties is created only once, when it is first rendered.
+
+Elements copy shared properties when they are changed through `__setitem__()` or
+`__delitem__()`, so sharing is invisible to code that uses the element protocol. Changing the
+shared properties directly (for example `element.properties["id"] = "x"`) raises `TypeError`.
+
+Use `markyp.utils.share_properties()` to share the properties of the elements of a tree.
+"""
+
+from typing import Any, Dict, Hashable, Iterable, NoReturn, Optional, Tuple
+
+from markyp import PropertyDict, PropertyValue
+from markyp.formatters import format_properties
+
+
+__all__ = ("PropertyPool", "SharedProperties", "get_items_key")
+
+
+class SharedProperties(Dict[str, PropertyValue]):
+    """
+    Immutable properties dictionary that can be shared by any number of elements.
+
+    Instances are `dict`s, so they can be used anywhere a `PropertyDict` is expected,
+    but all mutating methods raise `TypeError`.
+    """
+
+    __slots__ = ("_markup",)
+
+    def __init__(self, properties: Optional[PropertyDict] = None) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            properties: The properties to copy.
+        """
+        super().__init__(() if properties is None else properties)
+
+        self._markup: Optional[str] = None
+        """The formatted properties, `None` until they are first requested."""
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (self.__class__, (dict(self),))
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError(f"{self.__class__.__name__} is immutable.")
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    __ior__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+    @property
+    def markup(self) -> str:
+        """
+        The formatted properties, the same as `format_properties(self)`.
+        """
+        markup = self._markup
+        if markup is None:
+            markup = self._markup = format_properties(self)
+        return markup
+
+
+class PropertyPool:
+    """
+    Interns property dictionaries into `SharedProperties`.
+
+    Property sets are considered identical if they contain the same properties, with values
+    of the same type, in the same order, because all of these affect the created markup.
+    The pool keeps every interned property set alive, so it should be discarded (or kept)
+    together with the documents that use it.
+    """
+
+    __slots__ = ("_properties",)
+
+    def __init__(self) -> None:
+        self._properties: Dict[Hashable, SharedProperties] = {}
+        """Property key - shared properties dictionary."""
+
+    def __len__(self) -> int:
+        return len(self._properties)
+
+    def intern(self, properties: PropertyDict) -> SharedProperties:
+        """
+        Returns the shared version of the given properties.
+
+        Arguments:
+            properties: The properties to intern.
+
+        Returns:
+            The `SharedProperties` that is equal to the given properties.
+
+        Raises:
+            TypeError: If a property value is not hashable.
+        """
+        key = get_items_key(properties.items())
+        shared = self._properties.get(key)
+        if shared is None:
+            shared = self._properties[key] = (
+                properties
+                if properties.__class__ is SharedProperties
+                else SharedProperties(properties)
+            )
+        return shared
+
+
+def get_items_key(items: Iterable[Tuple[str, Any]]) -> Tuple[Hashable, ...]:
+    """
+    Returns a key that identifies the given name - value pairs, including their order
+    and the type of the values. The key is hashable only if all values are hashable.
+
+    Property sets with equal keys are formatted identically, `PropertyPool` and
+    `markyp.utils.deduplicate()` use the key to find identical properties.
+
+    Arguments:
+        items: The name - value pairs to create the key for.
+    """
+    return tuple(
+        # -0.0 and 0.0 are equal but they are formatted differently.
+        (name, value.__class__, repr(value) if value.__class__ is float else value)
+        for name, value in items
+    )
@@ -0,0 +1,1307 @@
+"""
+Compact binary serialization format for element trees.
+
+`dumps()` and `dump()` convert an element tree into a compact binary document, `loads()`
+and `load()` restore it. Unlike the pickled tree, the document has no per-element class
+references or dictionaries: every string and every distinct property set is stored only
+once, and the elements are described by integer columns that are stored with the smallest
+sufficient integer size and are decoded a whole column (or batch) at a time. `load()` can
+also memory-map the document and create the elements lazily, one batch at a time, when
+they are first accessed.
+
+The document consists of a header, integer columns, and the UTF-8 data of the strings.
+The columns describe:
+
+- Strings: the byte length of every tag name, property name, property value, and text
+  of the tree.
+- Classes: the module and qualified name (string indexes) of every element class.
+- Property sets: the number of properties of every distinct property set, and the name,
+  value type, and value of the properties.
+- Nodes: the class of every distinct element of the tree in breadth-first order, and the
+  property set, the number of children, and the value (string index) of the elements
+  that have such attributes.
+- Positions: the type of every item (element, text, or `None`) in the children sequences
+  of the nodes, concatenated in node order after the root item. Element items are the next
+  node, unless they are references to a node that appeared earlier, so only texts and
+  references need further columns.
+- Checkpoints: the position of every 2**`_BATCH_SHIFT`-th item in the other columns,
+  so lazily loaded documents can decode any batch of strings, property sets, nodes, or
+  positions directly.
+
+Elements that appear multiple times in the tree are stored only once and loaded as the
+same object, which is why the format describes a graph rather than a tree.
+
+Loading a document imports the modules of the element classes that are referenced in it,
+so only documents from trusted sources should be loaded.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    overload,
+)
+
+from array import array
+from itertools import accumulate
+
+import importlib
+import mmap
+import struct
+import sys
+
+from markyp import ElementType, IElement, PropertyDict, PropertyValue
+from markyp.elements import (
+    CachedMixin,
+    ChildrenOnlyElement,
+    Element,
+    EmptyElement,
+    FrozenElement,
+    StringElement,
+)
+
+
+__all__ = ("dump", "dumps", "load", "loads")
+
+
+_MAGIC = b"MKYP"
+"""The first bytes of every serialized document."""
+
+_VERSION = 1
+"""The version of the serialization format."""
+
+_HEADER = struct.Struct("<4sHBxQ11I")
+"""
+Magic - version - batch shift - string data size - string count - class count -
+property set count - property count - node count - position count - text count -
+reference count - property node count - parent count - value node count.
+"""
+
+_BATCH_SHIFT = 10
+"""Lazily loaded documents decode 2**_BATCH_SHIFT strings, nodes, etc. at once."""
+
+_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("string_lengths", "strings"),
+    ("string_checkpoints", "string_batches"),
+    ("class_modules", "classes"),
+    ("class_names", "classes"),
+    ("propset_sizes", "propsets"),
+    ("propset_checkpoints", "propset_batches"),
+    ("property_names", "properties"),
+    ("property_types", "properties"),
+    ("property_values", "properties"),
+    ("node_classes", "nodes"),
+    ("node_propsets", "property_nodes"),
+    ("node_children", "parents"),
+    ("node_values", "value_nodes"),
+    ("node_propset_checkpoints", "node_batches"),
+    ("node_parent_checkpoints", "node_batches"),
+    ("node_value_checkpoints", "node_batches"),
+    ("node_position_checkpoints", "node_batches"),
+    ("position_types", "positions"),
+    ("position_texts", "texts"),
+    ("position_refs", "refs"),
+    ("position_node_checkpoints", "position_batches"),
+    ("position_text_checkpoints", "position_batches"),
+    ("position_ref_checkpoints", "position_batches"),
+)
+"""
+Column name - length pairs in the order the columns are stored in. Each column starts with
+the size of its items in bytes (1, 2, 4, or 8) followed by the little-endian items.
+"""
+
+_COUNTS = (
+    "strings",
+    "classes",
+    "propsets",
+    "properties",
+    "nodes",
+    "positions",
+    "texts",
+    "refs",
+    "property_nodes",
+    "parents",
+    "value_nodes",
+)
+"""The names of the counts in the header, in order."""
+
+_BATCHED_COUNTS = {
+    "string_batches": "strings",
+    "propset_batches": "propsets",
+    "node_batches": "nodes",
+    "position_batches": "positions",
+}
+"""Checkpoint column length - counted column length pairs."""
+
+_TYPECODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+"""Item size - `array` typecode pairs of the columns."""
+
+# Node kinds.
+_CHILDREN_ONLY = 1
+_ELEMENT = 2
+_ANY = 3
+_EMPTY = 4
+_STRING = 5
+_FROZEN = 6
+
+# Position types.
+_NODE_ITEM = 0
+"""The item is the next node."""
+
+_TEXT_ITEM = 1
+"""The item is a string, its string index is in the `position_texts` column."""
+
+_NONE_ITEM = 2
+"""The item is `None`."""
+
+_REF_ITEM = 3
+"""The item is a node that appeared earlier, its index is in the `position_refs` column."""
+
+# Property value types.
+_NONE_VALUE = 0
+_FALSE_VALUE = 1
+_TRUE_VALUE = 2
+_INT_VALUE = 3
+_BIG_INT_VALUE = 4
+_FLOAT_VALUE = 5
+_STRING_VALUE = 6
+
+_KINDS: Tuple[Tuple[int, Type[IElement]], ...] = (
+    (_FROZEN, FrozenElement),
+    (_STRING, StringElement),
+    (_EMPTY, EmptyElement),
+    (_ELEMENT, Element),
+    (_CHILDREN_ONLY, ChildrenOnlyElement),
+)
+"""
+Node kind - element base class pairs, in the order they must be checked.
+`AnyElement` (`_ANY`) is checked separately, see `_get_kind()`.
+"""
+
+_KIND_SLOTS: Dict[int, Tuple[str, ...]] = {
+    _FROZEN: ("_markup",),
+    _ANY: ("_tag", "children", "properties"),
+    _STRING: ("properties", "value"),
+    _EMPTY: ("properties",),
+    _ELEMENT: ("children", "properties"),
+    _CHILDREN_ONLY: ("children",),
+}
+"""The attributes of the elements of the different node kinds."""
+
+_VALUE_SLOTS: Dict[int, str] = {_FROZEN: "_markup", _ANY: "_tag", _STRING: "value"}
+"""Node kind - name of the string attribute (stored in the `node_values` column) pairs."""
+
+_IGNORED_SLOTS = frozenset(("_cached_markup", "_parents", "__weakref__", "__dict__"))
+"""Slots that are not serialized: cached elements are restored with no stored markup."""
+
+_MAX_INT_VALUE = 2**32
+"""Integer property values outside of the `[0, _MAX_INT_VALUE)` range are stored as strings."""
+
+
+def dumps(element: Optional[ElementType]) -> bytes:
+    """
+    Serializes the given element tree.
+
+    Supported elements are the instances of `ChildrenOnlyElement`, `Element`, `EmptyElement`,
+    `StringElement`, `FrozenElement`, `AnyElement`, and their subclasses (including cached
+    elements) that are importable by their qualified name and do not define additional
+    attributes. The children of the elements must be elements, strings, or `None`.
+
+    Arguments:
+        element: The root of the tree to serialize.
+
+    Returns:
+        The serialized tree.
+
+    Raises:
+        TypeError: If the tree contains an element, child, or property value that
+                   can not be serialized.
+    """
+    return _Serializer().serialize(element)
+
+
+def dump(element: Optional[ElementType], path: str) -> None:
+    """
+    Serializes the given element tree into the file at the given path.
+
+    See `dumps()` for the supported elements.
+
+    Arguments:
+        element: The root of the tree to serialize.
+        path: The path of the file to save the serialized tree to.
+
+    Raises:
+        TypeError: If the tree contains an element, child, or property value that
+                   can not be serialized.
+    """
+    data = dumps(element)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def loads(data: bytes, *, lazy: bool = False) -> Optional[ElementType]:
+    """
+    Loads an element tree that was serialized with `dumps()`.
+
+    Arguments:
+        data: The serialized tree.
+
+    Keyword arguments:
+        lazy: Whether to create the elements only when they are first accessed.
+              Lazily loaded elements keep a reference to `data`.
+
+    Returns:
+        The root of the loaded tree.
+
+    Raises:
+        ValueError: If the data is not a valid serialized tree or it references
+                    an element class that can not be imported.
+    """
+    return _Deserializer(data).deserialize(lazy)
+
+
+def load(path: str, *, lazy: bool = True) -> Optional[ElementType]:
+    """
+    Loads an element tree from a file that was created with `dump()`.
+
+    In lazy mode, the file is memory-mapped and only the first batch of elements is created
+    during loading. The remaining elements are created one batch at a time, when the children
+    sequence that contains them is first accessed (for example when the tree is rendered), so
+    opening even large documents is nearly instant. Rendering the whole tree is somewhat
+    slower than after an eager load. The memory map (and every loaded element) is kept alive
+    until all lazily loaded children sequences are either materialized or garbage collected.
+
+    Arguments:
+        path: The path of the file to load.
+
+    Keyword arguments:
+        lazy: Whether to memory-map the file and create the elements lazily.
+
+    Returns:
+        The root of the loaded tree.
+
+    Raises:
+        ValueError: If the file is not a valid serialized tree or it references
+                    an element class that can not be imported.
+    """
+    buffer: Union[bytes, mmap.mmap]
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if lazy else f.read()
+
+    return _Deserializer(buffer).deserialize(lazy)
+
+
+class _Serializer:
+    """
+    Builds the columns of a serialized document.
+    """
+
+    __slots__ = (
+        "_classes",
+        "_class_modules",
+        "_class_names",
+        "_columns",
+        "_none_values",
+        "_propsets",
+        "_strings",
+    )
+
+    def __init__(self) -> None:
+        self._classes: Dict[type, Tuple[int, int]] = {}
+        """Element class - class index, node kind dictionary."""
+
+        self._class_modules: List[int] = []
+        """The module name string indexes of the classes."""
+
+        self._class_names: List[int] = []
+        """The qualified name string indexes of the classes."""
+
+        self._columns: Dict[str, List[int]] = {name: [] for name, _ in _COLUMNS}
+        """The columns of the document by name."""
+
+        self._none_values: List[int] = []
+        """The indexes of the `node_values` items that are `None` (not string indexes)."""
+
+        self._propsets: Dict[Any, int] = {}
+        """Property set key - property set index dictionary."""
+
+        self._strings: Dict[str, int] = {}
+        """String - string index dictionary."""
+
+    def serialize(self, element: Optional[ElementType]) -> bytes:
+        """
+        Serializes the given element tree.
+
+        Arguments:
+            element: The root of the tree.
+
+        Returns:
+            The serialized tree.
+        """
+        columns = self._columns
+        node_classes = columns["node_classes"]
+        node_propsets = columns["node_propsets"]
+        node_children = columns["node_children"]
+        node_values = columns["node_values"]
+        position_types = columns["position_types"]
+        position_texts = columns["position_texts"]
+        position_refs = columns["position_refs"]
+        add_string = self._add_string
+        add_properties = self._add_properties
+        get_class = self._get_class
+
+        # Element ID - node index dictionary, and the elements by node index. The nodes are
+        # processed in the order of their indexes, which is breadth-first order.
+        nodes: Dict[int, int] = {}
+        pending: List[Any] = []
+
+        def add_items(items: Iterable[Any]) -> None:
+            for item in items:
+                if isinstance(item, str):
+                    position_types.append(_TEXT_ITEM)
+                    position_texts.append(add_string(item))
+                elif item is None:
+                    position_types.append(_NONE_ITEM)
+                elif isinstance(item, IElement):
+                    key = id(item)
+                    index = nodes.get(key)
+                    if index is None:
+                        nodes[key] = len(pending)
+                        pending.append(item)
+                        position_types.append(_NODE_ITEM)
+                    else:
+                        position_types.append(_REF_ITEM)
+                        position_refs.append(index)
+                else:
+                    raise TypeError(
+                        f"Children of type {type(item).__name__} can not be serialized."
+                    )
+
+        add_items((element,))
+        index = 0
+        while index < len(pending):
+            node = pending[index]
+            index += 1
+            class_index, kind = get_class(type(node))
+            if getattr(node, "__dict__", None):
+                raise TypeError(
+                    f"Elements with instance attributes can not be serialized: {node!r}"
+                )
+
+            node_classes.append(class_index)
+            if kind == _FROZEN:
+                node_values.append(add_string(node._markup))
+                continue
+
+            if kind != _CHILDREN_ONLY:
+                node_propsets.append(add_properties(node.properties))
+
+            if kind == _STRING:
+                value = node.value
+                if value is None:
+                    self._none_values.append(len(node_values))
+                    node_values.append(0)
+                elif isinstance(value, str):
+                    node_values.append(add_string(value))
+                else:
+                    raise TypeError(
+                        f"Unsupported string element value: {type(value).__name__}"
+                    )
+            elif kind != _EMPTY:
+                if kind == _ANY:
+                    node_values.append(add_string(node._tag))
+
+                children: Sequence[Optional[ElementType]] = node.children
+                node_children.append(len(children))
+                add_items(children)
+
+        return self._create_document()
+
+    def _create_document(self) -> bytes:
+        """
+        Creates the document from the collected columns.
+        """
+        columns = self._columns
+        strings = [value.encode("utf-8") for value in self._strings]
+        columns["string_lengths"] = [len(value) for value in strings]
+        columns["class_modules"] = self._class_modules
+        columns["class_names"] = self._class_names
+        none_value = len(strings)
+        node_values = columns["node_values"]
+        for index in self._none_values:
+            node_values[index] = none_value
+
+        columns["string_checkpoints"] = _get_checkpoints(columns["string_lengths"])
+        columns["propset_checkpoints"] = _get_checkpoints(columns["propset_sizes"])
+
+        # Kinds by class index.
+        kinds = [kind for _, kind in sorted(self._classes.values())]
+        node_classes = columns["node_classes"]
+        for name, kind_set in (
+            ("node_propset_checkpoints", (_ANY, _ELEMENT, _EMPTY, _STRING)),
+            ("node_parent_checkpoints", (_ANY, _ELEMENT, _CHILDREN_ONLY)),
+            ("node_value_checkpoints", tuple(_VALUE_SLOTS)),
+        ):
+            mask = [kind in kind_set for kind in kinds]
+            columns[name] = _get_checkpoints([mask[index] for index in node_classes])
+
+        child_positions = list(accumulate(columns["node_children"], initial=1))
+        columns["node_position_checkpoints"] = [
+            child_positions[rank] for rank in columns["node_parent_checkpoints"]
+        ]
+
+        position_types = columns["position_types"]
+        for name, item_type in (
+            ("position_node_checkpoints", _NODE_ITEM),
+            ("position_text_checkpoints", _TEXT_ITEM),
+            ("position_ref_checkpoints", _REF_ITEM),
+        ):
+            columns[name] = _get_checkpoints(
+                [value == item_type for value in position_types]
+            )
+
+        data = b"".join(strings)
+        header = _HEADER.pack(
+            _MAGIC,
+            _VERSION,
+            _BATCH_SHIFT,
+            len(data),
+            len(strings),
+            len(self._class_modules),
+            len(columns["propset_sizes"]),
+            len(columns["property_names"]),
+            len(node_classes),
+            len(position_types),
+            len(columns["position_texts"]),
+            len(columns["position_refs"]),
+            len(columns["node_propsets"]),
+            len(columns["node_children"]),
+            len(node_values),
+        )
+        return b"".join(
+            (header, *(_pack_column(columns[name]) for name, _ in _COLUMNS), data)
+        )
+
+    def _add_properties(self, properties: PropertyDict) -> int:
+        """
+        Returns the index of the given property set, adding it to the document if necessary.
+
+        Arguments:
+            properties: The properties of an element.
+
+        Raises:
+            TypeError: If a property value can not be serialized.
+        """
+        values = properties.values()
+        key: Tuple[Any, ...] = (tuple(properties.items()), tuple(map(type, values)))
+        if float in key[1]:
+            # Equal floats may have different representations (0.0 and -0.0).
+            key += (tuple(map(repr, values)),)
+
+        try:
+            index = self._propsets.get(key)
+        except TypeError:  # Unhashable value, it is reported by _write_properties().
+            return self._write_properties(properties)
+
+        if index is None:
+            index = self._propsets[key] = self._write_properties(properties)
+        return index
+
+    def _write_properties(self, properties: PropertyDict) -> int:
+        """
+        Adds the given property set to the document and returns its index.
+
+        Arguments:
+            properties: The properties of an element.
+
+        Raises:
+            TypeError: If a property value can not be serialized.
+        """
+        columns = self._columns
+        names = columns["property_names"]
+        value_types = columns["property_types"]
+        values = columns["property_values"]
+        add_string = self._add_string
+        for name, value in properties.items():
+            if isinstance(value, str):
+                value_type = _STRING_VALUE
+                value = add_string(value)
+            elif value is None:
+                value_type = _NONE_VALUE
+                value = 0
+            elif value is True or value is False:
+                value_type = _TRUE_VALUE if value else _FALSE_VALUE
+                value = 0
+            elif isinstance(value, int):
+                if 0 <= value < _MAX_INT_VALUE:
+                    value_type = _INT_VALUE
+                    value = int(value)
+                else:
+                    value_type = _BIG_INT_VALUE
+                    value = add_string(str(value))
+            elif isinstance(value, float):
+                value_type = _FLOAT_VALUE
+                value = add_string(repr(value))
+            else:
+                raise TypeError(
+                    f"Property values of type {type(value).__name__} can not be serialized."
+                )
+
+            names.append(add_string(name))
+            value_types.append(value_type)
+            values.append(value)
+
+        sizes = columns["propset_sizes"]
+        sizes.append(len(properties))
+        return len(sizes) - 1
+
+    def _add_string(self, value: str) -> int:
+        """
+        Returns the index of the given string in the string table, adding it if necessary.
+
+        Arguments:
+            value: The string.
+        """
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._strings)
+        return index
+
+    def _get_class(self, cls: type) -> Tuple[int, int]:
+        """
+        Returns the class table index and node kind of the given element class,
+        adding the class to the class table if necessary.
+
+        Arguments:
+            cls: The element class.
+
+        Raises:
+            TypeError: If the instances of the class can not be serialized.
+        """
+        entry = self._classes.get(cls)
+        if entry is not None:
+            return entry
+
+        kind = _get_kind(cls)
+        if kind is None:
+            raise TypeError(
+                f"Elements of type {cls.__qualname__} can not be serialized."
+            )
+
+        slots: Set[str] = set()
+        for klass in cls.__mro__:
+            klass_slots = klass.__dict__.get("__slots__", ())
+            slots.update(
+                (klass_slots,) if isinstance(klass_slots, str) else klass_slots
+            )
+        unsupported = slots.difference(_KIND_SLOTS[kind], _IGNORED_SLOTS)
+        if unsupported:
+            raise TypeError(
+                f"Elements of type {cls.__qualname__} can not be serialized, "
+                f"they have additional attributes: {', '.join(sorted(unsupported))}."
+            )
+
+        if "<locals>" in cls.__qualname__:
+            raise TypeError(
+                f"Elements of type {cls.__qualname__} can not be serialized, "
+                "the class must be importable by its qualified name."
+            )
+
+        entry = self._classes[cls] = (len(self._class_modules), kind)
+        self._class_modules.append(self._add_string(cls.__module__))
+        self._class_names.append(self._add_string(cls.__qualname__))
+        return entry
+
+
+class _NodeLayout(NamedTuple):
+    """
+    Describes how the elements of a class are stored in a document.
+    """
+
+    cls: type
+    """The element class."""
+
+    has_properties: bool
+    """Whether the elements have properties (stored in the `node_propsets` column)."""
+
+    value_slot: Optional[str]
+    """The name of the attribute that is stored in the `node_values` column, if any."""
+
+    cached: bool
+    """Whether the class is a `CachedMixin` subclass."""
+
+    has_children: bool
+    """Whether the elements have children (stored in the `node_children` column)."""
+
+
+class _Deserializer:
+    """
+    Creates elements from a serialized document.
+
+    Eagerly loaded documents are decoded a whole column at a time. Lazily loaded documents
+    are decoded in batches of strings, property sets, nodes, and positions, which are
+    cached by the deserializer, so every node is created only once.
+    """
+
+    __slots__ = (
+        "_buffer",
+        "_columns",
+        "_counts",
+        "_data_offset",
+        "_items",
+        "_layouts",
+        "_nodes",
+        "_propsets",
+        "_shift",
+        "_strings",
+    )
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            buffer: The serialized document.
+
+        Raises:
+            ValueError: If the buffer does not contain a serialized document.
+        """
+        if len(buffer) < _HEADER.size or buffer[:4] != _MAGIC:
+            raise ValueError("The data is not a serialized markyp element tree.")
+
+        _, version, shift, data_size, *counts = _HEADER.unpack_from(buffer)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported serialization format version: {version}.")
+        if not 0 < shift < 32:
+            raise ValueError("The serialized markyp element tree is invalid.")
+
+        lengths = dict(zip(_COUNTS, counts))
+        for name, counted in _BATCHED_COUNTS.items():
+            lengths[name] = (lengths[counted] >> shift) + 1
+
+        columns: Dict[str, Tuple[int, str, int]] = {}
+        offset = _HEADER.size
+        for name, length_name in _COLUMNS:
+            typecode = _TYPECODES.get(buffer[offset]) if offset < len(buffer) else None
+            if typecode is None:
+                raise ValueError("The serialized markyp element tree is invalid.")
+
+            length = lengths[length_name]
+            columns[name] = (offset + 1, typecode, length)
+            offset += 1 + length * array(typecode).itemsize
+
+        if offset + data_size > len(buffer):
+            raise ValueError("The serialized markyp element tree is truncated.")
+
+        self._buffer = buffer
+        """The serialized document."""
+
+        self._columns = columns
+        """Column name - offset, `array` typecode, length dictionary."""
+
+        self._counts = lengths
+        """The lengths of the columns by the names in `_COLUMNS`."""
+
+        self._data_offset = offset
+        """The offset of the string data."""
+
+        self._items: Dict[int, List[Any]] = {}
+        """The loaded batches of positions (children) by batch index."""
+
+        self._layouts: List[_NodeLayout] = []
+        """The node layouts of the element classes, by class index."""
+
+        self._nodes: Dict[int, List[Any]] = {}
+        """The loaded batches of nodes by batch index."""
+
+        self._propsets: Dict[int, List[PropertyDict]] = {}
+        """The loaded batches of property sets by batch index."""
+
+        self._shift: int = shift
+        """The base 2 logarithm of the batch size of lazy loading."""
+
+        self._strings: Dict[int, List[Optional[str]]] = {}
+        """The loaded batches of strings by batch index."""
+
+    def deserialize(self, lazy: bool) -> Optional[ElementType]:
+        """
+        Loads the tree.
+
+        Arguments:
+            lazy: Whether to create the elements only when they are accessed.
+
+        Returns:
+            The root of the tree.
+
+        Raises:
+            ValueError: If the document is invalid or it references an element class
+                        that can not be imported.
+        """
+        try:
+            if lazy:
+                self._load_classes(self._get_string)
+                return self._get_item(0)  # type: ignore[no-any-return]
+
+            # Strings are followed by None, the value of StringElements without a value.
+            strings: List[Optional[str]] = self._decode_strings(
+                0, self._counts["strings"]
+            )
+            strings.append(None)
+            get_string = strings.__getitem__
+            self._load_classes(get_string)
+            propsets = self._decode_propsets(0, self._counts["propsets"], get_string)
+            elements, parents, _ = self._create_nodes(
+                0, self._counts["nodes"], get_string, propsets.__getitem__
+            )
+            items = self._create_items(
+                0,
+                self._counts["positions"],
+                lambda start, end: elements[start:end],
+                elements.__getitem__,
+                get_string,
+            )
+            # Children are stored in node order after the root item.
+            position = 1
+            for parent, count in zip(parents, self._read("node_children")):
+                end = position + count
+                object.__setattr__(parent, "children", tuple(items[position:end]))
+                position = end
+            return items[0]  # type: ignore[no-any-return]
+        except (IndexError, KeyError, OverflowError, StopIteration) as e:
+            raise ValueError("The serialized markyp element tree is invalid.") from e
+
+    def load_children(
+        self, start: int, count: int
+    ) -> Tuple[Optional[ElementType], ...]:
+        """
+        Lazily loads the given children.
+
+        Arguments:
+            start: The position of the first child.
+            count: The number of children.
+        """
+        shift = self._shift
+        batch = start >> shift
+        if (start + count - 1) >> shift != batch:
+            get_item = self._get_item
+            return tuple(get_item(position) for position in range(start, start + count))
+
+        # All the children are in the same batch.
+        self._get_item(start)
+        start -= batch << shift
+        return tuple(self._items[batch][start : start + count])
+
+    def _create_items(
+        self,
+        start: int,
+        end: int,
+        get_nodes: Callable[[int, int], List[Any]],
+        get_node: Callable[[int], Any],
+        get_string: Callable[[int], Optional[str]],
+    ) -> List[Any]:
+        """
+        Creates the items of the given range of positions.
+
+        Arguments:
+            start: The first position, must be the first position of a batch.
+            end: The position after the last position.
+            get_nodes: Function that returns the given range of nodes.
+            get_node: Function that returns the node with the given index.
+            get_string: Function that returns the string with the given index.
+        """
+        batch = start >> self._shift
+        first_node = self._read_value("position_node_checkpoints", batch)
+        first_text = self._read_value("position_text_checkpoints", batch)
+        first_ref = self._read_value("position_ref_checkpoints", batch)
+        item_types = self._read("position_types", start, end)
+        node_count = item_types.count(_NODE_ITEM)
+        text_count = item_types.count(_TEXT_ITEM)
+        ref_count = item_types.count(_REF_ITEM)
+        texts = self._read("position_texts", first_text, first_text + text_count)
+        refs = self._read("position_refs", first_ref, first_ref + ref_count)
+
+        nodes = iter(get_nodes(first_node, first_node + node_count))
+        text_indexes = iter(texts)
+        ref_indexes = iter(refs)
+        items: List[Any] = []
+        append = items.append
+        for item_type in item_types:
+            if item_type == _NODE_ITEM:
+                append(next(nodes))
+            elif item_type == _TEXT_ITEM:
+                append(get_string(next(text_indexes)))
+            elif item_type == _NONE_ITEM:
+                append(None)
+            elif item_type == _REF_ITEM:
+                append(get_node(next(ref_indexes)))
+            else:
+                raise ValueError(f"Invalid position type: {item_type}.")
+
+        return items
+
+    def _create_nodes(
+        self,
+        start: int,
+        end: int,
+        get_string: Callable[[int], Optional[str]],
+        get_propset: Callable[[int], PropertyDict],
+    ) -> Tuple[List[Any], List[Any], int]:
+        """
+        Creates the elements of the given range of nodes without their children.
+
+        Arguments:
+            start: The index of the first node, must be the first index of a batch.
+            end: The index after the last node.
+            get_string: Function that returns the string with the given index.
+            get_propset: Function that returns the property set with the given index.
+
+        Returns:
+            The created elements, the elements that have children, and the position of
+            the first child of the first element that has children.
+        """
+        batch = start >> self._shift
+        node_classes = self._read("node_classes", start, end)
+        propset_count = value_count = 0
+        for class_index, layout in enumerate(self._layouts):
+            count = node_classes.count(class_index)
+            if layout.has_properties:
+                propset_count += count
+            if layout.value_slot is not None:
+                value_count += count
+
+        first = self._read_value("node_propset_checkpoints", batch)
+        propsets = iter(self._read("node_propsets", first, first + propset_count))
+        first = self._read_value("node_value_checkpoints", batch)
+        values = iter(self._read("node_values", first, first + value_count))
+
+        # Elements are created without calling __init__(), their attributes are set with
+        # object.__setattr__(), so cached elements don't invalidate their markup.
+        layouts = self._layouts
+        set_attribute = object.__setattr__
+        elements: List[Any] = []
+        parents: List[Any] = []
+        for class_index in node_classes:
+            cls, has_properties, value_slot, cached, has_children = layouts[class_index]
+            element: Any = object.__new__(cls)
+            if has_properties:
+                set_attribute(element, "properties", get_propset(next(propsets)).copy())
+            if value_slot is not None:
+                set_attribute(element, value_slot, get_string(next(values)))
+            if cached:
+                set_attribute(element, "_cached_markup", None)
+                set_attribute(element, "_parents", None)
+            if has_children:
+                parents.append(element)
+            elements.append(element)
+
+        return elements, parents, self._read_value("node_position_checkpoints", batch)
+
+    def _decode_propsets(
+        self, start: int, end: int, get_string: Callable[[int], Optional[str]]
+    ) -> List[PropertyDict]:
+        """
+        Decodes the given range of property sets.
+
+        Arguments:
+            start: The index of the first property set, must be the first index of a batch.
+            end: The index after the last property set.
+            get_string: Function that returns the string with the given index.
+        """
+        sizes = self._read("propset_sizes", start, end)
+        first = self._read_value("propset_checkpoints", start >> self._shift)
+        last = first + sum(sizes)
+        names = self._read("property_names", first, last)
+        value_types = self._read("property_types", first, last)
+        values = self._read("property_values", first, last)
+
+        propsets: List[PropertyDict] = []
+        position = 0
+        for size in sizes:
+            properties: PropertyDict = {}
+            for index in range(position, position + size):
+                value_type = value_types[index]
+                properties[get_string(names[index])] = (  # type: ignore[index]
+                    get_string(values[index])
+                    if value_type == _STRING_VALUE
+                    else _get_value(value_type, values[index], get_string)  # type: ignore[arg-type]
+                )
+            position += size
+            propsets.append(properties)
+
+        return propsets
+
+    def _decode_strings(self, start: int, end: int) -> List[Optional[str]]:
+        """
+        Decodes the given range of strings.
+
+        Arguments:
+            start: The index of the first string, must be the first index of a batch.
+            end: The index after the last string.
+        """
+        offset = self._data_offset + self._read_value(
+            "string_checkpoints", start >> self._shift
+        )
+        lengths = self._read("string_lengths", start, end)
+        data = self._buffer[offset : offset + sum(lengths)]
+        # The data is decoded at once if it is ASCII text, because then the byte offsets
+        # of the strings are also character offsets.
+        text = str(data, "utf-8")
+        is_ascii = len(text) == len(data)
+        strings: List[Optional[str]] = []
+        position = 0
+        for length in lengths:
+            end = position + length
+            strings.append(
+                text[position:end] if is_ascii else str(data[position:end], "utf-8")
+            )
+            position = end
+
+        return strings
+
+    def _get_item(self, position: int) -> Any:
+        """
+        Returns the item at the given position, loading its batch if necessary.
+
+        Arguments:
+            position: The position of the item.
+        """
+        shift = self._shift
+        batch = position >> shift
+        items = self._items.get(batch)
+        if items is None:
+            start = batch << shift
+            end = min(start + (1 << shift), self._counts["positions"])
+            items = self._items[batch] = self._create_items(
+                start, end, self._get_nodes, self._get_node, self._get_string
+            )
+        return items[position - (batch << shift)]
+
+    def _get_node(self, index: int) -> Any:
+        """
+        Returns the node with the given index, loading its batch if necessary.
+
+        Arguments:
+            index: The index of the node.
+        """
+        shift = self._shift
+        batch = index >> shift
+        nodes = self._nodes.get(batch)
+        if nodes is None:
+            start = batch << shift
+            end = min(start + (1 << shift), self._counts["nodes"])
+            nodes, parents, position = self._create_nodes(
+                start, end, self._get_string, self._get_propset
+            )
+            self._nodes[batch] = nodes
+            first = self._read_value("node_parent_checkpoints", batch)
+            counts = self._read("node_children", first, first + len(parents))
+            set_attribute = object.__setattr__
+            for parent, count in zip(parents, counts):
+                set_attribute(
+                    parent,
+                    "children",
+                    _LazyChildren(self, position, count) if count else (),
+                )
+                position += count
+        return nodes[index - (batch << shift)]
+
+    def _get_nodes(self, start: int, end: int) -> List[Any]:
+        """
+        Returns the given range of nodes, loading their batches if necessary.
+
+        Arguments:
+            start: The index of the first node.
+            end: The index after the last node.
+        """
+        shift = self._shift
+        nodes: List[Any] = []
+        while start < end:
+            offset = (start >> shift) << shift
+            self._get_node(start)
+            nodes.extend(self._nodes[start >> shift][start - offset : end - offset])
+            start = offset + (1 << shift)
+        return nodes
+
+    def _get_propset(self, index: int) -> PropertyDict:
+        """
+        Returns the property set with the given index, loading its batch if necessary.
+
+        Arguments:
+            index: The index of the property set.
+        """
+        shift = self._shift
+        batch = index >> shift
+        propsets = self._propsets.get(batch)
+        if propsets is None:
+            start = batch << shift
+            end = min(start + (1 << shift), self._counts["propsets"])
+            propsets = self._propsets[batch] = self._decode_propsets(
+                start, end, self._get_string
+            )
+        return propsets[index - (batch << shift)]
+
+    def _get_string(self, index: int) -> Optional[str]:
+        """
+        Returns the string with the given index, loading its batch if necessary.
+        The index after the last string is `None`.
+
+        Arguments:
+            index: The index of the string.
+        """
+        shift = self._shift
+        batch = index >> shift
+        strings = self._strings.get(batch)
+        if strings is None:
+            start = batch << shift
+            count = self._counts["strings"]
+            end = min(start + (1 << shift), count)
+            strings = self._strings[batch] = self._decode_strings(start, end)
+            if end == count:
+                strings.append(None)
+        return strings[index - (batch << shift)]
+
+    def _load_classes(self, get_string: Callable[[int], Optional[str]]) -> None:
+        """
+        Imports the element classes of the document.
+
+        Arguments:
+            get_string: Function that returns the string with the given index.
+
+        Raises:
+            ValueError: If a class can not be imported or it is not an element class.
+        """
+        for module_index, name_index in zip(
+            self._read("class_modules"), self._read("class_names")
+        ):
+            module_name = get_string(module_index)
+            qualified_name = get_string(name_index)
+            try:
+                cls: Any = importlib.import_module(module_name)  # type: ignore[arg-type]
+                for name in qualified_name.split("."):  # type: ignore[union-attr]
+                    cls = getattr(cls, name)
+            except (ImportError, AttributeError) as e:
+                raise ValueError(
+                    f"Failed to import element class {module_name}.{qualified_name}."
+                ) from e
+
+            kind = _get_kind(cls) if isinstance(cls, type) else None
+            if kind is None:
+                raise ValueError(
+                    f"{module_name}.{qualified_name} is not a supported element class."
+                )
+
+            self._layouts.append(
+                _NodeLayout(
+                    cls=cls,
+                    has_properties=kind not in (_FROZEN, _CHILDREN_ONLY),
+                    value_slot=_VALUE_SLOTS.get(kind),
+                    cached=issubclass(cls, CachedMixin),
+                    has_children=kind in (_ANY, _ELEMENT, _CHILDREN_ONLY),
+                )
+            )
+
+    def _read(
+        self, name: str, start: int = 0, end: Optional[int] = None
+    ) -> "array[int]":
+        """
+        Returns the given range of the given column.
+
+        Arguments:
+            name: The name of the column.
+            start: The index of the first item.
+            end: The index after the last item, `None` for the end of the column.
+        """
+        offset, typecode, length = self._columns[name]
+        values = array(typecode)
+        size = values.itemsize
+        values.frombytes(
+            self._buffer[
+                offset + start * size : offset + (length if end is None else end) * size
+            ]
+        )
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def _read_value(self, name: str, index: int) -> int:
+        """
+        Returns the given item of the given column.
+
+        Arguments:
+            name: The name of the column.
+            index: The index of the item.
+        """
+        offset, typecode, length = self._columns[name]
+        if not 0 <= index < length:
+            raise IndexError(f"Invalid {name} index: {index}")
+
+        size = array(typecode).itemsize
+        return int.from_bytes(
+            self._buffer[offset + index * size : offset + (index + 1) * size], "little"
+        )
+
+
+class _LazyChildren(Sequence[Optional[ElementType]]):
+    """
+    The children of a lazily loaded element.
+
+    The children are loaded when the sequence is first accessed (except for `len()`),
+    after that the sequence only holds a reference to the loaded children.
+    """
+
+    __slots__ = ("_count", "_deserializer", "_items", "_start")
+
+    def __init__(self, deserializer: _Deserializer, start: int, count: int) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            deserializer: The deserializer of the document the children are loaded from.
+            start: The position of the first child.
+            count: The number of children.
+        """
+        self._count = count
+        self._deserializer: Optional[_Deserializer] = deserializer
+        self._items: Tuple[Optional[ElementType], ...] = ()
+        self._start = start
+
+    @overload
+    def __getitem__(self, index: int) -> Optional[ElementType]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[Optional[ElementType]]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        return self._load()[index]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Optional[ElementType]]:
+        return iter(self._load())
+
+    def __reversed__(self) -> Iterator[Optional[ElementType]]:
+        return reversed(self._load())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (_LazyChildren, tuple)):
+            return self._load() == tuple(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Pickled as a tuple, the copy does not depend on the serialized document.
+        return (tuple, (self._load(),))
+
+    def __repr__(self) -> str:
+        return repr(self._load())
+
+    def _load(self) -> Tuple[Optional[ElementType], ...]:
+        """
+        Returns the children, loading them if necessary.
+        """
+        deserializer = self._deserializer
+        if deserializer is not None:
+            self._items = deserializer.load_children(self._start, self._count)
+            self._deserializer = None
+        return self._items
+
+
+def _get_checkpoints(values: Iterable[int]) -> List[int]:
+    """
+    Returns the sum of the items of the given column before every batch of items.
+
+    Arguments:
+        values: The items of the column.
+    """
+    return list(accumulate(values, initial=0))[:: 1 << _BATCH_SHIFT]
+
+
+def _pack_column(values: Sequence[int]) -> bytes:
+    """
+    Returns the binary representation of the given column of non-negative integers,
+    using the smallest sufficient integer size.
+
+    Arguments:
+        values: The items of the column.
+    """
+    maximum = max(values, default=0)
+    typecode = (
+        "B"
+        if maximum < 2**8
+        else "H" if maximum < 2**16 else "I" if maximum < 2**32 else "Q"
+    )
+    column = array(typecode, values)
+    return bytes((column.itemsize,)) + _to_little_endian(column)
+
+
+def _to_little_endian(values: "array[int]") -> bytes:
+    """
+    Returns the little-endian binary representation of the given array.
+
+    Arguments:
+        values: The array to convert.
+    """
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _get_kind(cls: type) -> Optional[int]:
+    """
+    Returns the node kind of the given element class, `None` if the class is not supported.
+
+    Arguments:
+        cls: The element class.
+    """
+    # AnyElement subclasses can only exist if the parser module has been imported,
+    # so it is not imported here (serialization doesn't depend on the parser).
+    parser = sys.modules.get("markyp.parser")
+    if parser is not None and issubclass(cls, parser.AnyElement):
+        return _ANY
+
+    for kind, base in _KINDS:
+        if issubclass(cls, base):
+            return kind
+    return None
+
+
+def _get_value(
+    value_type: int, value: int, get_string: Callable[[int], str]
+) -> PropertyValue:
+    """
+    Decodes a property value.
+
+    Arguments:
+        value_type: The type of the value.
+        value: The value column item of the property.
+        get_string: Function that returns the string with the given index.
+
+    Raises:
+        ValueError: If the value type is invalid.
+    """
+    if value_type == _STRING_VALUE:
+        return get_string(value)
+    if value_type == _INT_VALUE:
+        return value
+    if value_type == _NONE_VALUE:
+        return None
+    if value_type == _TRUE_VALUE or value_type == _FALSE_VALUE:
+        return value_type == _TRUE_VALUE
+    if value_type == _FLOAT_VALUE:
+        return float(get_string(value))
+    if value_type == _BIG_INT_VALUE:
+        return int(get_string(value))
+    raise ValueError(f"Invalid property value type: {value_type}.")
@@ -2,16 +2,50 @@
 Element handling utilities.
 """
 
-from typing import Callable, Iterator, List, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-from markyp import ElementType
+from collections.abc import Sequence
 
+from markyp import ElementType, IElement
+from markyp.elements import (
+    ChildrenOnlyElement,
+    Element,
+    EmptyElement,
+    StringElement,
+    freeze,
+    has_structural_markup,
+)
+from markyp.properties import PropertyPool, get_items_key
 
-__all__ = ("join_elements", "join_generator")
+
+__all__ = ("deduplicate", "join_elements", "join_generator", "share_properties")
 
 
 Separator = Union[ElementType, Callable[[], ElementType]]
 
+_IGNORED_SLOTS = frozenset(("__dict__", "__weakref__", "_cached_markup", "_parents"))
+"""Slots that are not part of the structure of elements."""
+
+_MISSING = object()
+"""Marker for slots that have not been set."""
+
+_structure_slots: Dict[type, Tuple[str, ...]] = {}
+"""Element class - structure slot names cache of `_get_structure_slots()`."""
+
+_mergeable_classes: Dict[type, bool] = {}
+"""Element class - whether its instances can be merged, see `deduplicate()`."""
+
 
 def join_elements(items: List[ElementType], separator: Separator) -> List[ElementType]:
     """
@@ -45,3 +79,237 @@ def join_generator(
         yield item
         if i < item_count - 1:
             yield sep()
+
+
+def share_properties(
+    element: ElementType, pool: Optional[PropertyPool] = None
+) -> PropertyPool:
+    """
+    Replaces the properties of every `Element`, `EmptyElement`, and `StringElement` in the
+    given tree with the `SharedProperties` from the given pool.
+
+    Elements with identical properties will share a single immutable properties dictionary,
+    whose markup is formatted only once. Elements copy their shared properties when they are
+    changed with `__setitem__()` or `__delitem__()`. Elements whose properties contain
+    unhashable values are left unchanged.
+
+    Arguments:
+        element: The root of the tree.
+        pool: The pool to intern properties with. A new pool is created if it is not set,
+              pass the returned pool to subsequent calls to share properties between trees.
+
+    Returns:
+        The pool that was used to intern properties.
+    """
+    if pool is None:
+        pool = PropertyPool()
+
+    intern = pool.intern
+    visited: Set[int] = set()
+    stack: List[ElementType | None] = [element]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str) or item is None or id(item) in visited:
+            continue
+
+        visited.add(id(item))
+        if isinstance(item, (Element, EmptyElement, StringElement)):
+            try:
+                item.properties = intern(item.properties)
+            except TypeError:
+                pass  # Unhashable property value.
+
+        if isinstance(item, (Element, ChildrenOnlyElement)):
+            stack.extend(item.children)
+
+    return pool
+
+
+def deduplicate(element: ElementType, *, freeze_shared: bool = True) -> ElementType:
+    """
+    Merges the structurally identical subtrees of the given tree into a single shared
+    instance (hash-consing), and returns the root of the deduplicated tree.
+
+    Elements are identical if they have the same type, the same properties (in the same
+    order, with values of the same type), identical children, and equal values in all other
+    attributes (except the stored markup of `CachedMixin` elements). Elements that have
+    an attribute with an unhashable value or children that are neither strings nor
+    `IElement`s are not merged, but their descendants are. Equal strings are also merged.
+    `BaseElement` subclasses and elements whose class overrides `__str__()` are never merged
+    (and never frozen), because their markup may change every time they are rendered.
+
+    The tree is changed in place: the `children` of elements are replaced by sequences
+    of the shared instances, lists are replaced by lists, other sequences by tuples.
+    By default, the elements that appear more than once in the
+    deduplicated tree are replaced by `FrozenElement`s, so they can not be changed, and
+    their markup is created only once and reused by every occurrence.
+
+    The tree is processed iteratively (bottom-up), so its depth is not limited by the
+    recursion limit of the interpreter.
+
+    Arguments:
+        element: The root of the tree.
+
+    Keyword arguments:
+        freeze_shared: Whether the elements that appear more than once in the deduplicated
+                       tree should be replaced by `FrozenElement`s. If `False`, the shared
+                       elements are kept as they are, so changing one of them changes all
+                       of its occurrences, and the tree should be treated as read-only.
+
+    Returns:
+        The root of the deduplicated tree.
+    """
+    if not isinstance(element, IElement):
+        return element
+
+    # Original element id - (original element, deduplicated element). Original elements
+    # are kept alive, so their ids can not be reused by other objects.
+    replacements: Dict[int, Tuple[IElement, IElement]] = {}
+    # Structural key - deduplicated element.
+    elements: Dict[Hashable, IElement] = {}
+    strings: Dict[str, str] = {}
+    # Deduplicated element id - number of occurrences, only for elements with a key.
+    occurrences: Dict[int, int] = {}
+    # Deduplicated elements in postorder.
+    order: List[IElement] = []
+
+    # Elements whose children must be processed first, and element - structure slots -
+    # children tuples of elements whose children have been processed.
+    stack: List[Any] = [element]
+    while stack:
+        entry = stack.pop()
+        if entry.__class__ is not tuple:
+            if id(entry) not in replacements:
+                names = _get_structure_slots(entry.__class__)
+                children = _get_children(entry, names)
+                stack.append((entry, names, children))
+                if children:
+                    stack.extend(
+                        child for child in children if isinstance(child, IElement)
+                    )
+            continue
+
+        item, names, children = entry
+        if id(item) in replacements:
+            continue
+
+        cls = item.__class__
+        hashable = _mergeable_classes.get(cls)
+        if hashable is None:
+            hashable = _mergeable_classes[cls] = has_structural_markup(cls)
+        key: List[Any] = [cls]
+        if children is not None:
+            new_children: List[Any] = []
+            changed = False
+            for child in children:
+                if isinstance(child, str):
+                    new_child: Any = strings.setdefault(child, child)
+                    key.append(new_child)
+                elif isinstance(child, IElement):
+                    new_child = replacements[id(child)][1]
+                    key.append(id(new_child))
+                else:
+                    new_child = child
+                    key.append(None)
+                    hashable = hashable and child is None
+                changed = changed or new_child is not child
+                new_children.append(new_child)
+
+            if changed:
+                item.children = (  # type: ignore[attr-defined]
+                    new_children if children.__class__ is list else tuple(new_children)
+                )
+
+        for name in names:
+            if name == "children":
+                hashable = hashable and children is not None
+                continue
+
+            value = getattr(item, name, _MISSING)
+            if name == "properties":
+                if isinstance(value, dict):
+                    key.append(get_items_key(value.items()))
+                else:
+                    hashable = False
+            else:
+                # Slots are in a fixed order, so only the value must be in the key.
+                key.append(value.__class__)
+                key.append(repr(value) if value.__class__ is float else value)
+
+        state = getattr(item, "__dict__", None)
+        if state:
+            key.append(get_items_key(sorted(state.items())))
+
+        result = item
+        if hashable:
+            try:
+                result = elements.setdefault(tuple(key), item)
+            except TypeError:
+                hashable = False  # Unhashable attribute value.
+
+        replacements[id(item)] = (item, result)
+        if result is item:
+            order.append(item)
+            if hashable:
+                occurrences[id(item)] = 0
+            if children is not None:
+                for child in new_children:
+                    if id(child) in occurrences:
+                        occurrences[id(child)] += 1
+
+    root = replacements[id(element)][1]
+    if not freeze_shared:
+        return root
+
+    frozen: Dict[int, IElement] = {}
+    for item in order:
+        children = _get_children(item, _get_structure_slots(type(item)))
+        if frozen and children and any(id(child) in frozen for child in children):
+            new_children = [frozen.get(id(child), child) for child in children]
+            item.children = (  # type: ignore[attr-defined]
+                new_children if children.__class__ is list else tuple(new_children)
+            )
+
+        if occurrences.get(id(item), 0) > 1:
+            frozen[id(item)] = freeze(item)
+
+    return root
+
+
+def _get_children(element: IElement, names: Tuple[str, ...]) -> Optional[Sequence[Any]]:
+    """
+    Returns the children of the given element if they are stored in its `children` slot
+    as a sequence, `None` otherwise.
+
+    Arguments:
+        element: The element whose children are required.
+        names: The structure slots of the element.
+    """
+    if "children" not in names:
+        return None
+
+    children = getattr(element, "children", None)
+    if children.__class__ is tuple or children.__class__ is list:
+        return children  # type: ignore[no-any-return]
+    if isinstance(children, Sequence) and not isinstance(children, str):
+        return children
+
+    return None
+
+
+def _get_structure_slots(cls: type) -> Tuple[str, ...]:
+    """
+    Returns the names of the slots that store the structure of the instances of the given
+    element class.
+
+    Arguments:
+        cls: The element class.
+    """
+    result = _structure_slots.get(cls)
+    if result is None:
+        names: Set[str] = set()
+        for base in cls.__mro__:
+            slots = base.__dict__.get("__slots__", ())
+            names.update((slots,) if isinstance(slots, str) else slots)
+        result = _structure_slots[cls] = tuple(sorted(names - _IGNORED_SLOTS))
+    return result
@@ -0,0 +1,253 @@
+"""
+Streaming markup writer that creates markup without building an element tree.
+"""
+
+from typing import Any, List, Optional
+
+from markyp import ElementType, PropertyDict, PropertyValue
+from markyp.elements import iter_markup
+from markyp import formatters as _formatters
+from markyp.formatters import format_properties
+
+
+__all__ = ("MarkupWriter",)
+
+
+class MarkupWriter:
+    """
+    Writer that emits markup directly into an output stream.
+
+    Tags are opened using context managers and closed automatically when the context is exited,
+    so only the currently open tags are kept in memory:
+
+    ```Python
+    writer = MarkupWriter(stream)
+    with writer.tag("urlset"):
+        for address in addresses:
+            with writer.tag("url", priority=1):
+                writer.text(address)
+    ```
+
+    The created markup is identical to the markup of the equivalent element tree: tags created
+    with `tag()` are formatted like `Element`s, tags created with `inline_tag()` are formatted
+    like `Element`s whose `inline_children` property is `True`, properties are formatted with
+    `format_properties()`, and text is XML-escaped. Items that are written outside of any tag
+    are separated by new lines, like the children of an `ElementSequence`.
+    """
+
+    __slots__ = ("_context", "_count", "_frames", "_write")
+
+    def __init__(self, stream: Any) -> None:
+        """
+        Initialization.
+
+        Arguments:
+            stream: Text stream (an object with a `write()` method that accepts strings)
+                    the writer should write the created markup to.
+        """
+        self._context = _TagContext(self)
+        """The context manager that is returned by tag opening methods."""
+
+        self._count: int = 0
+        """The number of items that have been written outside of any tag."""
+
+        self._frames: List[List[Any]] = []
+        """Closing tag - inline flag - child count lists of the currently open tags."""
+
+        self._write = stream.write
+        """The method to use to write markup into the output stream."""
+
+    @property
+    def depth(self) -> int:
+        """
+        The number of currently open tags.
+        """
+        return len(self._frames)
+
+    def tag(
+        self, tag: str, /, *, class_: Optional[str] = None, **kwargs: PropertyValue
+    ) -> "_TagContext":
+        """
+        Opens a tag whose children will be placed on new lines, like the children of `Element`.
+
+        The `class_` keyword argument is converted into the `class` element property,
+        other keyword arguments are converted to element properties as they were defined.
+
+        Arguments:
+            tag: The name of the tag.
+
+        Returns:
+            Context manager that closes the tag when it exits.
+        """
+        return self._open(tag, False, class_, kwargs)
+
+    def inline_tag(
+        self, tag: str, /, *, class_: Optional[str] = None, **kwargs: PropertyValue
+    ) -> "_TagContext":
+        """
+        Opens a tag whose children will be placed on the same line as the tag.
+
+        The `class_` keyword argument is converted into the `class` element property,
+        other keyword arguments are converted to element properties as they were defined.
+
+        Arguments:
+            tag: The name of the tag.
+
+        Returns:
+            Context manager that closes the tag when it exits.
+        """
+        return self._open(tag, True, class_, kwargs)
+
+    def text(self, value: str) -> None:
+        """
+        Writes the given text as a child of the current tag. The text is XML-escaped.
+
+        Arguments:
+            value: The text to write.
+        """
+        self._begin_child()
+        self._write(_formatters._xml_escaper(value))
+        self._end_child()
+
+    def raw(self, markup: str) -> None:
+        """
+        Writes the given markup as a child of the current tag without escaping it.
+
+        Arguments:
+            markup: The markup to write.
+        """
+        self._begin_child()
+        self._write(markup)
+        self._end_child()
+
+    def element(self, element: Optional[ElementType]) -> None:
+        """
+        Renders the given element as a child of the current tag.
+
+        The markup of the element is written to the output stream in chunks. `None` is ignored,
+        strings are XML-escaped.
+
+        Arguments:
+            element: The element to write.
+        """
+        if element is None:
+            return
+
+        self._begin_child()
+        write = self._write
+        for chunk in iter_markup(element):
+            write(chunk)
+        self._end_child()
+
+    def empty(
+        self, tag: str, /, *, class_: Optional[str] = None, **kwargs: PropertyValue
+    ) -> None:
+        """
+        Writes a tag with the given properties and no children, like `EmptyElement`.
+
+        Arguments:
+            tag: The name of the tag.
+        """
+        if class_ is not None:
+            kwargs["class"] = class_
+        self.raw(f"<{tag} {format_properties(kwargs)}></{tag}>")
+
+    def self_closed(
+        self, tag: str, /, *, class_: Optional[str] = None, **kwargs: PropertyValue
+    ) -> None:
+        """
+        Writes a self-closed tag with the given properties, like `SelfClosedElement`.
+
+        Arguments:
+            tag: The name of the tag.
+        """
+        if class_ is not None:
+            kwargs["class"] = class_
+        self.raw(f"<{tag} {format_properties(kwargs)}/>")
+
+    def standalone(
+        self, tag: str, /, *, class_: Optional[str] = None, **kwargs: PropertyValue
+    ) -> None:
+        """
+        Writes a tag with the given properties and no closing tag, like `StandaloneElement`.
+
+        Arguments:
+            tag: The name of the tag.
+        """
+        if class_ is not None:
+            kwargs["class"] = class_
+        self.raw(f"<{tag} {format_properties(kwargs)}>")
+
+    def close(self) -> None:
+        """
+        Closes the innermost open tag.
+
+        Raises:
+            ValueError: If there is no open tag.
+        """
+        if not self._frames:
+            raise ValueError("There is no open tag to close.")
+
+        self._write(self._frames.pop()[0])
+        self._end_child()
+
+    def _open(
+        self, tag: str, inline: bool, class_: Optional[str], properties: PropertyDict
+    ) -> "_TagContext":
+        """
+        Writes the opening tag of a new element and makes it the current tag.
+
+        Arguments:
+            tag: The name of the tag.
+            inline: Whether the children of the tag should be placed on the same line.
+            class_: The value of the `class` property.
+            properties: The properties of the tag.
+        """
+        if class_ is not None:
+            properties["class"] = class_
+
+        self._begin_child()
+        self._write(f"<{tag} {format_properties(properties)}>")
+        self._frames.append([f"</{tag}>", inline, 0])
+        return self._context
+
+    def _begin_child(self) -> None:
+        """
+        Writes the separator that must precede the next child of the current tag.
+        """
+        if self._frames:
+            frame = self._frames[-1]
+            if frame[1]:
+                if frame[2] > 0:
+                    self._write(" ")
+            elif frame[2] == 0:
+                self._write("\n")
+            frame[2] += 1
+        else:
+            if self._count > 0:
+                self._write("\n")
+            self._count += 1
+
+    def _end_child(self) -> None:
+        """
+        Writes the separator that must follow a child of the current tag.
+        """
+        if self._frames and not self._frames[-1][1]:
+            self._write("\n")
+
+
+class _TagContext:
+    """
+    Context manager that closes the innermost open tag of a `MarkupWriter` when it exits.
+    """
+
+    __slots__ = ("_writer",)
+
+    def __init__(self, writer: MarkupWriter) -> None:
+        self._writer = writer
+
+    def __enter__(self) -> MarkupWriter:
+        return self._writer
+
+    def __exit__(self, *args: Any) -> None:
+        self._writer.close()
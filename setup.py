@@ -67,8 +67,9 @@ setup(
         "Typing :: Typed",
     ],
     keywords="markup generator utility xml html rss",
-    packages=find_packages(exclude=["test"]),
+    packages=find_packages(exclude=["benchmarks", "test"]),
     package_data={"markyp": ["py.typed"]},
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={"lxml": ["lxml>=5.0"]},
 )
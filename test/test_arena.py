@@ -0,0 +1,84 @@
+import os
+import pickle
+
+import pytest
+
+from markyp.arena import ArenaBuilder, ArenaDocument, ArenaElement
+from markyp.elements import Element, iter_markup
+from markyp.parser import Parser
+
+
+DOCUMENT = (
+    "<catalog version='2'>"
+    "<item id='1' name='a &quot;quoted&quot; name'>First &amp; best</item>"
+    "<item id='2'>\n  <price currency='EUR'>10</price>\n  tail <note/>\n</item>"
+    "<item id='3'>Text <b>skipped</b></item>"
+    "<empty />"
+    "</catalog>"
+)
+
+
+def test_arena_document():
+    parser = Parser()
+    document = parser.fromstring_arena(DOCUMENT)
+
+    assert isinstance(document, ArenaDocument)
+    assert str(document) == str(parser.fromstring(DOCUMENT))
+    assert "".join(iter_markup(document, 16)) == str(document)
+    assert document.node_count == 10
+
+    root = document.root
+    assert isinstance(root, ArenaElement)
+    assert root.element_name == "catalog"
+    assert root.properties == {"version": "2"}
+    assert root.parent is None
+    assert str(root) == str(document)
+
+    first, second, third, empty = root.children
+    assert first.properties == {"id": "1", "name": "a &quot;quoted&quot; name"}
+    assert first.children == ("First & best",)
+    assert first.parent == root
+    assert [child.element_name for child in second.children] == ["price", "note"]
+    assert second.children[0].children == ("10",)
+    assert third.children == ("Text",)
+    assert empty.children == ()
+    assert str(empty) == "<empty ></empty>"
+    assert list(document.iter_children(first.index)) == [2]
+    assert document.get_node(2) == "First & best"
+
+    assert str(Element(root.children[0])) == f"<Element >\n{first}\n</Element>"
+    assert str(pickle.loads(pickle.dumps(document))) == str(document)
+
+
+def test_empty_arena_document():
+    document = ArenaBuilder().close()
+    assert document.node_count == 0
+    assert document.root is None
+    assert str(document) == ""
+    # Documents are elements, they are not falsy even if they have no nodes.
+    assert document
+
+
+def test_parse_arena(tmp_path):
+    path = os.path.join(tmp_path, "catalog.xml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(DOCUMENT)
+
+    parser = Parser()
+    assert str(parser.parse_arena(path)) == str(parser.parse(path))
+
+
+def test_lxml_arena_document():
+    pytest.importorskip("lxml")
+
+    parser = Parser(backend="lxml")
+    assert str(parser.fromstring_arena(DOCUMENT)) == str(Parser().fromstring(DOCUMENT))
+
+
+def test_deep_arena_document():
+    depth = 2000
+    data = "<a>" * depth + "text" + "</a>" * depth
+    parser = Parser()
+    document = parser.fromstring_arena(data)
+    assert document.node_count == depth + 1
+    assert str(document) == str(parser.fromstring(data))
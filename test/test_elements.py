@@ -1,14 +1,39 @@
+import asyncio
+import gzip
+import io
+import pickle
+import subprocess
+import sys
+import zlib
 from functools import partial
 
+import pytest
+
+from markyp import IElement
+from markyp.formatters import format_properties
+
 from markyp.elements import (
     BaseElement,
+    CachedElement,
+    CachedEmptyElement,
+    CachedMixin,
+    CachedStringElement,
     ChildrenOnlyElement,
     Element,
     ElementSequence,
     EmptyElement,
+    FrozenElement,
+    PartsElement,
+    RenderMode,
     SelfClosedElement,
     StandaloneElement,
     StringElement,
+    arender,
+    freeze,
+    has_structural_markup,
+    iter_markup,
+    render,
+    render_to,
 )
 
 
@@ -496,3 +521,568 @@ def test_property_lookup():
 
         del e["key"]
         assert len(e.properties) == 0
+
+
+def test_has_structural_markup():
+    class Custom(Element):
+        __slots__ = ()
+
+        def __str__(self):
+            return "custom"
+
+    class CustomCached(CachedMixin, Custom):
+        __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+    for cls in (Element, StringElement, FrozenElement, CachedElement, PartsElement):
+        assert has_structural_markup(cls)
+    for cls in (BaseElement, IElement, Custom, CustomCached):
+        assert not has_structural_markup(cls)
+
+
+def test_parts_element():
+    class Pair(PartsElement):
+        __slots__ = ("first", "second")
+
+        def __init__(self, first, second):
+            self.first = first
+            self.second = second
+
+        def get_render_parts(self):
+            return (
+                "<pair>",
+                (self.first, None, self.second),
+                RenderMode.INLINE,
+                "</pair>",
+            )
+
+    class DerivedPair(Pair):
+        __slots__ = ()
+
+    element = Pair("a", DerivedPair(StringElement("b&"), Element()))
+    markup = "<pair>a <pair><StringElement >b&amp;</StringElement> <Element ></Element></pair></pair>"
+    assert str(element) == markup
+    assert render(element) == markup
+    assert "".join(iter_markup(element, 1)) == markup
+    assert str(Element(element)) == f"<Element >\n{markup}\n</Element>"
+
+    with pytest.raises(NotImplementedError):
+        str(PartsElement())
+
+
+def test_render_templates():
+    class static_name(Element):
+        __slots__ = ()
+        element_name = "static"
+
+    class dynamic_name(Element):
+        __slots__ = ("tag",)
+
+        def __init__(self, *args, tag, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.tag = tag
+
+        @property
+        def element_name(self):
+            return self.tag
+
+    class inline(ChildrenOnlyElement):
+        __slots__ = ()
+
+        @property
+        def inline_children(self):
+            return True
+
+    class static_inline(Element):
+        __slots__ = ()
+        inline_children = True
+
+    class derived(dynamic_name):
+        __slots__ = ()
+
+    class cached(CachedMixin, StringElement):
+        __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+    assert str(Element()) == "<Element ></Element>"
+    assert Element._render_template[:3] == ("<Element ", "</Element>", 0)
+    assert static_name._render_template[:3] == ("<static ", "</static>", 0)
+    assert static_inline._render_template[:3] == (
+        "<static_inline ",
+        "</static_inline>",
+        1,
+    )
+    assert dynamic_name._render_template[:3] == (None, None, 0)
+    assert derived._render_template[:3] == (None, None, 0)
+    assert inline._render_template[:3] == ("<inline>", "</inline>", None)
+    assert SelfClosedElement._render_template[:3] == (
+        "<SelfClosedElement ",
+        "</SelfClosedElement>",
+        0,
+    )
+
+    assert str(static_name("a", id=1)) == '<static id="1">\na\n</static>'
+    assert str(static_inline("a", "b")) == "<static_inline >a b</static_inline>"
+    assert str(dynamic_name("a", tag="x")) == "<x >\na\n</x>"
+    assert str(derived(tag="y")) == "<y ></y>"
+    assert str(inline("a", "b")) == "<inline>a b</inline>"
+    assert str(cached("a", id=1)) == '<cached id="1">a</cached>'
+
+
+def test_render_templates_stale():
+    class Base(Element):
+        __slots__ = ()
+
+        def __init_subclass__(cls, **kwargs):
+            pass
+
+    class div(Base):
+        __slots__ = ()
+
+    class span(Element):
+        __slots__ = ()
+
+    class br(SelfClosedElement):
+        __slots__ = ()
+
+    class unslotted(Element):
+        element_name = "p"
+
+    assert str(div("x")) == "<div >\nx\n</div>"
+    assert str(Base("x")) == "<Base >\nx\n</Base>"
+    assert str(div("x")) == "<div >\nx\n</div>"
+
+    assert str(span("a", "b")) == "<span >\na\nb\n</span>"
+    span.inline_children = True  # type: ignore[misc]
+    span.element_name = "s"  # type: ignore[assignment]
+    assert str(span("a", "b")) == "<s >a b</s>"
+
+    assert str(br()) == "<br />"
+    br.element_name = "hr"  # type: ignore[assignment]
+    assert str(br()) == "<hr />"
+
+    element = unslotted("a")
+    assert str(element) == "<p >\na\n</p>"
+    element.element_name = "q"  # type: ignore[misc]
+    assert str(element) == "<q >\na\n</q>"
+
+
+def test_render():
+    class TE(Element):
+        __slots__ = ()
+
+        @property
+        def inline_children(self):
+            return True
+
+    class Doc(Element):
+        __slots__ = ()
+
+        def __str__(self):
+            return f"<!DOCTYPE doc>\n{super().__str__()}"
+
+    assert render("<&>") == "&lt;&amp;&gt;"
+    assert render(Element()) == str(Element()) == "<Element ></Element>"
+    assert render(Element(None)) == "<Element >\n</Element>"
+    assert render(TE()) == "<TE ></TE>"
+    assert render(TE(None, "foo", None, 42, "<bar>")) == "<TE >foo 42 &lt;bar&gt;</TE>"
+    assert render(ElementSequence(None, "foo", TE("bar"))) == "foo\n<TE >bar</TE>"
+    # Separators of nested elements in different modes, with missing children.
+    nested = TE(
+        None,
+        Element(None, "a", TE(None, "b", Element()), None),
+        "c",
+        ElementSequence("d", None, TE("e")),
+    )
+    assert (
+        render(nested)
+        == str(nested)
+        == (
+            "<TE ><Element >\na\n<TE >b <Element ></Element></TE>\n</Element> "
+            "c d\n<TE >e</TE></TE>"
+        )
+    )
+
+    doc = Doc(TE("foo"), Doc(StringElement("bar")), ElementSequence(), id="doc")
+    expected = (
+        '<!DOCTYPE doc>\n<Doc id="doc">\n<TE >foo</TE>\n'
+        "<!DOCTYPE doc>\n<Doc >\n<StringElement >bar</StringElement>\n</Doc>\n"
+        "\n</Doc>"
+    )
+    assert str(doc) == expected
+    assert render(doc) == expected
+    assert render(ChildrenOnlyElement(doc)) == (
+        f"<ChildrenOnlyElement>\n{expected}\n</ChildrenOnlyElement>"
+    )
+
+
+def test_render_deep_tree():
+    class TE(BaseElement):
+        __slots__ = ("child",)
+
+        def __init__(self, child):
+            super().__init__()
+            self.child = child
+
+        def get_element_children(self):
+            return (self.child,)
+
+    depth = 120_003
+    element = StringElement("leaf")
+    factories = (Element, ChildrenOnlyElement, TE, ElementSequence)
+    for i in range(depth):
+        element = factories[i % len(factories)](element)
+
+    markup = render(element)
+    assert markup == str(element)
+    assert markup.startswith("<TE >\n<ChildrenOnlyElement>\n<Element >\n<TE >\n")
+    assert markup.count("<StringElement >leaf</StringElement>") == 1
+    assert markup.endswith("</Element>\n</ChildrenOnlyElement>\n</TE>")
+
+
+def test_iter_markup():
+    element = ChildrenOnlyElement(
+        *(
+            Element(StringElement(f"<{i}>", index=i), EmptyElement(), f"row {i}")
+            for i in range(1000)
+        )
+    )
+    markup = element.markup
+
+    for chunk_size in (1, 100, 8192, 1_000_000):
+        chunks = list(iter_markup(element, chunk_size))
+        assert "".join(chunks) == markup
+        assert all(len(chunk) >= chunk_size for chunk in chunks[:-1])
+        assert all(len(chunk) < chunk_size + 100 for chunk in chunks)
+        assert chunks == list(element.iter_markup(chunk_size))
+
+    assert list(iter_markup("<&>")) == ["&lt;&amp;&gt;"]
+    assert list(iter_markup(ElementSequence())) == []
+
+    with pytest.raises(ValueError):
+        list(iter_markup(element, 0))
+
+
+def test_arender_lazy_import():
+    # asyncio is slow to import, it is only imported by arender().
+    code = "import sys, markyp.elements; assert 'asyncio' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_arender():
+    async def value(result, event=None, wait_for=None):
+        if wait_for is not None:
+            await asyncio.wait_for(wait_for.wait(), 5)
+        if event is not None:
+            event.set()
+        return result
+
+    async def items(*values):
+        for v in values:
+            await asyncio.sleep(0)
+            yield v
+
+    async def collect(element, chunk_size=8192):
+        return [chunk async for chunk in arender(element, chunk_size)]
+
+    async def run():
+        first_done, second_done = asyncio.Event(), asyncio.Event()
+        element = ChildrenOnlyElement(
+            "<header>",
+            # Waits for a later sibling, which is only possible if all awaitables
+            # are started concurrently.
+            value(Element(value("inner")), first_done, second_done),
+            value(StringElement("second"), second_done),
+            items("a", None, value(EmptyElement(x=1)), Element(items("b", "c"))),
+            value(None),
+            items(),
+            Element("footer"),
+        )
+        expected = (
+            "<ChildrenOnlyElement>\n&lt;header&gt;\n<Element >\ninner\n</Element>\n"
+            "<StringElement >second</StringElement>\n"
+            'a\n<EmptyElement x="1"></EmptyElement>\n<Element >\nb\nc\n</Element>\n'
+            "\n<Element >\nfooter\n</Element>\n</ChildrenOnlyElement>"
+        )
+
+        chunks = await collect(element)
+        assert "".join(chunks) == expected
+        assert chunks[0] == "<ChildrenOnlyElement>\n&lt;header&gt;\n"
+        assert first_done.is_set() and second_done.is_set()
+
+        assert "".join(await collect(value(Element("foo")), 1)) == str(Element("foo"))
+        assert await collect(ElementSequence(items())) == []
+
+        async def none():
+            return None
+
+        class inline(Element):
+            __slots__ = ()
+            inline_children = True
+
+        # Awaitables that resolve to None are rendered like None children.
+        for factory in (Element, inline, ElementSequence):
+            for layout in ((None, "x", None), (None, "x", None, "y"), ("x", None)):
+                element = factory(*(none() if c is None else c for c in layout))
+                assert "".join(await collect(element)) == str(factory(*layout))
+
+    async def run_failing():
+        async def fail():
+            raise KeyError("fail")
+
+        async def failing_items():
+            yield "foo"
+            raise KeyError("fail")
+
+        slow = asyncio.ensure_future(asyncio.sleep(10))
+        with pytest.raises(KeyError):
+            await collect(Element(fail(), slow))
+        await asyncio.sleep(0)
+        assert slow.cancelled()
+
+        with pytest.raises(KeyError):
+            await collect(Element(failing_items()))
+
+        with pytest.raises(ValueError):
+            await collect(Element(), 0)
+
+    asyncio.run(run())
+    asyncio.run(run_failing())
+
+
+def test_render_to():
+    class Socket:
+        def __init__(self):
+            self.data = []
+
+        def sendall(self, data):
+            self.data.append(data)
+
+    class Writer:
+        def __init__(self):
+            self.data = []
+
+        def write(self, data):
+            self.data.append(data)
+
+    element = ChildrenOnlyElement(
+        *(Element(StringElement(f"árvíztűrő <{i}>", index=i)) for i in range(2000))
+    )
+    markup = element.markup
+
+    for encoding in ("utf-8", "utf-16", "iso-8859-2"):
+        for chunk_size in (1, 1000, 65536):
+            buffer = io.BytesIO()
+            written = render_to(element, buffer, encoding, chunk_size=chunk_size)
+            assert buffer.getvalue() == markup.encode(encoding)
+            assert written == len(buffer.getvalue())
+
+    buffer = io.BytesIO()
+    written = element.render_to(buffer, compress="gzip", chunk_size=1000)
+    assert written == len(buffer.getvalue())
+    assert gzip.decompress(buffer.getvalue()) == markup.encode("utf-8")
+
+    socket = Socket()
+    written = render_to(element, socket, compress="zlib", chunk_size=1000)
+    assert all(len(data) >= 1000 for data in socket.data[:-1])
+    assert written == sum(len(data) for data in socket.data)
+    assert zlib.decompress(b"".join(socket.data)) == markup.encode("utf-8")
+
+    writer = Writer()
+    render_to(element, writer, "utf-16", chunk_size=1000)
+    assert b"".join(writer.data) == markup.encode("utf-16")
+
+    writer = Writer()
+    assert render_to(ElementSequence(), writer) == 0
+    assert writer.data == []
+
+    with pytest.raises(ValueError):
+        render_to(element, io.BytesIO(), compress="brotli")
+
+    with pytest.raises(LookupError):
+        render_to(element, io.BytesIO(), "no-such-encoding")
+
+
+def test_freeze():
+    class Nav(Element):
+        __slots__ = ()
+
+        def __str__(self):
+            return f"<!-- nav -->{super().__str__()}"
+
+    nav = Nav(Element("<home>", href="/"), class_="nav")
+    markup = nav.markup
+    frozen = freeze(nav)
+    assert isinstance(frozen, FrozenElement)
+    assert freeze(frozen) is frozen
+    assert str(frozen) == frozen.markup == markup
+    assert "".join(frozen.iter_markup(1)) == markup
+
+    nav["class"] = "changed"
+    assert frozen.markup == markup
+
+    page = Element(frozen, "content", frozen)
+    assert page.markup == f"<Element >\n{markup}\ncontent\n{markup}\n</Element>"
+    assert freeze(page).markup == page.markup
+    assert freeze("<&>").markup == "&lt;&amp;&gt;"
+
+    with pytest.raises(TypeError):
+        frozen["class"] = "value"
+
+    with pytest.raises(TypeError):
+        del frozen["class"]
+
+    with pytest.raises(AttributeError):
+        frozen.properties = {}
+
+
+def test_cached_elements():
+    renders = []
+
+    class Counted(Element):
+        __slots__ = ()
+
+        @property
+        def element_name(self):
+            renders.append(self)
+            return "Counted"
+
+    class Row(CachedMixin, ChildrenOnlyElement):
+        __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+    class Custom(CachedMixin, Element):
+        __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+        def __str__(self):
+            return f"<!-- custom -->{super().__str__()}"
+
+    class Base(CachedMixin, BaseElement):
+        __slots__ = ("_cached_markup", "_parents", "__weakref__")
+
+        def get_element_children(self):
+            return (Counted("base"),)
+
+    cell = CachedStringElement("cell", class_="cell")
+    empty = CachedEmptyElement(flag=None)
+    clean = Row(Counted("clean"))
+    # Row -> Element -> cell: the non-cached element in the middle must not break invalidation.
+    table = CachedElement(Row(Element(cell), empty), clean, Base(), id="table")
+
+    def check():
+        expected = (
+            (
+                f"<CachedElement {format_properties(table.properties)}>\n"
+                f"<Row>\n<Element >\n{render(StringElement(cell.value, **cell.properties))}"
+                f"\n</Element>\n{render(EmptyElement(**empty.properties))}\n</Row>\n"
+                "<Row>\n<Counted >\nclean\n</Counted>\n</Row>\n"
+                "<Base >\n<Counted >\nbase\n</Counted>\n</Base>\n"
+                "</CachedElement>"
+            )
+            .replace("StringElement", "CachedStringElement")
+            .replace("EmptyElement", "CachedEmptyElement")
+        )
+        assert str(table) == expected
+        assert table.markup == expected
+        assert "".join(table.iter_markup(1)) == expected
+
+    check()
+    assert len(renders) == 2
+
+    renders.clear()
+    check()
+    assert renders == []
+
+    cell["class"] = "changed"
+    check()
+    assert renders == []
+    assert clean._cached_markup is not None
+    assert table._cached_markup is not None
+
+    del cell["class"]
+    cell.value = "<value>"
+    empty["flag"] = "value"
+    check()
+    assert renders == []
+
+    clean.children = (Counted("clean"),)
+    assert table._cached_markup is None
+    check()
+    assert len(renders) == 1
+
+    renders.clear()
+    table.invalidate_markup()
+    check()
+    assert renders == []  # Only the table itself is re-rendered.
+
+    custom = Custom(cell, class_="custom")
+    wrapper = CachedElement(custom)
+    assert custom.markup == f'<!-- custom --><Custom class="custom">\n{cell}\n</Custom>'
+    assert wrapper.markup == f"<CachedElement >\n{custom}\n</CachedElement>"
+    cell.value = "new-value"
+    assert custom._cached_markup is None
+    assert wrapper._cached_markup is None
+    assert "new-value" in wrapper.markup
+
+    class Wrap(IElement):
+        __slots__ = ("child",)
+
+        def __init__(self, child):
+            self.child = child
+
+        def __str__(self):
+            return f"[{self.child}]"
+
+    # Cached elements rendered by a custom __str__() are linked to the closest cached ancestor.
+    leaf = CachedStringElement("a")
+    outer = CachedElement(Wrap(leaf))
+    assert str(outer) == (
+        "<CachedElement >\n[<CachedStringElement >a</CachedStringElement>]\n</CachedElement>"
+    )
+    leaf["k"] = 1
+    assert outer._cached_markup is None
+    assert str(outer) == (
+        '<CachedElement >\n[<CachedStringElement k="1">a</CachedStringElement>]\n</CachedElement>'
+    )
+    leaf.value = "b"
+    assert "".join(outer.iter_markup(1)).count(">b<") == 1
+
+
+def test_cached_elements_pickle():
+    cell = CachedStringElement("cell", class_="cell")
+    table = CachedElement(CachedElement(cell, CachedEmptyElement()), id="table")
+    markup = str(table)
+    assert cell._parents
+
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        restored = pickle.loads(pickle.dumps(table, protocol))
+        assert restored._cached_markup is None
+        assert restored.properties == table.properties
+        assert str(restored) == markup
+
+        restored_cell = restored.children[0].children[0]
+        assert restored_cell._cached_markup is not None
+        restored_cell.value = "changed"
+        assert restored._cached_markup is None
+        assert "changed" in str(restored)
+        assert str(table) == markup
+
+
+def test_cached_elements_deep():
+    leaf = CachedStringElement("leaf")
+    elements = [leaf]
+    for _ in range(3000):
+        elements.append(CachedElement(elements[-1]))
+    root = elements[-1]
+
+    markup = str(root)
+    assert markup == (
+        "<CachedElement >\n" * 3000
+        + "<CachedStringElement >leaf</CachedStringElement>"
+        + "\n</CachedElement>" * 3000
+    )
+    # Long descendant markup is not kept, the chain doesn't store quadratic markup.
+    assert root._cached_markup == markup
+    assert sum(len(e._cached_markup or "") for e in elements) < 2 * len(markup)
+
+    leaf.value = "changed"
+    assert root._cached_markup is None
+    assert str(root) == markup.replace(">leaf<", ">changed<")
+    assert "".join(root.iter_markup(10)) == str(root)
@@ -1,8 +1,15 @@
-from markyp.elements import Element
-from markyp.formatters import format_property,\
+import io
+
+from markyp.elements import Element, StringElement, render
+from markyp.formatters import create_xml_escaper,\
+                              fast_xml_escape,\
+                              format_property,\
                               format_properties,\
+                              xml_escape,\
                               xml_format_element,\
-                              format_element_sequence
+                              format_element_sequence,\
+                              set_xml_escaper
+from markyp.writer import MarkupWriter
 
 class TE(Element):
     __slots__ = ()
@@ -65,3 +72,49 @@ def test_format_element_sequence():
 
     assert format_element_sequence(["<markup></markup>"], element_formatter=str) == "\n<markup></markup>\n"
     assert format_element_sequence(["<markup></markup>"], inline=True) == "&lt;markup&gt;&lt;/markup&gt;"
+
+def test_fast_xml_escape():
+    values = (
+        "", "foo", "\"'¢£¥€©®", "&", "<", ">", "<&>", "&amp;", "a < b > c & d",
+        "<tag attr=\"value\">&nbsp;</tag>" * 10, "árvíztűrő & tükörfúrógép " * 20,
+    )
+    escapers = (
+        fast_xml_escape,
+        create_xml_escaper(),
+        create_xml_escaper(cache_size=0),
+        create_xml_escaper(cache_size=2, max_cached_length=8),
+    )
+    for escape in escapers:
+        for _ in range(3):
+            for value in values:
+                assert escape(value) == xml_escape(value)
+
+        value = "".join(("no", "-", "escaping"))
+        assert escape(value) is value
+
+def test_set_xml_escaper():
+    escaper = create_xml_escaper()
+    escaped = []
+
+    def escape(data):
+        escaped.append(data)
+        return escaper(data)
+
+    previous = set_xml_escaper(escape)
+    try:
+        assert previous is fast_xml_escape
+        assert xml_format_element("a<b") == "a&lt;b"
+        element = TE("c&d", StringElement("e>f"), TE("<g>", inline_children=True))
+        assert render(element) == str(element)
+        assert "".join(element.iter_markup(1)) == str(element)
+
+        stream = io.StringIO()
+        MarkupWriter(stream).text("h&i")
+        assert stream.getvalue() == "h&amp;i"
+        assert sorted(escaped) == sorted(["a<b", *["c&d", "e>f", "<g>"] * 4, "h&i"])
+    finally:
+        assert set_xml_escaper(None) is escape
+
+    escaped.clear()
+    assert xml_format_element("a<b") == "a&lt;b"
+    assert escaped == []
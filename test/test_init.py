@@ -9,6 +9,9 @@ def test_IElement():
     with pytest.raises(NotImplementedError):
         IElement().markup
 
+    with pytest.raises(NotImplementedError):
+        list(IElement().iter_markup())
+
 def test_is_element():
     assert is_element(IElement())
     assert is_element("string element")
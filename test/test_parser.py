@@ -1,3 +1,11 @@
+import asyncio
+import io
+import os
+import pickle
+import sys
+import time
+import xml.etree.ElementTree as ET
+
 import pytest
 
 from markyp import ElementType, PropertyDict
@@ -5,10 +13,20 @@ from markyp.elements import (
     ChildrenOnlyElement,
     Element,
     EmptyElement,
+    FrozenElement,
     SelfClosedElement,
     StringElement,
 )
-from markyp.parser import AnyElement, IgnoreElement, Converter, Parser, ParserRule
+from markyp.parser import (
+    AnyElement,
+    IgnoreElement,
+    Converter,
+    ConverterRule,
+    ParseCache,
+    Parser,
+    ParserRule,
+    PushParser,
+)
 
 
 def test_converter():
@@ -17,12 +35,377 @@ def test_converter():
     converted_element = get_converted_elements()
     converted_markup = converted_element.markup
 
-    for i, parser in enumerate(get_parsers(converter)):
+    for i, parser in enumerate(
+        get_parsers(converter) + get_parsers(converter, direct=True)
+    ):
         parsed = parser.fromstring(markup)
         assert_elements_equal(parsed, converted_element)
         assert parsed.markup == converted_markup
 
 
+def test_direct_parser():
+    markup = (
+        '<root xmlns:ns="urn:ns">'
+        "<Element>  <!-- comment -->\n  <Element attr='&quot;quoted&quot; &amp; more'/>"
+        "tail<ns:Any>Text <Element>skipped<Element/></Element> tail</ns:Any>"
+        "<IgnoreElement>Ignored<Element/></IgnoreElement>"
+        "<Element><![CDATA[ <data> ]]><Element/></Element>"
+        "</Element>"
+        "<?instruction?></root>"
+    )
+    parser = Parser(Element, IgnoreElement)
+    direct_parser = Parser(Element, IgnoreElement, direct=True)
+
+    expected = parser.fromstring(markup)
+    parsed = direct_parser.fromstring(markup)
+    assert_elements_equal(parsed, expected)
+    assert parsed.markup == expected.markup
+
+    assert direct_parser.fromstring("<IgnoreElement><Element/></IgnoreElement>") is None
+
+
+def test_deduplicating_parser(tmp_path):
+    markup = (
+        "<table><tr><td class='x'><b>1</b></td><td class='x'><b>1</b></td></tr>"
+        "<tr><td class='x'><b>1</b></td><td>2</td></tr></table>"
+    )
+    source = tmp_path / "document.xml"
+    source.write_text(markup, encoding="utf-8")
+
+    for kwargs in ({}, {"direct": True}):
+        parser = Parser(Element, deduplicate=True, **kwargs)
+        expected = Parser(Element).fromstring(markup).markup
+        for parsed in (parser.fromstring(markup), parser.parse(str(source))):
+            assert parsed.markup == expected
+            first, second = parsed.children
+            assert first.children[0] is first.children[1] is second.children[0]
+            assert second.children[1] is not first.children[0]
+            # Shared subtrees are frozen, changing one occurrence can not change the others.
+            assert isinstance(first.children[0], FrozenElement)
+            with pytest.raises(TypeError):
+                first.children[0]["id"] = "first"
+            second.children[1]["id"] = "second"
+            assert parsed.markup == expected.replace("<td >\n2", '<td id="second">\n2')
+
+    rows = "<table><tr><td>1</td></tr><tr><td>1</td></tr><tr><td>2</td></tr></table>"
+    table = Parser(deduplicate=True).fromstring(rows)
+    assert table.children[0] is table.children[1]
+    with pytest.raises(TypeError):
+        table.children[0]["id"] = "first"
+
+    copy = pickle.loads(pickle.dumps(Parser(deduplicate=True)))
+    tree = copy.fromstring(markup)
+    assert tree.children[0].children[0] is tree.children[1].children[0]
+
+
+def test_backends(monkeypatch):
+    assert Parser().backend == "etree"
+    with pytest.raises(ValueError):
+        Parser(backend="unknown")
+
+    monkeypatch.setitem(sys.modules, "lxml", None)
+    assert Parser(backend="lxml").backend == "etree"
+    assert Parser(Element, backend="lxml").fromstring("<Element/>").markup == (
+        "<Element ></Element>"
+    )
+
+
+def test_lxml_backend(tmp_path):
+    pytest.importorskip("lxml")
+
+    element = get_elements()
+    markup = element.markup
+    converted_markup = get_converted_elements().markup
+    for direct in (False, True):
+        for parser in get_parsers(backend="lxml", direct=direct):
+            assert parser.backend == "lxml"
+            assert parser.fromstring(markup).markup == markup
+            assert parser.parse("data/test/test_parser_data.xml").markup == markup
+        for parser in get_parsers(converter, backend="lxml", direct=direct):
+            assert parser.fromstring(markup).markup == converted_markup
+
+    markup = (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<!DOCTYPE root [<!ENTITY entity "Entity &amp; more">]>'
+        '<root xmlns:ns="urn:ns" ns:attr="&quot;value&quot;">'
+        "<Element>  <!-- comment -->\n  <Element attr='&entity;'/>"
+        "tail<ns:Any>Text <?pi?> &entity; <Element>skipped</Element> tail</ns:Any>"
+        "<IgnoreElement>Ignored<Element/></IgnoreElement>"
+        "<Element><![CDATA[ <data> ]]>é<Element/></Element>"
+        "</Element>"
+        "<?instruction?></root>"
+    )
+    path = tmp_path / "document.xml"
+    path.write_text(markup, encoding="utf-8")
+    expected = Parser(Element, IgnoreElement).fromstring(markup).markup
+    for direct in (False, True):
+        parser = Parser(Element, IgnoreElement, direct=direct, backend="lxml")
+        assert parser.fromstring(markup).markup == expected
+        assert parser.parse(str(path)).markup == expected
+
+        etree_records = Parser(Element).iterparse(str(path), "Element")
+        records = Parser(Element, backend="lxml").iterparse(str(path), "Element")
+        assert [r.markup for r in records] == [r.markup for r in etree_records]
+
+    for backend in ("etree", "lxml"):
+        push_parser = PushParser(Parser(Element, backend=backend), depth=2)
+        records = push_parser.feed(markup.encode("utf-8")) + push_parser.close()
+        assert [r.markup for r in records] == [
+            '<Element attr="Entity & more"></Element>',
+            "<{urn:ns}Any >\nText  Entity &amp; more\n</{urn:ns}Any>",
+            "<IgnoreElement >\nIgnored\n</IgnoreElement>",
+            "<Element >\n&lt;data&gt; é\n</Element>",
+        ]
+
+    depth = 2000  # libxml2 does not accept deeper documents.
+    markup = "<Element>" * depth + "Leaf" + "</Element>" * depth
+    expected = "<Element >\n" * depth + "Leaf" + "\n</Element>" * depth
+    for direct in (False, True):
+        parser = Parser(Element, direct=direct, backend="lxml")
+        assert str(parser.fromstring(markup)) == expected
+
+
+def test_parse_many(tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"{i}.xml"
+        path.write_text(
+            f"<root id='{i}'><Element>Item {i}</Element><Any>{i}</Any></root>",
+            encoding="utf-8",
+        )
+        paths.append(str(path))
+
+    for kwargs in ({}, {"direct": True}):
+        parser = Parser(Element, ("Any", AnyElement, converter), **kwargs)
+        expected = {path: parser.parse(path).markup for path in paths}
+
+        results = list(parser.parse_many(paths, workers=2))
+        assert [path for path, _ in results] == paths
+        assert all(element.markup == expected[path] for path, element in results)
+
+        results = list(parser.parse_many(paths, workers=2, chunksize=4))
+        assert [path for path, _ in results] == paths
+        assert all(element.markup == expected[path] for path, element in results)
+
+        results = list(
+            parser.parse_many(paths, workers=2, ordered=False, transform=str)
+        )
+        assert sorted(results) == sorted(expected.items())
+
+        for ordered in (True, False):
+            iterator = parser.parse_many(paths, workers=1, ordered=ordered)
+            assert next(iterator)[0] in paths
+            iterator.close()
+
+    with pytest.raises(ValueError):
+        next(Parser().parse_many(paths, chunksize=0))
+
+
+def test_parse_cache(tmp_path):
+    calls = counting_converter_calls
+
+    def parse(parser, path):
+        calls.clear()
+        markup = parser.parse(str(path)).markup
+        return markup, len(calls) > 0
+
+    source = tmp_path / "document.xml"
+    source.write_text("<root><Element>Text</Element></root>", encoding="utf-8")
+    cache = ParseCache(str(tmp_path / "cache"))
+    parser = Parser(Element, cache=cache)
+    parser.converter(counting_converter)
+    expected = "<root >\n<Element >\nText\n</Element>\n</root>"
+
+    assert parse(parser, source) == (expected, True)
+    assert parse(parser, source) == (expected, False)
+
+    # Changing the rules of the parser invalidates the cache.
+    parser.add_rules([("root", AnyElement)])
+    assert parse(parser, source) == (expected, True)
+    assert parse(parser, source) == (expected, False)
+
+    # Changing the file invalidates the cache.
+    source.write_text("<root><Element>New text</Element></root>", encoding="utf-8")
+    assert parse(parser, source) == (expected.replace("Text", "New text"), True)
+    assert parse(parser, source) == (expected.replace("Text", "New text"), False)
+
+    # Invalid entries are ignored.
+    for entry in (tmp_path / "cache").iterdir():
+        entry.write_bytes(b"invalid")
+    assert parse(parser, source) == (expected.replace("Text", "New text"), True)
+
+    cache.clear()
+    assert list((tmp_path / "cache").iterdir()) == []
+    assert parse(parser, source) == (expected.replace("Text", "New text"), True)
+
+
+def test_parse_cache_local_callables(tmp_path):
+    source = tmp_path / "document.xml"
+    source.write_text("<root><Element>Text</Element></root>", encoding="utf-8")
+    cache = ParseCache(str(tmp_path / "cache"))
+
+    def create_parser(value):
+        parser = Parser(Element, cache=cache)
+        parser.converter(lambda f, c, p: (f, c, {**p, "v": value}))
+        return parser
+
+    # Closures are not identified by their name, so they must not share cache entries.
+    assert 'v="one"' in create_parser("one").parse(str(source)).markup
+    assert 'v="two"' in create_parser("two").parse(str(source)).markup
+    assert list((tmp_path / "cache").iterdir()) == []
+
+    class LocalElement(Element):
+        __slots__ = ()
+
+    Parser(("Element", LocalElement), cache=cache).parse(str(source))
+    assert list((tmp_path / "cache").iterdir()) == []
+
+    # Bound methods depend on the state of their object, which is not part of their name.
+    for value in ("one", "two"):
+        parser = Parser(Element, cache=cache)
+        parser.converter(PropertyConverter(value).convert)
+        assert f'v="{value}"' in parser.parse(str(source)).markup
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_parse_cache_content_hash(tmp_path):
+    source = tmp_path / "document.xml"
+    source.write_text("<root>Text</root>", encoding="utf-8")
+    stat = source.stat()
+
+    for content_hash in (False, True):
+        parser = Parser(
+            cache=ParseCache(
+                str(tmp_path / str(content_hash)), content_hash=content_hash
+            )
+        )
+        source.write_text("<root>Text</root>", encoding="utf-8")
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert parser.parse(str(source)).children == ("Text",)
+
+        # Same size and modification time, different content.
+        source.write_text("<root>Diff</root>", encoding="utf-8")
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        expected = "Diff" if content_hash else "Text"
+        assert parser.parse(str(source)).children == (expected,)
+
+        # Different modification time, same content.
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert parser.parse(str(source)).children == ("Diff",)
+
+
+def test_parse_cache_eviction(tmp_path):
+    with pytest.raises(ValueError):
+        ParseCache(str(tmp_path), max_entries=0)
+    with pytest.raises(ValueError):
+        ParseCache(str(tmp_path), max_bytes=0)
+
+    directory = tmp_path / "cache"
+    parser = Parser(cache=ParseCache(str(directory), max_entries=2))
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.xml"
+        path.write_text(f"<root>{i}</root>", encoding="utf-8")
+        paths.append(str(path))
+
+    parser.parse(paths[0])
+    entries = set(directory.iterdir())
+    parser.parse(paths[1])
+    time.sleep(0.01)
+    parser.parse(paths[0])  # Hit, paths[1] becomes the least recently used entry.
+    parser.parse(paths[2])
+    assert len(list(directory.iterdir())) == 2
+    assert entries < set(directory.iterdir())
+
+    entry_size = max(path.stat().st_size for path in directory.iterdir())
+    parser = Parser(cache=ParseCache(str(directory), max_bytes=entry_size))
+    parser.parse(paths[1])
+    assert len(list(directory.iterdir())) == 1
+
+
+def test_pickle_parser():
+    for kwargs in ({}, {"direct": True}, {"backend": "lxml"}):
+        parser = Parser(Element, ("Any", AnyElement, converter), **kwargs)
+        parser.converter(converter)
+        markup = "<root><Element>Text</Element><Any/><Other/></root>"
+        expected = parser.fromstring(markup).markup
+
+        copy = pickle.loads(pickle.dumps(parser))
+        assert copy.backend == parser.backend
+        assert copy.fromstring(markup).markup == expected
+
+
+def test_rule_converter():
+    def rule_converter(factory, children, properties):
+        properties["rule"] = "applied"
+        return factory, children, properties
+
+    markup = "<root><Element a='1'>Text</Element><Any a='2'/></root>"
+    for direct in (False, True):
+        parser = Parser(
+            ("Element", Element, rule_converter),
+            ConverterRule("Any", AnyElement, rule_converter),
+            direct=direct,
+        )
+        assert parser.fromstring(markup).markup == (
+            "<root >\n"
+            '<Element a="1" rule="applied">\nText\n</Element>\n'
+            '<Any a="2" rule="applied"></Any>\n'
+            "</root>"
+        )
+
+        # Rules with a converter do not use the converter of the parser.
+        parser.converter(converter)
+        assert parser.fromstring(markup).markup == (
+            '<root converter="applied">\n'
+            '<Element a="1" rule="applied">\nText\n</Element>\n'
+            '<Any a="2" rule="applied"></Any>\n'
+            "</root>"
+        )
+
+        # A rule with a None converter opts out of the converter of the parser.
+        parser.add_rules([ConverterRule("Element", Element, None)])
+        assert parser.fromstring(markup).markup == (
+            '<root converter="applied">\n'
+            '<Element a="1">\nText\n</Element>\n'
+            '<Any a="2" rule="applied"></Any>\n'
+            "</root>"
+        )
+
+        # A ParserRule uses the converter of the parser.
+        parser.add_rules([ParserRule("Element", Element)])
+        assert parser.fromstring(markup).markup == (
+            '<root converter="applied">\n'
+            '<Element a="1" converter="applied">\nText\n</Element>\n'
+            '<Any a="2" rule="applied"></Any>\n'
+            "</root>"
+        )
+
+        # Changing the rules and the converter of the parser takes effect immediately.
+        parser.add_rules([("Element", Element)])
+        parser.converter(None)
+        assert parser.fromstring(markup).markup == (
+            "<root >\n"
+            '<Element a="1">\nText\n</Element>\n'
+            '<Any a="2" rule="applied"></Any>\n'
+            "</root>"
+        )
+
+
+def test_parser_rule():
+    # Parser rules are tag - factory pairs, converters need a ConverterRule.
+    tag, factory = ParserRule("tag", Element)
+    assert (tag, factory) == ("tag", Element)
+    with pytest.raises(TypeError):
+        ParserRule("tag", Element, converter)
+
+    parser = Parser(("tag", Element), ("other", Element, converter))
+    assert parser._rules == {
+        "tag": ParserRule("tag", Element),
+        "other": ConverterRule("other", Element, converter),
+    }
+
+
 def test_factory_error():
     class Foo:
         pass
@@ -36,27 +419,186 @@ def test_factory_error():
     with pytest.raises(ValueError):
         Parser(("tag", Element, "extra-item"))
 
+    with pytest.raises(ValueError):
+        Parser(("tag", Element, converter, "extra-item"))
+
 
 def test_parse_from_file():
     element = get_elements()
     markup = element.markup
 
-    for i, parser in enumerate(get_parsers()):
+    for i, parser in enumerate(get_parsers() + get_parsers(direct=True)):
         parsed = parser.parse("data/test/test_parser_data.xml")
         assert_elements_equal(parsed, element)
         assert parsed.markup == markup
 
+        # Binary and text file objects are accepted as well.
+        for mode in ("rb", "r"):
+            with open("data/test/test_parser_data.xml", mode) as f:
+                assert parser.parse(f).markup == markup
+                assert not f.closed
+
+
+def test_parse_file_objects(tmp_path):
+    data = (
+        "<root><Element id='1'>First</Element><Element id='2'>Second</Element></root>"
+    )
+    parser = Parser(Element, cache=ParseCache(str(tmp_path / "cache")))
+
+    assert parser.parse(io.BytesIO(data.encode("utf-8"))).markup == (
+        parser.fromstring(data).markup
+    )
+    assert list((tmp_path / "cache").iterdir()) == []
+
+    assert str(parser.parse_arena(io.StringIO(data))) == str(Parser().fromstring(data))
+
+    records = list(parser.iterparse(io.BytesIO(data.encode("utf-8")), "Element"))
+    assert [r.children for r in records] == [("First",), ("Second",)]
+
 
 def test_parser():
     element = get_elements()
     markup = element.markup
 
-    for i, parser in enumerate(get_parsers()):
+    for i, parser in enumerate(get_parsers() + get_parsers(direct=True)):
         parsed = parser.fromstring(markup)
         assert_elements_equal(parsed, element)
         assert parsed.markup == markup
 
 
+def test_parse_deep_document():
+    depth = 20_000
+    markup = "<Element>" * depth + "Leaf" + "</Element>" * depth
+    expected = "<Element >\n" * depth + "Leaf" + "\n</Element>" * depth
+
+    for parser in (Parser(Element), Parser(Element, direct=True)):
+        assert str(parser.fromstring(markup)) == expected
+
+
+def test_iterparse(tmp_path):
+    path = tmp_path / "records.xml"
+    path.write_text(
+        '<root xmlns:ns="urn:ns"><header>Header</header>'
+        "<items>"
+        "<Element id='1'>First</Element>"
+        "<other><Element id='2'><child/><Element id='3'/></Element></other>"
+        "<Element id='4'><IgnoreElement/>Ignored text</Element>"
+        "</items>"
+        "<ns:record>Namespaced</ns:record>"
+        "</root>",
+        encoding="utf-8",
+    )
+    parser = Parser(Element, IgnoreElement)
+
+    records = list(parser.iterparse(str(path), "Element"))
+    assert [r.properties["id"] for r in records] == ["1", "2", "4"]
+    assert (
+        records[0].markup == parser.fromstring("<Element id='1'>First</Element>").markup
+    )
+    assert (
+        records[1].markup
+        == parser.fromstring(
+            "<Element id='2'><child/><Element id='3'/></Element>"
+        ).markup
+    )
+    assert records[2].markup == '<Element id="4"></Element>'
+
+    records = list(parser.iterparse(str(path), "{urn:ns}record"))
+    assert len(records) == 1
+    assert records[0].element_name == "{urn:ns}record"
+    assert records[0].children == ("Namespaced",)
+
+    assert list(parser.iterparse(str(path), "IgnoreElement")) == []
+    assert list(parser.iterparse(str(path), "missing")) == []
+
+    path.write_text(
+        "<root><tr><td>1</td><td>1</td></tr><tr><td>2</td></tr></root>",
+        encoding="utf-8",
+    )
+    first, second = Parser(deduplicate=True).iterparse(str(path), "tr")
+    assert first.children[0] is first.children[1]
+    assert isinstance(first.children[0], FrozenElement)
+    assert second.markup == Parser().fromstring("<tr><td>2</td></tr>").markup
+
+
+def test_push_parser():
+    data = (
+        "<root><Element id='1'>First <b>skipped</b></Element>"
+        "<list><Element id='2'/><item>Item</item></list>"
+        "<IgnoreElement>Ignored</IgnoreElement>"
+        "<Element id='3'>Last &amp; final</Element></root>"
+    ).encode("utf-8")
+    parser = Parser(Element, IgnoreElement)
+    expected = parser.fromstring(data.decode("utf-8"))
+
+    push_parser = PushParser(parser)
+    records = []
+    for i in range(len(data)):
+        completed = push_parser.feed(data[i : i + 1])
+        assert len(completed) <= 1
+        records.extend(completed)
+    records.extend(push_parser.close())
+    assert [r.markup for r in records] == [c.markup for c in expected.children]
+
+    push_parser = PushParser(parser, depth=0)
+    assert push_parser.feed(data[:-1]) == []
+    (root,) = push_parser.feed(data[-1:]) + push_parser.close()
+    assert root.markup == expected.markup
+
+    push_parser = PushParser(parser, depth=2)
+    records = push_parser.feed(data) + push_parser.close()
+    assert [r.markup for r in records] == [
+        "<b >\nskipped\n</b>",
+        '<Element id="2"></Element>',
+        "<item >\nItem\n</item>",
+    ]
+
+    push_parser = PushParser(parser, depth=1, tag="Element")
+    records = push_parser.feed(data) + push_parser.close()
+    assert [r.properties["id"] for r in records] == ["1", "3"]
+
+    push_parser = PushParser(parser)
+    push_parser.feed(data[:20])
+    with pytest.raises(ET.ParseError):
+        push_parser.close()
+
+    with pytest.raises(ValueError):
+        PushParser(parser, depth=-1)
+
+    push_parser = PushParser(Parser(deduplicate=True), depth=0)
+    (table,) = (
+        push_parser.feed(b"<table><tr><td>1</td></tr><tr><td>1</td></tr></table>")
+        + push_parser.close()
+    )
+    assert table.children[0] is table.children[1]
+    assert isinstance(table.children[0], FrozenElement)
+
+
+def test_aiterparse():
+    parser = Parser(Element)
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"<root><Element id='1'>Text</Element><Ele")
+        records = []
+
+        async def consume():
+            async for record in parser.aiterparse(reader, chunk_size=4):
+                records.append(record)
+
+        task = asyncio.ensure_future(consume())
+        for _ in range(100):
+            await asyncio.sleep(0)
+        assert [r.markup for r in records] == ['<Element id="1">\nText\n</Element>']
+
+        reader.feed_data(b"ment id='2'/></root>")
+        reader.feed_eof()
+        await asyncio.wait_for(task, 5)
+        assert [r.properties["id"] for r in records] == ["1", "2"]
+
+    asyncio.run(run())
+
+
 def get_elements():
     return ChildrenOnlyElement(
         Element("Children", attr1="1"),
@@ -100,7 +642,7 @@ def assert_elements_equal(foo: ElementType, bar: ElementType):
             assert_elements_equal(foo.children[i], bar.children[i])  # type: ignore
 
 
-def get_parsers(converter=None):
+def get_parsers(converter=None, **kwargs):
     parser_1 = Parser(
         ChildrenOnlyElement,
         Element,
@@ -108,8 +650,9 @@ def get_parsers(converter=None):
         SelfClosedElement,
         StringElement,
         IgnoreElement,
+        **kwargs,
     )
-    parser_2 = Parser()
+    parser_2 = Parser(**kwargs)
     parser_2.add_rules(
         [
             ChildrenOnlyElement,
@@ -120,7 +663,9 @@ def get_parsers(converter=None):
             IgnoreElement,
         ]
     )
-    parser_3 = Parser(("Element", ErrorElement), ("EmptyElement", ErrorElement))
+    parser_3 = Parser(
+        ("Element", ErrorElement), ("EmptyElement", ErrorElement), **kwargs
+    )
     parser_3.set_rules(
         [
             ChildrenOnlyElement,
@@ -138,6 +683,7 @@ def get_parsers(converter=None):
         ("SelfClosedElement", SelfClosedElement),
         ("StringElement", StringElement),
         ("IgnoreElement", IgnoreElement),
+        **kwargs,
     )
     parser_5 = Parser(
         ParserRule("ChildrenOnlyElement", ChildrenOnlyElement),
@@ -146,6 +692,7 @@ def get_parsers(converter=None):
         ParserRule("SelfClosedElement", SelfClosedElement),
         ParserRule("StringElement", StringElement),
         ParserRule("IgnoreElement", IgnoreElement),
+        **kwargs,
     )
 
     parsers = (parser_1, parser_2, parser_3, parser_4, parser_5)
@@ -159,6 +706,22 @@ class ErrorElement(Element):
     __slots__ = ()
 
 
+counting_converter_calls = []
+
+
+def counting_converter(factory, children, properties):
+    counting_converter_calls.append(factory)
+    return factory, children, properties
+
+
+class PropertyConverter:
+    def __init__(self, value):
+        self.value = value
+
+    def convert(self, factory, children, properties):
+        return factory, children, {**properties, "v": self.value}
+
+
 def converter(factory, children, properties):
     if factory == ChildrenOnlyElement:
         return factory, children, properties
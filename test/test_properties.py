@@ -0,0 +1,84 @@
+import copy
+import pickle
+
+import pytest
+
+from markyp.elements import Element
+from markyp.formatters import format_properties
+from markyp.properties import PropertyPool, SharedProperties, get_items_key
+
+
+def test_shared_properties():
+    properties = SharedProperties({"class": "cell", "hidden": None, "flag": True})
+    assert properties == {"class": "cell", "hidden": None, "flag": True}
+    assert properties.markup == format_properties(properties)
+    assert properties.markup is properties.markup
+
+    for mutate in (
+        lambda: properties.__setitem__("id", "x"),
+        lambda: properties.__delitem__("class"),
+        lambda: properties.update(id="x"),
+        lambda: properties.setdefault("id", "x"),
+        lambda: properties.pop("class"),
+        lambda: properties.popitem(),
+        lambda: properties.clear(),
+    ):
+        with pytest.raises(TypeError):
+            mutate()
+
+    assert properties == {"class": "cell", "hidden": None, "flag": True}
+
+    for restored in (pickle.loads(pickle.dumps(properties)), copy.copy(properties)):
+        assert type(restored) is SharedProperties
+        assert restored == properties
+
+
+def test_property_pool():
+    pool = PropertyPool()
+    shared = pool.intern({"class": "cell", "style": "color: red"})
+    assert type(shared) is SharedProperties
+    assert pool.intern({"class": "cell", "style": "color: red"}) is shared
+    assert pool.intern(shared) is shared
+    assert pool.intern({}) is pool.intern({})
+    assert len(pool) == 2
+
+    # Order and value types affect the markup.
+    assert pool.intern({"style": "color: red", "class": "cell"}) is not shared
+    assert pool.intern({"a": 1}).markup == 'a="1"'
+    assert pool.intern({"a": True}).markup == 'a="true"'
+    assert pool.intern({"a": 1.0}).markup == 'a="1.0"'
+    assert pool.intern({"a": -0.0}).markup == 'a="-0.0"'
+    assert pool.intern({"a": 0.0}).markup == 'a="0.0"'
+
+    with pytest.raises(TypeError):
+        pool.intern({"a": []})  # type: ignore[dict-item]
+
+
+def test_copy_on_write():
+    pool = PropertyPool()
+    first, second = Element(class_="cell"), Element(class_="cell")
+    first.properties = second.properties = pool.intern(first.properties)
+
+    first["id"] = "first"
+    assert type(first.properties) is dict
+    assert first.properties == {"class": "cell", "id": "first"}
+    assert second.properties == {"class": "cell"}
+    assert str(second) == '<Element class="cell"></Element>'
+
+    del second["class"]
+    assert second.properties == {}
+    assert pool.intern({"class": "cell"}) == {"class": "cell"}
+
+
+def test_get_items_key():
+    key = get_items_key({"class": "cell", "span": 1}.items())
+    assert key == get_items_key([("class", "cell"), ("span", 1)])
+    assert hash(key) == hash(get_items_key([("class", "cell"), ("span", 1)]))
+
+    # Order and value types (including the sign of zero) affect the markup.
+    assert key != get_items_key([("span", 1), ("class", "cell")])
+    assert key != get_items_key([("class", "cell"), ("span", True)])
+    assert get_items_key([("x", 0.0)]) != get_items_key([("x", -0.0)])
+
+    with pytest.raises(TypeError):
+        hash(get_items_key([("x", [])]))
@@ -0,0 +1,203 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from markyp.elements import (
+    CachedElement,
+    ChildrenOnlyElement,
+    Element,
+    ElementSequence,
+    EmptyElement,
+    SelfClosedElement,
+    StandaloneElement,
+    StringElement,
+    freeze,
+)
+from markyp.parser import AnyElement
+from markyp.serialization import dump, dumps, load, loads
+
+
+class div(Element):
+    __slots__ = ()
+
+
+class cached_div(CachedElement):
+    __slots__ = ()
+
+
+class tagged_div(Element):
+    __slots__ = ("tag",)
+
+
+def get_tree():
+    shared = div("Shared", class_="shared")
+    return ElementSequence(
+        div(
+            "Text & <markup>",
+            None,
+            shared,
+            EmptyElement(class_="empty", number=1, flag=True, off=False, none=None),
+            SelfClosedElement(ratio=0.25, big=2**70, negative=-(2**40)),
+            StandaloneElement(),
+            StringElement("String", class_="string"),
+            StringElement(None),
+            AnyElement(
+                "Any", AnyElement(element_tag="inner"), element_tag="any", a="1"
+            ),
+            freeze(div("Frozen")),
+            cached_div("Cached", id="cached"),
+            ChildrenOnlyElement(),
+            shared,
+            class_="root",
+        ),
+        "Tail",
+    )
+
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_dumps_loads(lazy):
+    tree = get_tree()
+    loaded = loads(dumps(tree), lazy=lazy)
+
+    assert type(loaded) is ElementSequence
+    assert str(loaded) == str(tree)
+
+    root = loaded.children[0]
+    assert len(root.children) == 13
+    assert root.properties == {"class": "root"}
+    # Shared elements are loaded only once.
+    assert root.children[2] is root.children[12]
+    assert root.children[3].properties == {
+        "class": "empty",
+        "number": 1,
+        "flag": True,
+        "off": False,
+        "none": None,
+    }
+    assert root.children[4].properties["big"] == 2**70
+    assert root.children[4].properties["ratio"] == 0.25
+    assert root.children[7].value is None
+    assert root.children[8].element_name == "any"
+
+    cached = root.children[10]
+    assert str(cached) == '<cached_div id="cached">\nCached\n</cached_div>'
+    cached["id"] = "changed"
+    assert str(cached) == '<cached_div id="changed">\nCached\n</cached_div>'
+
+    shared = div("Shared")
+    loaded = loads(dumps(ElementSequence(div(shared), div(div(shared)))), lazy=lazy)
+    assert loaded.children[0].children[0] is loaded.children[1].children[0].children[0]
+
+    # Equal but different property values are not merged into one property set.
+    values = (0.0, -0.0, 0, False)
+    loaded = loads(dumps(ElementSequence(*(div(a=v) for v in values))), lazy=lazy)
+    assert [repr(c.properties["a"]) for c in loaded.children] == list(map(repr, values))
+
+    assert loads(dumps("Text")) == "Text"
+    assert loads(dumps(None)) is None
+
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_large_tree(lazy):
+    # More strings, property sets, nodes, and children than a lazy loading batch.
+    shared = div("Shared \u2713", class_="shared")
+    tree = div(
+        *(
+            div(
+                f"Row {i} \u2013 \u2713",
+                shared if i % 700 == 0 else None,
+                EmptyElement(index=i, flag=i % 2 == 0),
+                class_=f"row-{i}",
+            )
+            for i in range(3000)
+        )
+    )
+    data = dumps(tree)
+    assert len(data) < len(pickle.dumps(tree, pickle.HIGHEST_PROTOCOL))
+
+    loaded = loads(data, lazy=lazy)
+    assert str(loaded) == str(tree)
+    rows = loaded.children
+    assert rows[0].children[1] is rows[2100].children[1]
+    assert rows[2999].children[2].properties == {"index": 2999, "flag": False}
+
+
+def test_load(tmp_path):
+    tree = get_tree()
+    path = os.path.join(tmp_path, "tree.markyp")
+    dump(tree, path)
+
+    loaded = load(path)
+    root = loaded.children[0]
+    # Children are loaded lazily, but their length is known.
+    assert type(root.children).__name__ == "_LazyChildren"
+    assert len(root.children) == 13
+    assert str(loaded) == str(tree)
+    # Pickled lazy children don't reference the memory-mapped file.
+    assert str(pickle.loads(pickle.dumps(loaded))) == str(tree)
+
+    eager = load(path, lazy=False)
+    assert type(eager.children[0].children) is tuple
+    assert str(eager) == str(tree)
+
+
+def test_deep_tree():
+    tree = div()
+    element = tree
+    for _ in range(10_000):
+        child = div()
+        element.children = (child,)
+        element = child
+
+    data = dumps(tree)
+    assert str(loads(data)) == str(tree)
+    assert str(loads(data, lazy=True)) == str(tree)
+
+
+def test_parser_independence():
+    # Serialization does not import the parser, AnyElements are supported if it is imported.
+    code = (
+        "import sys; from markyp.elements import Element; "
+        "from markyp.serialization import dumps, loads; "
+        "assert str(loads(dumps(Element('a')))) == str(Element('a')); "
+        "assert 'markyp.parser' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_unsupported_elements():
+    with pytest.raises(TypeError):
+        dumps(tagged_div())
+
+    with pytest.raises(TypeError):
+        dumps(div(1))
+
+    with pytest.raises(TypeError):
+        dumps(div(attr=[1]))
+
+    with pytest.raises(TypeError):
+        dumps(StringElement(1))
+
+    class local_div(Element):
+        __slots__ = ()
+
+    with pytest.raises(TypeError):
+        dumps(local_div())
+
+
+def test_invalid_data():
+    with pytest.raises(ValueError):
+        loads(b"")
+
+    with pytest.raises(ValueError):
+        loads(b"not a serialized tree" * 10)
+
+    data = dumps(div("Text"))
+    with pytest.raises(ValueError):
+        loads(data[:-10])
+
+    with pytest.raises(ValueError):
+        loads(data.replace(b"test.test_serialization", b"test.test_serializatiox"))
@@ -1,6 +1,20 @@
 from typing import Generator
 
+import pytest
+
 from markyp import IElement
+from markyp.elements import (
+    BaseElement,
+    CachedElement,
+    ChildrenOnlyElement,
+    Element,
+    ElementSequence,
+    EmptyElement,
+    FrozenElement,
+    StringElement,
+)
+from markyp.parser import AnyElement
+from markyp.properties import SharedProperties
 from markyp.utils import *
 
 
@@ -40,3 +54,131 @@ def test_join_generator():
         result = join_generator(["foo", "bar", "baz"], separator)
         assert isinstance(result, Generator)
         assert ["foo", "separator", "bar", "separator", "baz"] == list(result)
+
+
+def test_share_properties():
+    shared = StringElement("Shared", class_="cell")
+    tree = Element(
+        ChildrenOnlyElement(Element("A", class_="cell"), shared),
+        CachedElement("B", class_="cell"),
+        EmptyElement(class_="cell", data=[1]),  # type: ignore[arg-type]
+        shared,
+        "Text",
+        None,
+    )
+    markup = str(tree)
+
+    pool = share_properties(tree)
+    assert str(tree) == markup
+    cells = (tree.children[0].children[0], tree.children[1], shared)
+    assert all(cell.properties is cells[0].properties for cell in cells)
+    assert type(tree.properties) is SharedProperties
+    assert type(tree.children[2].properties) is dict
+    assert len(pool) == 2
+
+    other = Element(class_="cell")
+    assert share_properties(other, pool) is pool
+    assert other.properties is shared.properties
+
+    tree.children[1]["class"] = "changed"
+    assert (
+        str(tree.children[1]) == '<CachedElement class="changed">\nB\n</CachedElement>'
+    )
+    assert shared.properties == {"class": "cell"}
+
+
+def test_deduplicate():
+    def icon():
+        return Element(EmptyElement(class_="icon"), "Icon", None, class_="badge")
+
+    tree = ElementSequence(
+        Element(icon(), StringElement("Label", id=1), CachedElement("Cached")),
+        Element(icon(), StringElement("Label", id=True), CachedElement("Cached")),
+        Element(icon(), StringElement("Label", id=1), icon()),
+        AnyElement(element_tag="a"),
+        AnyElement(element_tag="b"),
+        EmptyElement(data=[1]),  # type: ignore[arg-type]
+        EmptyElement(data=[1]),  # type: ignore[arg-type]
+        "Text",
+    )
+    markup = str(tree)
+
+    assert deduplicate(tree, freeze_shared=False) is tree
+    assert str(tree) == markup
+    first, second, third, a, b, list_1, list_2, _ = tree.children
+    assert first.children[0] is second.children[0] is third.children[0]
+    assert third.children[0] is third.children[2]
+    assert first.children[1] is third.children[1]
+    # Values of different types are not merged.
+    assert first.children[1] is not second.children[1]
+    assert first.children[2] is second.children[2]
+    # Elements with unhashable property values and different attributes are not merged.
+    assert a is not b
+    assert list_1 is not list_2
+    assert deduplicate("Text") == "Text"
+
+    tree = ElementSequence(Element(icon()), Element(icon()), icon())
+    assert deduplicate(tree) is tree
+    assert str(tree) == str(ElementSequence(Element(icon()), Element(icon()), icon()))
+    shared, _, shared_icon = tree.children
+    assert isinstance(shared, FrozenElement)
+    assert isinstance(shared_icon, FrozenElement)
+    assert tree.children[1] is shared
+
+    with pytest.raises(TypeError):
+        shared["id"] = "first"  # Shared subtrees are frozen by default.
+
+    tree = ElementSequence(Element(icon()), icon())
+    deduplicate(tree)
+    assert isinstance(tree.children[0], Element)
+    assert tree.children[0].children[0] is tree.children[1]
+    assert isinstance(tree.children[1], FrozenElement)
+
+    # The container type of children is kept for lists.
+    tree = Element()
+    tree.children = [icon(), Element(icon())]
+    deduplicate(tree)
+    assert isinstance(tree.children, list)
+    assert isinstance(tree.children[1].children, tuple)
+    assert tree.children[0] is tree.children[1].children[0]
+    assert isinstance(tree.children[0], FrozenElement)
+
+    class computed(BaseElement):
+        __slots__ = ("items",)
+
+        def __init__(self, items):
+            self.items = items
+
+    tree = ElementSequence(computed((1, 2)), computed((1, 2)), computed([1, 2]))
+    deduplicate(tree)
+    assert tree.children[0] is not tree.children[1]
+    assert tree.children[2] is not tree.children[0]
+
+    class Clock(BaseElement):
+        __slots__ = ()
+        ticks = 0
+
+        def get_element_children(self):
+            Clock.ticks += 1
+            return [str(Clock.ticks)]
+
+    class Stamp(Element):
+        __slots__ = ()
+
+        def __str__(self):
+            return f"<stamp>{Clock.ticks}</stamp>"
+
+    tree = ElementSequence(Element(Clock(), Stamp()), Element(Clock(), Stamp()))
+    deduplicate(tree)
+    first, second = tree.children
+    assert isinstance(first, Element) and isinstance(second, Element)
+    assert first is not second
+    assert str(tree) != str(tree)
+
+    depth = 10_000
+    deep = element = Element()
+    for _ in range(depth):
+        child = Element()
+        element.children = (child,)
+        element = child
+    assert deduplicate(deep) is deep
@@ -0,0 +1,105 @@
+import io
+
+import pytest
+
+from markyp.elements import ElementSequence, EmptyElement, StringElement
+from markyp.parser import AnyElement
+from markyp.writer import MarkupWriter
+
+
+class InlineElement(AnyElement):
+    __slots__ = ()
+
+    @property
+    def inline_children(self):
+        return True
+
+
+def test_MarkupWriter():
+    stream = io.StringIO()
+    writer = MarkupWriter(stream)
+
+    writer.text("<before>")
+    with writer.tag("urlset", xmlns="http://www.sitemaps.org") as w:
+        assert w is writer
+        for i in range(3):
+            with writer.tag("url", class_="item", priority=i, tag="tag"):
+                assert writer.depth == 2
+                writer.text(f"<{i}>")
+                writer.element(None)
+                writer.element(StringElement("string", index=i))
+                with writer.inline_tag("inline", flag=None):
+                    writer.text("foo")
+                    writer.element(EmptyElement(bar=True))
+                    with writer.inline_tag("empty-inline"):
+                        pass
+        with writer.tag("empty"):
+            pass
+    writer.element("<after>")
+    assert writer.depth == 0
+
+    expected = ElementSequence(
+        "<before>",
+        AnyElement(
+            *(
+                AnyElement(
+                    f"<{i}>",
+                    None,
+                    StringElement("string", index=i),
+                    InlineElement(
+                        "foo",
+                        EmptyElement(bar=True),
+                        InlineElement(element_tag="empty-inline"),
+                        element_tag="inline",
+                        flag=None,
+                    ),
+                    element_tag="url",
+                    class_="item",
+                    priority=i,
+                    tag="tag",
+                )
+                for i in range(3)
+            ),
+            AnyElement(element_tag="empty"),
+            element_tag="urlset",
+            xmlns="http://www.sitemaps.org",
+        ),
+        "<after>",
+    )
+    assert stream.getvalue() == expected.markup
+
+
+def test_MarkupWriter_leaf_tags():
+    stream = io.StringIO()
+    writer = MarkupWriter(stream)
+
+    writer.raw("<?xml version='1.0'?>")
+    with writer.inline_tag("root"):
+        writer.empty("empty", class_="cls", foo=1)
+        writer.self_closed("self-closed", class_="cls", flag=None)
+        writer.standalone("standalone", bar=False)
+
+    assert stream.getvalue() == (
+        "<?xml version='1.0'?>\n<root >"
+        '<empty foo="1" class="cls"></empty> '
+        '<self-closed flag class="cls"/> '
+        '<standalone bar="false">'
+        "</root>"
+    )
+
+
+def test_MarkupWriter_close():
+    stream = io.StringIO()
+    writer = MarkupWriter(stream)
+
+    with pytest.raises(ValueError):
+        writer.close()
+
+    with pytest.raises(KeyError):
+        with writer.tag("outer"):
+            with writer.inline_tag("inner"):
+                writer.text("text")
+                raise KeyError("error")
+
+    assert writer.depth == 0
+    assert stream.getvalue() == "<outer >\n<inner >text</inner>\n</outer>"